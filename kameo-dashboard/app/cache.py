@@ -0,0 +1,156 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+
+
+def digest_text(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def digest_file(f, chunk_size: int = 1 << 20) -> str:
+    """Hash a binary file object from its current position, chunk by chunk."""
+    h = hashlib.blake2b(digest_size=16)
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def sizeof(value) -> int:
+    """Approximate bytes held by a cached artifact (DataFrames, dicts/lists of them, scalars)."""
+    # pandas-objekter kjennes på memory_usage(), så modulen slipper å importere pandas
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    LRU for computed dashboard artifacts, keyed by a hash of the raw export.
+
+    An entry is a dict of artifacts (tx, views, monthly series, ...). More
+    artifacts can be added to an existing entry later with artifact(), e.g.
+    the daily frame that only the CSV export needs. Entries are evicted
+    least-recently-used first when either max_entries or max_bytes is
+    exceeded; an entry bigger than max_bytes on its own is not stored.
+
+    The estimates depend on the current month, so everything is dropped
+    when the month changes.
+    """
+
+    def __init__(self, max_entries: int = 8, max_bytes: int = 256 << 20, today=date.today):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._today = today
+        self._data = OrderedDict()   # key -> [artifacts, nbytes]
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rollovers = 0
+        self.month = self._current_month()
+
+    def _current_month(self):
+        t = self._today()
+        return (t.year, t.month)
+
+    def _check_month(self):
+        month = self._current_month()
+        if month != self.month:
+            self.month = month
+            self.rollovers += 1
+            self._data.clear()
+            self.nbytes = 0
+
+    def _evict(self):
+        while self._data and (len(self._data) > self.max_entries or self.nbytes > self.max_bytes):
+            _, (_, nbytes) = self._data.popitem(last=False)
+            self.nbytes -= nbytes
+            self.evictions += 1
+
+    def _store(self, key, artifacts: dict, nbytes: int):
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        if nbytes > self.max_bytes:
+            return
+        self._data[key] = [artifacts, nbytes]
+        self.nbytes += nbytes
+        self._evict()
+
+    def get(self, key):
+        with self._lock:
+            self._check_month()
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_or_set(self, key, compute) -> dict:
+        """Artifacts for `key`; `compute()` builds them (outside the lock) on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        month = self.month
+        value = compute()
+        nbytes = sizeof(value)
+        with self._lock:
+            self._check_month()
+            # Ikke lagre noe som ble regnet ut før et månedsskifte
+            if month == self.month:
+                self._store(key, value, nbytes)
+        return value
+
+    def artifact(self, key, name: str, compute):
+        """One named artifact of an entry, computed and added to the entry on first use."""
+        with self._lock:
+            self._check_month()
+            entry = self._data.get(key)
+            if entry is not None and name in entry[0]:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0][name]
+            self.misses += 1
+            month = self.month
+
+        value = compute()
+        nbytes = sizeof(value)
+        with self._lock:
+            self._check_month()
+            entry = self._data.get(key)
+            if month == self.month and entry is not None and name not in entry[0]:
+                self._store(key, {**entry[0], name: value}, entry[1] + nbytes)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "rollovers": self.rollovers,
+            }
@@ -0,0 +1,169 @@
+"""
+Bounded worker pool for the CPU-heavy dashboard pipeline.
+
+Routes are `async def`, so parsing and pandas work done inline would
+block the event loop: one big upload and every other request (static
+files, /metrics) waits. `await compute.run(request, fn, *args)` runs
+`fn` on a small dedicated thread pool instead and adds:
+
+  - backpressure: at most `max_queue` jobs queued or running, beyond that
+    PoolBusy (503) right away instead of an ever-growing queue
+  - a per-job timeout (JobTimeout, 504)
+  - cancellation when the client disconnects or the job times out
+
+Threads can't be killed, so cancelling a running job is cooperative: the
+pipeline calls checkpoint() between stages, which raises JobCancelled
+once the job is cancelled. A job that hasn't started yet is simply
+dropped from the queue.
+
+Threads rather than processes: the jobs read and fill the in-process
+result cache, session store and stage metrics, and return DataFrames
+that would otherwise have to be pickled back. pandas/numpy release the
+GIL in their heavy loops, and the event loop only needs a thread switch
+now and then to stay responsive.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_SECONDS = 0.1   # hvor ofte vi sjekker om klienten har koblet fra
+
+
+class PoolBusy(Exception):
+    """Too many jobs queued or running."""
+
+
+class JobTimeout(Exception):
+    """A job ran past its timeout."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by checkpoint() after it was cancelled."""
+
+
+_local = threading.local()
+
+
+def checkpoint():
+    """Call between stages of a job; raises JobCancelled if the job was cancelled."""
+    cancel = getattr(_local, "cancel", None)
+    if cancel is not None and cancel.is_set():
+        raise JobCancelled()
+
+
+class ComputePool:
+    def __init__(self, workers: int = 2, max_queue: int = 8, timeout: float = 30.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "queued": 0,
+            "running": 0,
+            "wait_ms_total": 0.0,
+            "run_ms_total": 0.0,
+            "run_ms_max": 0.0,
+        }
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="kameo-compute")
+        return self._pool
+
+    def _call(self, cancel: threading.Event, submitted: float, fn, args):
+        started = time.perf_counter()
+        with self._lock:
+            self._stats["queued"] -= 1
+            self._stats["running"] += 1
+            self._stats["wait_ms_total"] += (started - submitted) * 1000
+        _local.cancel = cancel
+        try:
+            checkpoint()   # avbrutt mens den lå i køen
+            return fn(*args)
+        finally:
+            _local.cancel = None
+            ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._stats["running"] -= 1
+                self._stats["run_ms_total"] += ms
+                self._stats["run_ms_max"] = max(self._stats["run_ms_max"], ms)
+
+    async def run(self, request, fn, *args, timeout: float = None):
+        """
+        Run `fn(*args)` on the pool and return its result. `request` (may be
+        None) is polled for client disconnects while the job runs.
+        """
+        with self._lock:
+            if self._stats["queued"] + self._stats["running"] >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise PoolBusy()
+            self._stats["submitted"] += 1
+            self._stats["queued"] += 1
+
+        cancel = threading.Event()
+        loop = asyncio.get_running_loop()
+        job = self._executor().submit(self._call, cancel, time.perf_counter(), fn, args)
+        fut = asyncio.wrap_future(job)
+        deadline = loop.time() + (self.timeout if timeout is None else timeout)
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({fut}, timeout=min(POLL_SECONDS, max(deadline - loop.time(), 0)))
+                if done:
+                    break
+                if loop.time() >= deadline:
+                    self._cancel(job, fut, cancel, "timeouts")
+                    raise JobTimeout()
+                if request is not None and await request.is_disconnected():
+                    self._cancel(job, fut, cancel, "cancelled")
+                    raise JobCancelled()
+        except asyncio.CancelledError:
+            # Serveren avbrøt requesten (f.eks. shutdown)
+            self._cancel(job, fut, cancel, "cancelled")
+            raise
+
+        try:
+            result = fut.result()
+        except JobCancelled:
+            raise
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        with self._lock:
+            self._stats["completed"] += 1
+        return result
+
+    def _cancel(self, job, fut, cancel: threading.Event, counter: str):
+        cancel.set()
+        if job.cancel():
+            # Startet aldri: _call kjører ikke, så vi rydder køtelleren selv
+            with self._lock:
+                self._stats["queued"] -= 1
+        # Resultat/feil fra en jobb som fortsatt kjører skal ikke logges som "never retrieved"
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        with self._lock:
+            self._stats[counter] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["workers"] = self.workers
+        out["max_queue"] = self.max_queue
+        out["utilization"] = out["running"] / self.workers if self.workers else 0.0
+        for k in ("wait_ms_total", "run_ms_total", "run_ms_max"):
+            out[k] = round(out[k], 3)
+        return out
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,156 @@
+"""
+Streaming export of DataFrames as CSV, gzip-compressed CSV or Parquet.
+
+Each format is a generator of byte chunks for a StreamingResponse. The
+frame is serialised EXPORT_CHUNK_ROWS rows at a time, so the full file is
+never held in memory at once. A JoinedFrame (long rows plus a small
+per-key side table) is joined one chunk at a time as well. Parquet needs
+pyarrow, an optional extra that is only imported when a Parquet export
+is requested.
+"""
+from __future__ import annotations
+
+import zlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+EXPORT_CHUNK_ROWS = 10_000
+
+# format -> (media type, filsuffiks)
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "csv.gz": ("application/gzip", ".csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+
+class ExportError(ValueError):
+    """Bad export parameters (unknown format or column, missing pyarrow, ...)."""
+
+
+class JoinedFrame:
+    """
+    `rows` left-joined with `side` on column `on`, materialised only one
+    chunk at a time: the wide frame never exists in memory as a whole.
+    Supports what the exporters need: len(), .columns, frame[cols], chunk().
+    """
+
+    def __init__(self, rows: pd.DataFrame, side: pd.DataFrame, on: str, columns=None):
+        import pandas as pd
+
+        self.rows, self.side, self.on = rows, side, on
+        self.columns = pd.Index(columns if columns is not None else [*rows.columns, *side.columns.drop(on)])
+        # Posisjon i sidetabellen for hver rad, slått opp én gang
+        self._pos = pd.Index(side[on]).get_indexer(rows[on])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, columns):
+        return JoinedFrame(self.rows, self.side, self.on, columns)
+
+    def chunk(self, start: int, stop: int) -> pd.DataFrame:
+        import pandas as pd
+
+        part = self.rows.iloc[start:stop].reset_index(drop=True)
+        extra = self.side.drop(columns=self.on).iloc[self._pos[start:stop]].reset_index(drop=True)
+        return pd.concat([part, extra], axis=1)[self.columns]
+
+    def to_frame(self) -> pd.DataFrame:
+        return self.chunk(0, len(self))
+
+
+def _chunk(df, start: int, stop: int) -> pd.DataFrame:
+    return df.chunk(start, stop) if isinstance(df, JoinedFrame) else df.iloc[start:stop]
+
+
+def select_columns(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """Keep `columns` (list or comma-separated string) in the given order; None keeps all."""
+    if not columns:
+        return df
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in df.columns]
+    if unknown:
+        raise ExportError(f"Unknown column(s): {', '.join(unknown)}. Available: {', '.join(map(str, df.columns))}")
+    return df[columns]
+
+
+def iter_csv(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Same bytes as df.to_csv(index=False), one chunk of rows at a time."""
+    yield _chunk(df, 0, 0).to_csv(index=False).encode("utf-8")
+    for i in range(0, len(df), chunk_rows):
+        yield _chunk(df, i, i + chunk_rows).to_csv(index=False, header=False).encode("utf-8")
+
+
+def iter_gzip(chunks, level: int = 6):
+    """Gzip a byte stream on the fly (wbits=31 -> gzip header/trailer)."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+class _Sink:
+    """Minimal writable file object that hands written bytes back in pieces."""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        out, self.parts = b"".join(self.parts), []
+        return out
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    return pa, pq
+
+
+def iter_parquet(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """One Parquet row group per chunk, yielded as soon as it is written."""
+    pa, pq = _pyarrow()
+    schema = pa.Schema.from_pandas(_chunk(df, 0, 0), preserve_index=False)
+    sink = _Sink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for i in range(0, max(len(df), 1), chunk_rows):
+            writer.write_table(pa.Table.from_pandas(_chunk(df, i, i + chunk_rows), schema=schema, preserve_index=False))
+            data = sink.take()
+            if data:
+                yield data
+    yield sink.take()
+
+
+def check_format(fmt: str):
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format {fmt!r}, use one of: {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        _pyarrow()   # feil tidlig, før responsen har startet
+
+
+def stream(df: pd.DataFrame, fmt: str = "csv", chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Byte chunks of `df` in `fmt` (see FORMATS)."""
+    check_format(fmt)
+    if fmt == "parquet":
+        return iter_parquet(df, chunk_rows)
+    chunks = iter_csv(df, chunk_rows)
+    return iter_gzip(chunks) if fmt == "csv.gz" else chunks
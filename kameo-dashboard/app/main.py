@@ -1,19 +1,37 @@
 from __future__ import annotations
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager, contextmanager
+from datetime import date
 from pathlib import Path
+from typing import TYPE_CHECKING
+import asyncio
+import io
 import json
+import logging
+import os
+import sys
+import threading
 
-from fastapi import FastAPI, File, UploadFile, Request, Form
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi import FastAPI, File, UploadFile, Request, Form, Query
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-import pandas as pd
 
-from .parser import (
-    parse_text_to_tx_df,
-    expand_to_daily,
-    build_views,
-    build_monthly_series,
-)
+from .cache import ResultCache, digest_file, digest_text
+from .compute import ComputePool, JobCancelled, JobTimeout, PoolBusy, checkpoint
+from . import export
+from .metrics import Metrics, MetricsMiddleware
+from .sessions import SessionStore, new_session_id, valid_session_id
+
+# pandas og parseren importeres først når en side faktisk bygges (eller i
+# oppvarmingen ved oppstart), så /health og /static svarer med en gang.
+if TYPE_CHECKING:
+    import pandas as pd
+
+log = logging.getLogger("kameo")
 
 # --- Paths / app setup ---
 APP_DIR = Path(__file__).resolve().parent
@@ -21,19 +39,113 @@ ROOT_DIR = APP_DIR.parent
 # Demo-filen ligger under app/demo/demo.txt
 DEMO_PATH = APP_DIR / "demo" / "demo.txt"
 
-# Husk sist rendret råtekst (demo / upload / paste) for eksport
-LAST_RAW: str = ""
+# Ferdige kontekster per datasett (hash av råteksten), se app/cache.py
+results = ResultCache(
+    max_entries=int(os.getenv("KAMEO_CACHE_ENTRIES", "8")),
+    max_bytes=int(os.getenv("KAMEO_CACHE_MB", "256")) << 20,
+)
+
+# Sist rendrede datasett (demo / upload / paste) per sesjon, for eksport og "ingen input".
+# Med KAMEO_SPILL_DIR deles sesjonene mellom workers via disk, se app/sessions.py
+SESSION_COOKIE = "kameo_sid"
+sessions = SessionStore(
+    ttl=float(os.getenv("KAMEO_SESSION_TTL", str(12 * 3600))),
+    max_bytes=int(os.getenv("KAMEO_SESSION_MB", "256")) << 20,
+    spill_dir=os.getenv("KAMEO_SPILL_DIR") or None,
+)
+
+# Valgfri persistent portefølje (SQLite): opplastinger flettes inn, dashboardet leses herfra.
+# Åpnes med en gang (og trekker da inn pandas), så første request ser porteføljen.
+if os.getenv("KAMEO_STORE"):
+    from .store import PortfolioStore
+    store = PortfolioStore(os.getenv("KAMEO_STORE"))
+else:
+    store = None
+
+# Parsing og pandas kjøres i en egen trådpool, ikke på event-loopen (se app/compute.py)
+compute = ComputePool(
+    workers=int(os.getenv("KAMEO_COMPUTE_WORKERS", "2")),
+    max_queue=int(os.getenv("KAMEO_COMPUTE_QUEUE", "8")),
+    timeout=float(os.getenv("KAMEO_COMPUTE_TIMEOUT", "60")),
+)
+
+
+# Bygg forsidens kontekst i bakgrunnen ved oppstart, så første besøk er et cache-treff
+WARM_UP = os.getenv("KAMEO_WARM_UP", "1") != "0"
+
+# Oppstartstider i sekunder, på /health og /metrics (kameo_startup)
+startup = {
+    "import_seconds": None,
+    "warm_up_seconds": None,
+    "first_index_seconds": None,
+}
+
+
+# Oppvarmingen som pågår (lifespan), så forespørsler kan vente på den i stedet for å regne ut det samme
+_warming: asyncio.Task | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _warming
+    _warming = asyncio.create_task(_warm_up()) if WARM_UP else None
+    yield
+    if _warming is not None:
+        _warming.cancel()
+    compute.shutdown()
+
+app = FastAPI(title="Kameo Dashboard", lifespan=lifespan)
+
+# Request-tall, latens per rute og tid per pipeline-steg på /metrics
+metrics = Metrics("kameo")
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+metrics.add_gauge("result_cache", "Result cache size and counters.", results.stats, label="stat")
+metrics.add_gauge("sessions", "Session store size and counters.", sessions.stats, label="stat")
+metrics.add_gauge("compute", "Compute pool utilisation and job counters.", compute.stats, label="stat")
+metrics.add_gauge("startup", "Import, warm-up and first page timings in seconds.", lambda: startup, label="stat")
+if store is not None:
+    metrics.add_gauge("store", "Portfolio store size.", store.stats, label="stat")
 
-app = FastAPI(title="Kameo Dashboard")
 templates = Jinja2Templates(directory=str(APP_DIR / "templates"))
 
+
+@app.exception_handler(PoolBusy)
+def pool_busy_handler(request: Request, exc: PoolBusy):
+    return PlainTextResponse("Server busy, try again", status_code=503, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(JobTimeout)
+def job_timeout_handler(request: Request, exc: JobTimeout):
+    return PlainTextResponse("Processing took too long", status_code=504)
+
+
+@app.exception_handler(export.ExportError)
+def export_error_handler(request: Request, exc: export.ExportError):
+    return PlainTextResponse(str(exc), status_code=400)
+
+
+@app.exception_handler(JobCancelled)
+def job_cancelled_handler(request: Request, exc: JobCancelled):
+    # Klienten er borte; ingen leser svaret (499 som i nginx)
+    return Response(status_code=499)
+
 STATIC_DIR = APP_DIR / "static"
 STATIC_DIR.mkdir(parents=True, exist_ok=True)
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
 # ---------------- Helpers ----------------
+@contextmanager
+def _stage(name: str):
+    """Tidtatt pipeline-steg; avbrutte jobber stopper før neste steg."""
+    checkpoint()
+    with metrics.stage(name):
+        yield
+
+
 def _fmt_for_template(df: pd.DataFrame) -> pd.DataFrame:
+    import pandas as pd
+
     out = df.copy()
     for c in ["Date", "start_date", "end_date", "last_payment_date", "repayment_date"]:
         if c in out.columns:
@@ -44,92 +156,131 @@ def _fmt_for_template(df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
-def _build_monthly_by_loan(tx: pd.DataFrame, daily: pd.DataFrame, monthly_df: pd.DataFrame) -> dict:
-    """Per-lån månedsserier for filterbar graf (bullet principal i siste terminmåned)."""
-    if tx.empty or daily.empty or monthly_df.empty:
-        return {"months": [], "loans": {}}
+def _build_monthly_by_loan(per_loan: dict, monthly_df: pd.DataFrame) -> dict:
+    """Per-lån månedsserier for filterbar graf, fra lån x måned-matrisene i build_loan_months()."""
+    import pandas as pd
+    from .parser import MONTHLY_COLUMNS
 
-    months_idx = list(monthly_df.index)
-    months_str = [pd.to_datetime(m).date().strftime("%Y-%m") for m in months_idx]
-    this_month = pd.Timestamp.today().normalize().replace(day=1)
-
-    payload = {}
-    from dateutil.relativedelta import relativedelta
-
-    for loan_id, g in daily.groupby("loan_id"):
-        invested = float(g["invested"].max())
-        rate     = float(g["interest"].max())
-        duration = int(g["duration"].max())
-        is_repaid = bool(g["is_repaid"].max())
-
-        t = tx[tx["loan_id"] == loan_id].copy()
-        if t.empty:
-            continue
-        t["month"] = pd.to_datetime(t["date"]).values.astype("datetime64[M]")
-
-        is_int = t["transaction_norm"].isin(["interest", "interest_penalty"])
-        is_pri = t["transaction_norm"].eq("principal_repaid")
-
-        ia = t.loc[is_int, "amount"].abs().groupby(t.loc[is_int, "month"]).sum()
-        pa = t.loc[is_pri, "amount"].abs().groupby(t.loc[is_pri, "month"]).sum()
-
-        ie, pe = {}, {}
-
-        if not is_repaid:
-            int_days = g[g["interest_amount"].abs() > 0]
-            sched_start = (
-                pd.to_datetime(int_days["Date"].min()) if not int_days.empty
-                else pd.to_datetime(g["Date"].min())
-            )
-            start_month = pd.Timestamp(sched_start.year, sched_start.month, 1)
-
-            # Serie av månedstarter; forfall = siste terminmåned
-            months_all = pd.date_range(start=start_month, periods=duration, freq="MS")
-            if len(months_all) > 0:
-                maturity_month = months_all[-1]
-            else:
-                maturity_month = start_month
-
-            # Rente-estimat
-            months_future = [m for m in months_all if m >= this_month]
-            mi = invested * (rate / 100.0) / 12.0 if duration > 0 else 0.0
-            for m in months_future:
-                ie[m] = ie.get(m, 0.0) + mi
-
-            # Bullet principal i forfallsmåneden
-            if maturity_month >= this_month:
-                principal_paid_before = t.loc[
-                    (t["transaction_norm"] == "principal_repaid") &
-                    (t["date"] < this_month),
-                    "amount"
-                ].sum()
-                remaining_principal = max(0.0, invested - float(principal_paid_before))
-                if remaining_principal > 0:
-                    pe[maturity_month] = pe.get(maturity_month, 0.0) + remaining_principal
-
-            # Fjern overlapp i inneværende måned
-            if this_month in ie:
-                ie[this_month] = max(0.0, ie[this_month] - float(ia.get(this_month, 0.0)))
-            if this_month in pe:
-                pe[this_month] = max(0.0, pe[this_month] - float(pa.get(this_month, 0.0)))
-
-        def arr(series_map): return [float(series_map.get(m, 0.0)) for m in months_idx]
-
-        payload[str(int(loan_id))] = {
-            "interest_actual": [float(ia.get(m, 0.0)) for m in months_idx],
-            "principal_actual": [float(pa.get(m, 0.0)) for m in months_idx],
-            "interest_estimated": arr(ie),
-            "principal_estimated": arr(pe),
-        }
+    if not per_loan or monthly_df.empty:
+        return {"months": [], "loans": {}}
 
+    months_str = [pd.to_datetime(m).date().strftime("%Y-%m") for m in monthly_df.index]
+    keys = [str(int(loan_id)) for loan_id in per_loan["interest_actual"].index]
+    rows = {c: per_loan[c].to_numpy(dtype="float64").tolist() for c in MONTHLY_COLUMNS}
+    payload = {k: {c: rows[c][i] for c in MONTHLY_COLUMNS} for i, k in enumerate(keys)}
     return {"months": months_str, "loans": payload}
 
-def _make_context_from_text(raw: str):
-    tx = parse_text_to_tx_df(raw)
-    daily = expand_to_daily(tx)
-    by_loan, by_company = build_views(daily)
+def _parse_source(source) -> pd.DataFrame:
+    """Råtekst (str) eller en åpen tekststrøm -> transaksjoner."""
+    from .parser import parse_stream_to_tx_df, parse_text_to_tx_df
+
+    with _stage("parse"):
+        if isinstance(source, str):
+            return parse_text_to_tx_df(source)
+        return parse_stream_to_tx_df(source)
+
+
+def _parse_demo() -> pd.DataFrame:
+    if not DEMO_PATH.exists():
+        return _parse_source("")
+    with DEMO_PATH.open(encoding="utf-8") as f:
+        return _parse_source(f)
+
+
+def _parse_upload(file: UploadFile) -> pd.DataFrame:
+    """Leser opplastingen linje for linje, uten å dekode hele fila til én streng."""
+    file.file.seek(0)
+    text = io.TextIOWrapper(file.file, encoding="utf-8", errors="ignore", newline=None)
+    try:
+        return _parse_source(text)
+    finally:
+        text.detach()  # UploadFile eier fila og lukker den selv
+
+
+def _demo_key() -> str:
+    if not DEMO_PATH.exists():
+        return digest_text("")
+    with DEMO_PATH.open("rb") as f:
+        return digest_file(f)
+
+
+def _upload_key(file: UploadFile) -> str:
+    file.file.seek(0)
+    return digest_file(file.file)
+
+
+def _context(key: str, load) -> dict:
+    """Kontekst for datasettet `key` fra cachen; `load()` gir transaksjonene hvis den må bygges."""
+    return results.get_or_set(key, lambda: _make_context(load()))
+
+
+def _import(raw_key: str, load):
+    """Flett en opplasting inn i porteføljen; en eksport som er importert før parses ikke igjen."""
+    if store.has_import(raw_key):
+        return
+    tx = load()
+    with _stage("merge"):
+        store.merge(tx, raw_key)
+
+
+def _store_context() -> tuple[str, dict]:
+    """Hele den lagrede porteføljen; nøkkelen følger store-versjonen, så en merge gir ny kontekst."""
+    key = digest_text(f"store:{store.path}:{store.version}")
 
-    monthly_df = build_monthly_series(tx, daily)
+    def load():
+        with _stage("load"):
+            version, tx, loans = store.snapshot()
+        return _make_context(tx, loans, month_parts=lambda: _store_month_parts(version, tx, loans))
+
+    return key, results.get_or_set(key, load)
+
+
+# Lån x måned-radene for sist leste store-versjon, så neste versjon bare
+# bygger om lånene som fikk nye rader, ikke hele historikken
+_store_months = {"version": None, "parts": None}
+_store_months_lock = threading.Lock()
+
+
+def _store_month_parts(version: int, tx: pd.DataFrame, loans: pd.DataFrame):
+    """loan_month_parts() for the stored portfolio at `version`, reusing the previous version's rows."""
+    from .parser import loan_month_parts, replace_loan_month_parts
+
+    if tx.empty:
+        return None
+    with _store_months_lock:
+        last, parts = _store_months["version"], _store_months["parts"]
+        if parts is None or last > version:
+            parts = loan_month_parts(tx, loans)
+        else:
+            changed = store.changed_since(last) if last < version else []
+            parts = replace_loan_month_parts(parts, tx, loans, changed)
+        _store_months.update(version=version, parts=parts)
+        return parts
+
+
+def _session_id(request: Request) -> str:
+    sid = request.cookies.get(SESSION_COOKIE)
+    return sid if valid_session_id(sid) else new_session_id()
+
+
+def _with_session(response, sid: str):
+    response.set_cookie(SESSION_COOKIE, sid, max_age=int(sessions.ttl), httponly=True, samesite="lax")
+    return response
+
+
+def _make_context(tx: pd.DataFrame, loans: pd.DataFrame | None = None, month_parts=None):
+    """Dashboard data for `tx`; `month_parts()` may supply build_loan_months()'s long frames."""
+    import pandas as pd
+    from .parser import build_loan_months, build_views, summarize_loans
+
+    if loans is None:
+        with _stage("loans"):
+            loans = summarize_loans(tx)
+    with _stage("views"):
+        by_loan, by_company = build_views(loans)
+
+    with _stage("monthly"):
+        monthly_df, per_loan = build_loan_months(tx, loans, month_parts() if month_parts else None)
     # Tving numeriske kolonner til float (robusthet)
     for c in ["interest_actual", "interest_estimated", "principal_actual", "principal_estimated"]:
         if c not in monthly_df.columns:
@@ -145,7 +296,8 @@ def _make_context_from_text(raw: str):
         "principal_estimated": monthly_df["principal_estimated"].round(2).tolist(),
     }
 
-    monthly_by_loan = _build_monthly_by_loan(tx, daily, monthly_df)
+    with _stage("per_loan"):
+        monthly_by_loan = _build_monthly_by_loan(per_loan, monthly_df)
 
     kpis = {
         "companies": int(by_company.shape[0]),
@@ -156,7 +308,7 @@ def _make_context_from_text(raw: str):
     }
     return {
         "tx": tx,
-        "daily": daily,
+        "loans": loans,
         "by_loan": by_loan,
         "by_company": by_company,
         "kpis": kpis,
@@ -165,43 +317,156 @@ def _make_context_from_text(raw: str):
     }
 
 
-def _render_full(request: Request, ctx: dict) -> HTMLResponse:
-    return templates.TemplateResponse(
-        "index.html",
-        {
-            "request": request,
-            "kpis": ctx["kpis"],
-            "by_company": _fmt_for_template(ctx["by_company"]).to_dict(orient="records"),
-            "by_loan": _fmt_for_template(ctx["by_loan"]).to_dict(orient="records"),
-            "monthly_json": json.dumps(ctx["monthly"]),
-            "monthly_by_loan_json": json.dumps(ctx["monthly_by_loan"]),
-        },
-    )
+def _render_full(request: Request, key: str, ctx: dict) -> HTMLResponse:
+    with _stage("render"):
+        return _render_template("index.html", request, key, ctx)
 
 
-def _render_dashboard_partial(request: Request, ctx: dict) -> HTMLResponse:
-    return templates.TemplateResponse(
-        "_dashboard.html",
-        {
-            "request": request,
-            "kpis": ctx["kpis"],
-            "by_company": _fmt_for_template(ctx["by_company"]).to_dict(orient="records"),
-            "by_loan": _fmt_for_template(ctx["by_loan"]).to_dict(orient="records"),
-            "monthly_json": json.dumps(ctx["monthly"]),
-            "monthly_by_loan_json": json.dumps(ctx["monthly_by_loan"]),
-        },
-    )
+def _render_dashboard_partial(request: Request, key: str, ctx: dict) -> HTMLResponse:
+    with _stage("render"):
+        return _render_template("_dashboard.html", request, key, ctx)
+
+
+def _template_data(ctx: dict) -> dict:
+    return {
+        "kpis": ctx["kpis"],
+        "by_company": _fmt_for_template(ctx["by_company"]).to_dict(orient="records"),
+        "by_loan": _fmt_for_template(ctx["by_loan"]).to_dict(orient="records"),
+        "monthly_json": json.dumps(ctx["monthly"]),
+        "monthly_by_loan_json": json.dumps(ctx["monthly_by_loan"]),
+    }
+
+
+def _render_template(name: str, request: Request, key: str, ctx: dict) -> HTMLResponse:
+    # Formaterte rader og JSON lagres i cache-entryen, så ny rendring er bare Jinja
+    data = results.artifact(key, "template", lambda: _template_data(ctx))
+    return templates.TemplateResponse(name, {"request": request, **data})
+
+
+# ---------------- Pages (kjøres i compute-poolen) ----------------
+def _index_page(request: Request, sid: str) -> HTMLResponse:
+    if store is not None and store.version > 0:
+        key, ctx = _store_context()
+    else:
+        key = _demo_key()
+        ctx = _context(key, _parse_demo)
+    sessions.set(sid, key, ctx["tx"])
+    return _render_full(request, key, ctx)
+
+
+def _upload_page(request: Request, sid: str, file: UploadFile | None, paste: str | None) -> HTMLResponse:
+    current = sessions.get(sid)
+    if store is not None and ((paste and paste.strip()) or file is not None):
+        if paste and paste.strip():
+            _import(digest_text(paste), lambda: _parse_source(paste))
+        else:
+            _import(_upload_key(file), lambda: _parse_upload(file))
+        key, ctx = _store_context()
+    elif paste and paste.strip():
+        key = digest_text(paste)
+        ctx = _context(key, lambda: _parse_source(paste))
+    elif file is not None:
+        key = _upload_key(file)
+        ctx = _context(key, lambda: _parse_upload(file))
+    elif current is not None and not current[1].empty:
+        # Ingen input – behold sesjonens forrige datasett
+        key, tx = current
+        ctx = _context(key, lambda: tx)
+    else:
+        key = _demo_key()
+        ctx = _context(key, _parse_demo)
+    sessions.set(sid, key, ctx["tx"])
+    return _render_dashboard_partial(request, key, ctx)
+
+
+def _warm_up_page():
+    """Forsidens kontekst og template-data i cachen, uten en request (samme nøkkel som _index_page)."""
+    if store is not None and store.version > 0:
+        key, ctx = _store_context()
+    else:
+        key = _demo_key()
+        ctx = _context(key, _parse_demo)
+    results.artifact(key, "template", lambda: _template_data(ctx))
+
+
+async def _warm_up():
+    """Kjøres fra lifespan: importerer pandas og bygger forsiden mens serveren allerede svarer."""
+    t0 = time.perf_counter()
+    try:
+        await compute.run(None, _warm_up_page)
+    except Exception:
+        # Ikke kritisk: første besøk bygger forsiden selv
+        log.exception("warm-up failed")
+        return
+    startup["warm_up_seconds"] = round(time.perf_counter() - t0, 3)
+
+
+async def _await_warm_up():
+    """Single-flight: a request that arrives mid warm-up waits for it and then hits the cache."""
+    if _warming is not None and not _warming.done():
+        # shield: en avbrutt forespørsel skal ikke avbryte oppvarmingen
+        await asyncio.shield(_warming)
+
+
+def _parse_date(value: str | None, name: str):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise export.ExportError(f"Bad {name} date {value!r}, use YYYY-MM-DD") from None
+
+
+def _export_frame(sid: str | None, view: str, columns: str | None, start, end) -> pd.DataFrame:
+    """Visningen som skal eksporteres, bare kolonnene og datoene som ble bedt om."""
+    import pandas as pd
+    from .parser import DAILY_COLUMNS, build_views, daily_frames
+
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    current = sessions.get(sid)
+    if current is not None:
+        key, tx = current
+        ctx = _context(key, lambda: tx)
+    else:
+        key = digest_text("")
+        ctx = _context(key, lambda: _parse_source(""))
+
+    ranged = start is not None or end is not None
+    if view == "daily":
+        # Én rad per lån per dag lages bare her, ved eksport, og bare for lånene i datointervallet.
+        # Lånekolonnene ligger i en sidetabell og joines inn én eksport-chunk om gangen.
+        if ranged:
+            days, side = daily_frames(ctx["tx"], start, end)
+        else:
+            days, side = results.artifact(key, "daily", lambda: daily_frames(ctx["tx"]))
+        df = export.JoinedFrame(days, side, "loan_id", DAILY_COLUMNS)
+    elif ranged:
+        # Lån som løper i intervallet; by_company summerer bare disse
+        by_loan = ctx["by_loan"]
+        active = pd.Series(True, index=by_loan.index)
+        if start is not None:
+            active &= by_loan[["end_date", "repayment_date"]].max(axis=1) >= start
+        if end is not None:
+            active &= by_loan["start_date"] <= end
+        by_loan, by_company = build_views(ctx["loans"][active.to_numpy()].reset_index(drop=True))
+        df = by_company if view == "by_company" else by_loan
+    else:
+        df = ctx["by_company"] if view == "by_company" else ctx["by_loan"]
+    return export.select_columns(df, columns)
 
 
 # ---------------- Routes ----------------
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
-    """Rendre side med demo hvis den finnes."""
-    global LAST_RAW
-    raw = DEMO_PATH.read_text(encoding="utf-8") if DEMO_PATH.exists() else ""
-    LAST_RAW = raw
-    ctx = _make_context_from_text(raw)
-    return _render_full(request, ctx)
+    """Rendre side med lagret portefølje (KAMEO_STORE), ellers demo hvis den finnes."""
+    t0 = time.perf_counter()
+    sid = _session_id(request)
+    await _await_warm_up()
+    response = _with_session(await compute.run(request, _index_page, request, sid), sid)
+    if startup["first_index_seconds"] is None:
+        startup["first_index_seconds"] = round(time.perf_counter() - t0, 3)
+    return response
 
 
 @app.post("/upload", response_class=HTMLResponse)
@@ -210,38 +475,54 @@ async def upload(
     file: UploadFile | None = File(None),
     paste: str | None = Form(None),
 ):
-    """Upload / paste – rendrer dashboard og husker sist brukte råtekst for eksport."""
-    global LAST_RAW
-    if paste and paste.strip():
-        raw = paste
-    elif file is not None:
-        raw = (await file.read()).decode("utf-8", errors="ignore")
-    else:
-        # Ingen input – behold forrige datasett (eller fall tilbake til demo)
-        raw = LAST_RAW if LAST_RAW else (DEMO_PATH.read_text(encoding="utf-8") if DEMO_PATH.exists() else "")
-
-    LAST_RAW = raw
-    ctx = _make_context_from_text(raw)
-    return _render_dashboard_partial(request, ctx)
+    """Upload / paste – rendrer dashboard og husker datasettet i sesjonen for eksport."""
+    sid = _session_id(request)
+    return _with_session(await compute.run(request, _upload_page, request, sid, file, paste), sid)
 
 
 @app.get("/download/csv")
-async def download_csv(view: str = "by_loan"):
+async def download_csv(
+    request: Request,
+    view: str = "by_loan",
+    fmt: str = Query("csv", alias="format", description="csv | csv.gz | parquet"),
+    columns: str | None = Query(None, description="comma-separated, in output order"),
+    start: str | None = Query(None, description="YYYY-MM-DD, inclusive"),
+    end: str | None = Query(None, description="YYYY-MM-DD, inclusive"),
+):
     """
-    Eksporterer CSV for gjeldende datasett (siste rendret råtekst).
+    Eksporterer sesjonens datasett (siste rendrede transaksjoner), strømmet i biter.
     view = 'daily' | 'by_company' | 'by_loan'
     """
-    raw = LAST_RAW if LAST_RAW is not None else ""
-    tx = parse_text_to_tx_df(raw)
-    daily = expand_to_daily(tx)
-    by_loan, by_company = build_views(daily)
+    view = view if view in ("daily", "by_company") else "by_loan"
+    export.check_format(fmt)
+    start_day, end_day = _parse_date(start, "start"), _parse_date(end, "end")
+    if start_day and end_day and start_day > end_day:
+        raise export.ExportError(f"start {start} is after end {end}")
+    df = await compute.run(request, _export_frame, request.cookies.get(SESSION_COOKIE), view, columns, start_day, end_day)
+
+    media_type, suffix = export.FORMATS[fmt]
+    return StreamingResponse(
+        export.stream(df, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="kameo-{view}{suffix}"'},
+    )
+
+
+@app.get("/health", include_in_schema=False)
+async def health():
+    """Liveness for systemd/Caddy. Svarer uten å røre pandas, også mens oppvarmingen pågår."""
+    return JSONResponse({
+        "status": "ok",
+        "warm": startup["warm_up_seconds"] is not None,
+        "pandas_loaded": "pandas" in sys.modules,
+        **startup,
+    })
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus-tekstformat: request-tall, latens-histogram per rute og per pipeline-steg."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-    if view == "daily":
-        df = daily
-    elif view == "by_company":
-        df = by_company
-    else:
-        df = by_loan
 
-    csv = df.to_csv(index=False).encode("utf-8")
-    return StreamingResponse(iter([csv]), media_type="text/csv")
+startup["import_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 3)
@@ -1,8 +1,8 @@
 from __future__ import annotations
 import re
 from typing import Tuple
+import numpy as np
 import pandas as pd
-from dateutil.relativedelta import relativedelta
 
 # ---------- Helpers ----------
 
@@ -16,26 +16,46 @@ _TX_SV_NO = {
     "Dröjsmålsränta": "Forsinkelsesrente",
 }
 
-def _canon_tx(tx: str) -> str:
-    """Normaliser transaksjonstype til norsk."""
-    tx = (tx or "").strip()
-    return _TX_SV_NO.get(tx, tx)
+# Transaksjonstype -> normalisert nøkkel brukt videre i appen
+_TX_NORM = {
+    "Renteinntekt": "interest",
+    "Forsinkelsesrente": "interest_penalty",
+    "Tildeling": "allocation",
+    "Tilbakebetaling": "principal_repaid",
+}
+
+# Norsk: "<Company> - <loan_id> | Løpetid: <m> m | Rente: <r>%"
+# Svensk: "<Company> - <loan_id> | Löptid: <m> m | Ränta: <r>%"
+_HEADER_RE = re.compile(
+    r"^(.*?)\s*-\s*(\d+)\s*\|\s*(?:Løpetid|Löptid):\s*([\d]+)\s*m.*?\|\s*(?:Rente|Ränta):\s*([\d,]+)%",
+    flags=re.IGNORECASE,
+)
+
+# Tittelrad kan hete "Dato" (NO) eller "Datum" (SE), footer likeså
+_TITLE_PREFIX = ("Dato", "Datum")
+_FOOTER_PREFIX = ("Totale renteinntekter", "Totala ränteintäkter")
+
+# Rader som bufres som tekst før de konverteres til typede kolonner
+STREAM_CHUNK_ROWS = 50_000
+
+TX_COLUMNS = ["date", "transaction", "amount", "currency",
+              "company", "loan_id", "duration_months", "interest_rate",
+              "transaction_norm"]
+
+# Kompakt lagring: gjentatte strenger som category, små heltall nedskalert.
+# Beløp og rente forblir float64 (summene skal stemme på øret).
+TX_DTYPES = {
+    "transaction": "category",
+    "currency": "category",
+    "company": "category",
+    "loan_id": "int32",
+    "duration_months": "int16",
+    "transaction_norm": "category",
+}
 
-def _parse_decimal_no(x: str) -> float:
-    x = (x or "").strip()
-    if x in {"-", ""}:
-        return 0.0
-    x = x.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("−", "-")
-    return float(x)
 
 def _parse_header(line: str):
-    # Norsk: "<Company> - <loan_id> | Løpetid: <m> m | Rente: <r>%"
-    # Svensk: "<Company> - <loan_id> | Löptid: <m> m | Ränta: <r>%"
-    m = re.match(
-        r"^(.*?)\s*-\s*(\d+)\s*\|\s*(?:Løpetid|Löptid):\s*([\d]+)\s*m.*?\|\s*(?:Rente|Ränta):\s*([\d,]+)%",
-        line,
-        flags=re.IGNORECASE,
-    )
+    m = _HEADER_RE.match(line)
     if not m:
         return None
     return {
@@ -45,145 +65,369 @@ def _parse_header(line: str):
         "interest_rate": float(m.group(4).replace(",", ".")),
     }
 
-def _parse_table(block: str) -> pd.DataFrame:
-    lines = block.strip().splitlines()
-    # Tittelrad kan hete "Dato" (NO) eller "Datum" (SE)
-    try:
-        start_idx = next(i for i, l in enumerate(lines) if l.strip().startswith(("Dato", "Datum")))
-    except StopIteration:
-        return pd.DataFrame()
-
-    rows = []
-    for r in lines[start_idx + 1:]:
-        # Footer kan være norsk eller svensk
-        if r.strip().startswith(("Totale renteinntekter", "Totala ränteintäkter")):
-            break
-        rows.append(r)
-
-    parsed = []
-    for r in rows:
-        parts = r.split("\t") if "\t" in r else re.split(r"\s{2,}", r.strip())
-        parts = (parts + [""] * 6)[:6]
-        date_s, trans, amount_s, currency, _, amount_nok_s = parts[:6]
-        parsed.append({
-            "date": pd.to_datetime(date_s.strip(), format="%Y-%m-%d", errors="coerce"),
-            "transaction": _canon_tx(trans),  # <- normaliser til norsk
-            "amount": _parse_decimal_no(amount_nok_s if amount_nok_s.strip() else amount_s),
-            "currency": (currency or "NOK").strip() or "NOK",
-        })
-
-    return pd.DataFrame(parsed).dropna(subset=["date"]).reset_index(drop=True)
 
-# ---------- Public API ----------
+def _lookup(values: pd.Series, mapping: dict) -> np.ndarray:
+    """Map via the distinct values only (a handful of transaction types, many rows)."""
+    codes, uniques = pd.factorize(values)
+    mapped = np.array([mapping.get(u, u) for u in uniques], dtype=object)
+    return mapped[codes]
+
+
+def _parse_decimals(s: pd.Series) -> np.ndarray:
+    """Vectorised `_parse_decimal_no`: "−2 000,50" -> -2000.5, "-"/"" -> 0.0."""
+    s = s.str.strip()
+    zero = s.isin(["-", ""])
+    s = (s.str.replace("\xa0", "", regex=False)
+          .str.replace(" ", "", regex=False)
+          .str.replace(",", ".", regex=False)
+          .str.replace("−", "-", regex=False))
+    s[zero] = "0"
+    # object -> float64 bruker Python float() per celle, samme regler og feil som før
+    return s.to_numpy(dtype=object).astype(np.float64)
+
+
+def _split_cells(rows: pd.Series) -> pd.DataFrame:
+    """Tab-separated rows split on tabs, pasted rows on 2+ spaces; always 6 columns."""
+    has_tab = rows.str.contains("\t", regex=False)
+    parts = pd.DataFrame("", index=rows.index, columns=range(6), dtype=object)
+    for mask, split in (
+        (has_tab, lambda r: r.str.split("\t", regex=False, expand=True)),
+        (~has_tab, lambda r: r.str.strip().str.split(r"\s{2,}", regex=True, expand=True)),
+    ):
+        if mask.any():
+            cells = split(rows[mask]).iloc[:, :6].fillna("")
+            parts.loc[mask, list(cells.columns)] = cells.to_numpy()
+    return parts
+
+
+def _iter_lines(stream):
+    """Text chunks (file lines, a list of lines) -> lines, split exactly like str.splitlines()."""
+    for chunk in stream:
+        yield from chunk.splitlines()
+
+
+def _scan(lines):
+    """
+    One pass over the export. Yields `(block, match)` for every loan header
+    and `(block, row)` for every transaction row line, where `block` counts
+    headers (rows belong to the header above them).
+
+    Per block: rows start after the first title line and stop at the first
+    footer. The last non-blank line of a block loses trailing whitespace,
+    as it did when blocks were joined and strip()'ed.
+    """
+    block = 0
+    title = footer = False
+    pending = None       # forrige rad, holdes til vi vet om den er blokkens siste
+    for line in lines:
+        m = _HEADER_RE.match(line)
+        if m:
+            if pending is not None:
+                yield block, pending.rstrip()
+                pending = None
+            block += 1
+            title = footer = False
+            yield block, m
+        elif block == 0:
+            continue
 
-def parse_text_to_tx_df(raw: str) -> pd.DataFrame:
-    # Tom-robust: returner riktig-formet DF
-    empty_cols = ["date","transaction","amount","currency",
-                  "company","loan_id","duration_months","interest_rate",
-                  "transaction_norm"]
-    if not raw or not raw.strip():
-        return pd.DataFrame(columns=empty_cols)
-
-    lines = raw.splitlines()
-    heads = [i for i, l in enumerate(lines) if _parse_header(l)]
-    if not heads:
-        return pd.DataFrame(columns=empty_cols)
-
-    blocks = ["\n".join(lines[heads[i]: heads[i+1] if i+1 < len(heads) else len(lines)])
-              for i in range(len(heads))]
-
-    rows = []
-    for b in blocks:
-        h = _parse_header(b.splitlines()[0]);  t = _parse_table(b)
-        if not h or t.empty:
+        stripped = line.strip()
+        if not stripped or footer:
+            continue
+        if not title:
+            # Header-linjen sjekkes også (som før); tittelraden selv er ikke en rad
+            title = stripped.startswith(_TITLE_PREFIX)
             continue
-        for k, v in h.items():
-            t[k] = v
-        rows.append(t)
-
-    if not rows:
-        return pd.DataFrame(columns=empty_cols)
-
-    tx = (pd.concat(rows, ignore_index=True)
-            .sort_values(["loan_id", "date"])
-            .reset_index(drop=True))
-
-    # Norsk -> normalisert nøkkel brukt videre i appen
-    tx["transaction_norm"] = tx["transaction"].replace({
-        "Renteinntekt": "interest",
-        "Forsinkelsesrente": "interest_penalty",
-        "Tildeling": "allocation",
-        "Tilbakebetaling": "principal_repaid",
+        if pending is not None:
+            yield block, pending
+            pending = None
+        if stripped.startswith(_FOOTER_PREFIX):
+            footer = True
+        else:
+            pending = line
+    if pending is not None:
+        yield block, pending.rstrip()
+
+
+def _rows_to_frame(rows: list, blocks: list) -> pd.DataFrame:
+    """Raw row lines -> typed columns (rows without a valid date are dropped)."""
+    cells = _split_cells(pd.Series(rows, dtype=object))
+    amount_src = cells[5].where(cells[5].str.strip().ne(""), cells[2])
+    currency = cells[3].str.strip()
+    currency = currency.where(currency.ne(""), "NOK")
+    frame = pd.DataFrame({
+        "date": pd.to_datetime(cells[0].str.strip(), format="%Y-%m-%d", errors="coerce"),
+        "transaction": _lookup(cells[1].str.strip(), _TX_SV_NO),  # <- normaliser til norsk
+        "amount": _parse_decimals(amount_src),
+        "currency": _lookup(currency, {}),   # deler strengobjektene, sparer minne
+        "_block": np.asarray(blocks, dtype=np.int64),
     })
-    return tx
+    return frame.dropna(subset=["date"])
+
+
+# ---------- Public API ----------
+
+def parse_stream_to_tx_df(stream, chunk_rows: int = STREAM_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Kameo export -> one row per transaction, sorted by loan and date.
+
+    `stream` is any iterable of text: an open text file, an UploadFile
+    wrapped in io.TextIOWrapper, or a list of lines. Lines are scanned once
+    and row text is buffered at most `chunk_rows` lines at a time before it
+    is converted to typed columns, so memory stays bounded by the parsed
+    result rather than the size of the upload.
+    """
+    heads = {}
+    parts = []
+    rows, blocks = [], []
+    for block, item in _scan(_iter_lines(stream)):
+        if isinstance(item, str):
+            rows.append(item)
+            blocks.append(block)
+            if len(rows) >= chunk_rows:
+                parts.append(_rows_to_frame(rows, blocks))
+                rows, blocks = [], []
+        else:
+            heads[block] = item.groups()
+    if rows:
+        parts.append(_rows_to_frame(rows, blocks))
+
+    tx = pd.concat(parts, ignore_index=True) if parts else None
+    # Tom-robust: returner riktig-formet DF
+    if tx is None or tx.empty:
+        return pd.DataFrame(columns=TX_COLUMNS)
 
+    # Header-feltene per blokk, slått opp på blokknummer
+    h = pd.DataFrame.from_dict(heads, orient="index")
+    b = tx.pop("_block")
+    tx["company"] = h[0].str.strip().reindex(b).to_numpy()
+    tx["loan_id"] = h[1].astype(np.int64).reindex(b).to_numpy()
+    tx["duration_months"] = h[2].astype(np.int64).reindex(b).to_numpy()
+    tx["interest_rate"] = h[3].str.replace(",", ".", regex=False).astype(np.float64).reindex(b).to_numpy()
 
-def expand_to_daily(tx_df: pd.DataFrame) -> pd.DataFrame:
-    # (Uendret logikk – bruker nå norsk-transaksjoner uansett kilde)
+    tx = tx.sort_values(["loan_id", "date"], kind="stable").reset_index(drop=True)
+    tx["transaction_norm"] = _lookup(tx["transaction"], _TX_NORM)
+    return compact_tx(tx)
+
+
+def compact_tx(tx: pd.DataFrame) -> pd.DataFrame:
+    """Transactions with the TX_DTYPES schema (what the parser returns)."""
+    if tx.empty:
+        return tx
+    dtypes = dict(TX_DTYPES)
+    if tx["loan_id"].max() > np.iinfo(np.int32).max:
+        dtypes.pop("loan_id")
+    return tx.astype(dtypes)
+
+
+def parse_text_to_tx_df(raw: str) -> pd.DataFrame:
+    """Same as parse_stream_to_tx_df, for text already in memory (paste, demo)."""
+    return parse_stream_to_tx_df((raw or "").splitlines())
+
+
+LOAN_COLUMNS = ["loan_id", "Company", "duration", "interest",
+                "invested", "accumulated_interest", "estimated_total_interest",
+                "interest_return_pct", "last_payment_date", "is_repaid",
+                "first_date", "first_interest_date", "last_principal_date"]
+
+_INTEREST_TYPES = ["interest", "interest_penalty"]
+
+
+def _add_months(dates: pd.Series, months: pd.Series) -> pd.Series:
+    """dates + relativedelta(months=n) row by row, one DateOffset per distinct n."""
+    out = pd.Series(pd.NaT, index=dates.index, dtype="datetime64[ns]")
+    for n in pd.unique(months):
+        m = months == n
+        out[m] = dates[m] + pd.DateOffset(months=int(n))
+    return out
+
+
+def _split_by_loan(loan_ids: np.ndarray, values: np.ndarray) -> dict:
+    """loan_id -> its slice of `values` (inputs sorted by loan_id)."""
+    if len(loan_ids) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, loan_ids[1:] != loan_ids[:-1]])
+    return dict(zip(loan_ids[starts].tolist(), np.split(values, starts[1:])))
+
+
+def summarize_loans(tx_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per loan, straight from the transaction events.
+
+    Gives the same numbers as aggregating expand_to_daily() per loan: the
+    "daily" window runs from the first allocation (`first_date`) to the
+    later of the last transaction and the planned maturity, amounts are
+    summed per day, and accumulated interest is the running sum. Only
+    days with transactions are touched, never one row per calendar day.
+    Per-loan sums use numpy on each loan's slice so the floats match the
+    per-group Series.sum()/cumsum() of the daily version bit for bit.
+    """
     if tx_df.empty:
-        return pd.DataFrame(columns=[
-            "Company","loan_id","duration","interest","Date","Amount",
-            "interest_amount","principal_amount","accumulated_interest",
-            "invested","is_repaid","last_payment_date",
-            "estimated_total_interest","interest_return_pct"
-        ])
+        return pd.DataFrame(columns=LOAN_COLUMNS)
+
+    tx = tx_df.sort_values("loan_id", kind="stable")
+    norm = tx["transaction_norm"]
+    is_alloc = norm.eq("allocation").to_numpy()
+    is_int = norm.isin(_INTEREST_TYPES).to_numpy()
+    is_pri = norm.eq("principal_repaid").to_numpy()
+
+    meta = tx.drop_duplicates("loan_id").set_index("loan_id")
+    loans = pd.DataFrame({
+        "Company": meta["company"],
+        "duration": meta["duration_months"],
+        "interest": meta["interest_rate"],
+    })
 
-    def _expand(g: pd.DataFrame) -> pd.DataFrame:
-        meta = g.iloc[0][["company", "loan_id", "duration_months", "interest_rate"]]
-        start = g[g["transaction_norm"] == "allocation"]["date"].min()
-        last  = g["date"].max()
-        est_end = start + relativedelta(months=int(meta["duration_months"]))
-        idx = pd.date_range(start=start, end=max(last, est_end), freq="D")
-        daily = pd.DataFrame({"date": idx})
-
-        daily["Amount"] = g.groupby("date")["amount"].sum().reindex(idx, fill_value=0.0).values
-        for c in ["company", "loan_id", "duration_months", "interest_rate"]:
-            daily[c] = meta[c]
-
-        is_int = g["transaction_norm"].isin(["interest", "interest_penalty"])
-        interest_by_day = (g.loc[is_int, ["date", "amount"]]
-                             .groupby("date").sum()
-                             .reindex(idx, fill_value=0.0))["amount"]
-        principal_by_day = (g.loc[g["transaction_norm"]=="principal_repaid", ["date","amount"]]
-                              .groupby("date").sum()
-                              .reindex(idx, fill_value=0.0))["amount"]
-        daily["interest_amount"] = interest_by_day.values
-        daily["principal_amount"] = principal_by_day.values
-        daily["accumulated_interest"] = interest_by_day.cumsum().values
-
-        invested = -g.loc[g["transaction_norm"] == "allocation", "amount"].sum()
-        repaid_sum =  g.loc[g["transaction_norm"] == "principal_repaid", "amount"].sum()
-        daily["invested"]  = float(invested)
-        daily["is_repaid"] = bool(repaid_sum >= invested and repaid_sum > 0)
-        daily["last_payment_date"] = g.loc[
-            g["transaction_norm"].isin(["interest","interest_penalty","principal_repaid"]), "date"
-        ].max()
-
-        monthly_interest = invested * (meta["interest_rate"] / 100.0) / 12.0
-        daily["estimated_total_interest"] = float(monthly_interest * meta["duration_months"])
-        daily["interest_return_pct"] = (
-            (daily["accumulated_interest"] / daily["estimated_total_interest"]).clip(upper=1.0).fillna(0.0) * 100.0
-        )
-        return daily
-
-    daily_df = (tx_df.groupby("loan_id", group_keys=False)
-                    .apply(_expand)
-                    .reset_index(drop=True)
-                    .rename(columns={
-                        "company": "Company",
-                        "loan_id": "loan_id",
-                        "duration_months": "duration",
-                        "interest_rate": "interest",
-                        "date": "Date",
-                    })
-                    .sort_values(["Company", "loan_id", "Date"])
-                    .reset_index(drop=True))
-    return daily_df
-
-
-def build_views(daily_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
-    # (Uendret logikk)
-    if daily_df.empty:
+    dates = tx.groupby("loan_id")["date"]
+    first = tx.loc[is_alloc].groupby("loan_id")["date"].min().reindex(loans.index)
+    first = first.fillna(dates.min())   # lån uten tildeling: fra første transaksjon
+
+    # Dagssummer innenfor vinduet, som interest_amount/principal_amount i daily
+    in_window = (tx["date"] >= first.reindex(tx["loan_id"]).to_numpy()).to_numpy()
+    int_days = tx.loc[is_int & in_window].groupby(["loan_id", "date"])["amount"].sum()
+    pri_days = tx.loc[is_pri & in_window].groupby(["loan_id", "date"])["amount"].sum()
+
+    loan_ids = tx["loan_id"].to_numpy()
+    amount = tx["amount"].to_numpy(dtype=np.float64)
+    alloc = _split_by_loan(loan_ids[is_alloc], amount[is_alloc])
+    repaid = _split_by_loan(loan_ids[is_pri], amount[is_pri])
+    int_day_values = _split_by_loan(
+        int_days.index.get_level_values("loan_id").to_numpy(), int_days.to_numpy()
+    )
+    first_event_day = int_days.reset_index().groupby("loan_id")["date"].min()
+
+    empty = np.zeros(0)
+    invested, is_repaid, acc_max, acc_values = [], [], [], []
+    for loan_id, start in zip(loans.index.tolist(), first.tolist()):
+        inv = -alloc.get(loan_id, empty).sum()
+        rep = repaid.get(loan_id, empty).sum()
+        invested.append(float(inv))
+        is_repaid.append(bool(rep >= inv and rep > 0))
+
+        acc = np.cumsum(int_day_values.get(loan_id, empty))
+        # Dager før første rentedag har akkumulert rente 0
+        if len(acc) == 0 or first_event_day[loan_id] > start:
+            acc = np.r_[0.0, acc]
+        acc_max.append(acc.max())
+        acc_values.append(acc)
+
+    loans["invested"] = invested
+    loans["accumulated_interest"] = acc_max
+    monthly_interest = loans["invested"] * (loans["interest"] / 100.0) / 12.0
+    loans["estimated_total_interest"] = monthly_interest * loans["duration"]
+
+    # Høyeste daglige interest_return_pct, regnet over de akkumulerte verdiene
+    pct = []
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for acc, est in zip(acc_values, loans["estimated_total_interest"].tolist()):
+            r = np.minimum(acc / est, 1.0)
+            r[np.isnan(r)] = 0.0
+            pct.append(r.max() * 100.0)
+    loans["interest_return_pct"] = pct
+
+    loans["last_payment_date"] = tx.loc[is_int | is_pri].groupby("loan_id")["date"].max()
+    loans["is_repaid"] = is_repaid
+    loans["first_date"] = first
+    loans["first_interest_date"] = int_days[int_days.abs() > 0].reset_index().groupby("loan_id")["date"].min()
+    loans["last_principal_date"] = pri_days[pri_days.abs() > 0].reset_index().groupby("loan_id")["date"].max()
+    for c in ["last_payment_date", "first_interest_date", "last_principal_date"]:
+        loans[c] = pd.to_datetime(loans[c])
+
+    # Sammendraget er lite: vanlige dtypes, uavhengig av TX_DTYPES
+    loans = loans.rename_axis("loan_id").reset_index()[LOAN_COLUMNS]
+    return loans.astype({"loan_id": "int64", "Company": object, "duration": "int64"})
+
+
+DAILY_COLUMNS = ["Date", "Amount", "Company", "loan_id", "duration", "interest",
+                 "interest_amount", "principal_amount", "accumulated_interest",
+                 "invested", "is_repaid", "last_payment_date",
+                 "estimated_total_interest", "interest_return_pct"]
+# Konstant per lån: ligger i sidetabellen, ikke på hver dagsrad
+DAILY_LOAN_COLUMNS = ["loan_id", "Company", "duration", "interest", "invested",
+                      "is_repaid", "last_payment_date", "estimated_total_interest"]
+
+
+def daily_frames(tx_df: pd.DataFrame, start=None, end=None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    The daily view as two frames: one row per loan per calendar day with
+    only the columns that change from day to day, and a side table with
+    the per-loan constants (DAILY_LOAN_COLUMNS), to be joined on loan_id
+    when the wide rows are actually needed.
+
+    A loan's days run from its first allocation to the later of its last
+    transaction and planned maturity. With `start`/`end` (inclusive) only
+    loans whose window overlaps the range are expanded, and only days
+    inside it are kept. Rows are ordered by Company, loan_id, Date.
+    """
+    day_columns = ["loan_id", "Date", "Amount", "interest_amount", "principal_amount",
+                   "accumulated_interest", "interest_return_pct"]
+    if tx_df.empty:
+        return pd.DataFrame(columns=day_columns), pd.DataFrame(columns=DAILY_LOAN_COLUMNS)
+
+    loans = summarize_loans(tx_df).set_index("loan_id")
+    first = loans["first_date"]
+    last = np.maximum(tx_df.groupby("loan_id")["date"].max().reindex(loans.index),
+                      _add_months(first, loans["duration"]))
+    keep = pd.Series(True, index=loans.index)
+    if start is not None:
+        keep &= last >= pd.Timestamp(start)
+    if end is not None:
+        keep &= first <= pd.Timestamp(end)
+    loans = loans[keep].reset_index().sort_values(["Company", "loan_id"]).set_index("loan_id")
+    first, last = first[loans.index], last[loans.index]
+
+    # Én rad per dag i hvert låns vindu
+    n_days = ((last - first).dt.days + 1).to_numpy()
+    loan_ids = np.repeat(loans.index.to_numpy(), n_days)
+    offset = np.arange(n_days.sum()) - np.repeat(np.cumsum(n_days) - n_days, n_days)
+    dates = np.repeat(first.to_numpy(), n_days) + offset.astype("timedelta64[D]")
+    days = pd.MultiIndex.from_arrays([loan_ids, dates], names=["loan_id", "date"])
+
+    norm = tx_df["transaction_norm"]
+    by_day = lambda mask: (tx_df.loc[mask].groupby(["loan_id", "date"], observed=True)["amount"].sum()
+                           .reindex(days, fill_value=0.0).to_numpy())
+    interest = by_day(norm.isin(_INTEREST_TYPES))
+    # Løpende rentesum per lån (hvert låns dager ligger samlet)
+    bounds = np.cumsum(n_days)[:-1]
+    accumulated = np.concatenate([np.cumsum(x) for x in np.split(interest, bounds)]) if len(interest) else interest
+
+    est = pd.Series(np.repeat(loans["estimated_total_interest"].to_numpy(), n_days))
+    daily = pd.DataFrame({
+        "loan_id": loan_ids.astype(tx_df["loan_id"].dtype),
+        "Date": dates,
+        "Amount": by_day(slice(None)),
+        "interest_amount": interest,
+        "principal_amount": by_day(norm.eq("principal_repaid")),
+        "accumulated_interest": accumulated,
+        "interest_return_pct": (pd.Series(accumulated) / est).clip(upper=1.0).fillna(0.0) * 100.0,
+    })
+    if start is not None or end is not None:
+        in_range = pd.Series(True, index=daily.index)
+        if start is not None:
+            in_range &= daily["Date"] >= pd.Timestamp(start)
+        if end is not None:
+            in_range &= daily["Date"] <= pd.Timestamp(end)
+        daily = daily[in_range].reset_index(drop=True)
+
+    side = loans.reset_index()[DAILY_LOAN_COLUMNS]
+    return daily, side
+
+
+def expand_to_daily(tx_df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """
+    One row per loan per calendar day, every column on every row (see
+    daily_frames() for the compact form). Only used for the `daily`
+    export; the dashboard works on summarize_loans() instead.
+    """
+    daily, side = daily_frames(tx_df, start, end)
+    if daily.empty:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    return daily.merge(side, on="loan_id", how="left")[DAILY_COLUMNS]
+
+
+def build_views(loans: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Per-loan and per-company tables from summarize_loans()."""
+    if loans.empty:
         by_loan = pd.DataFrame(columns=[
             "loan_id","Company","duration","interest","start_date","end_date",
             "invested","accumulated_interest","estimated_total_interest",
@@ -196,160 +440,180 @@ def build_views(daily_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
         ])
         return by_loan, by_company
 
-    # ... (samme som din versjon) ...
-    from dateutil.relativedelta import relativedelta
-
-    start_end_rows = []
-    for loan_id, g in daily_df.groupby("loan_id"):
-        g = g.sort_values("Date")
-        duration = int(g["duration"].iloc[0])
-
-        int_mask = (g["interest_amount"].abs() > 0)
-        if int_mask.any():
-            start_dt = pd.to_datetime(g.loc[int_mask, "Date"].min())
-        else:
-            start_dt = pd.to_datetime(g["Date"].min())
-
-        end_dt = start_dt + relativedelta(months=+duration)
-        start_end_rows.append((loan_id, start_dt, end_dt))
-
-    start_end_df = pd.DataFrame(start_end_rows, columns=["loan_id", "start_date", "end_date"])
-
-    by_loan = (daily_df.groupby(["loan_id", "Company", "duration", "interest"], as_index=False)
-        .agg(
-            invested=("invested", "max"),
-            accumulated_interest=("accumulated_interest", "max"),
-            estimated_total_interest=("estimated_total_interest", "max"),
-            interest_return_pct=("interest_return_pct", "max"),
-            last_payment_date=("last_payment_date", "max"),
-            repaid=("is_repaid", "max"),
-        )
-    ).merge(start_end_df, on="loan_id", how="left")
-
-    def repayment_date_for_group(g: pd.DataFrame) -> pd.Timestamp:
-        mask_pri = (g["principal_amount"].abs() > 0)
-        if mask_pri.any():
-            return pd.to_datetime(g.loc[mask_pri, "Date"].max())
-        mask_int = (g["interest_amount"].abs() > 0)
-        duration = int(g["duration"].iloc[0])
-        if mask_int.any():
-            first_interest = pd.to_datetime(g.loc[mask_int, "Date"].min())
-            return first_interest + relativedelta(months=+duration)
-        first_date = pd.to_datetime(g["Date"].min())
-        return first_date + relativedelta(months=+duration)
-
-    rep_dates = []
-    for loan_id, g in daily_df.groupby("loan_id"):
-        rep_dates.append((loan_id, repayment_date_for_group(g)))
-    rep_df = pd.DataFrame(rep_dates, columns=["loan_id", "repayment_date"])
-    by_loan = by_loan.merge(rep_df, on="loan_id", how="left")
-
-    def _status(row):
-        if row["repaid"]:
-            return "repaid"
-        if pd.isna(row["last_payment_date"]) or row["accumulated_interest"] == 0:
-            return "assigned"
-        return "active"
-    by_loan["status"] = by_loan.apply(_status, axis=1)
-
-    by_company = (by_loan.groupby(["Company"], as_index=False)
+    # Løpetiden regnes fra første rentedag (ellers fra tildeling)
+    start = loans["first_interest_date"].fillna(loans["first_date"])
+    end = _add_months(start, loans["duration"])
+
+    by_loan = loans[["loan_id", "Company", "duration", "interest",
+                     "invested", "accumulated_interest", "estimated_total_interest",
+                     "interest_return_pct", "last_payment_date"]].assign(
+        repaid=loans["is_repaid"].astype(bool),
+        start_date=start,
+        end_date=end,
+        # Siste dag med avdrag, ellers planlagt forfall
+        repayment_date=loans["last_principal_date"].fillna(end),
+    )
+    by_loan["status"] = np.select(
+        [by_loan["repaid"],
+         by_loan["last_payment_date"].isna() | by_loan["accumulated_interest"].eq(0)],
+        ["repaid", "assigned"],
+        default="active",
+    ).astype(object)
+
+    counts = (pd.crosstab(by_loan["Company"], by_loan["status"])
+                .reindex(columns=["active", "repaid", "assigned"], fill_value=0)
+                .add_suffix("_loans")
+                .rename_axis(columns=None))
+    by_company = (by_loan.groupby("Company")
         .agg(
             loans=("loan_id", "count"),
             invested=("invested", "sum"),
             accumulated_interest=("accumulated_interest", "sum"),
             estimated_total_interest=("estimated_total_interest", "sum"),
-            active_loans=("status", lambda s: (s == "active").sum()),
-            repaid_loans=("status", lambda s: (s == "repaid").sum()),
-            assigned_loans=("status", lambda s: (s == "assigned").sum()),
         )
-        .assign(
-            interest_return_pct=lambda d:
-                (d["accumulated_interest"] / d["estimated_total_interest"].replace(0, pd.NA)) * 100
-        )
-        .fillna({"interest_return_pct": 0.0})
-        .sort_values(["Company"])
-        .reset_index(drop=True)
+        .join(counts)
+        .reset_index()
     )
+    est = by_company["estimated_total_interest"]
+    by_company["interest_return_pct"] = (
+        by_company["accumulated_interest"] / est.where(est != 0) * 100
+    ).fillna(0.0)
 
     return by_loan, by_company
 
+MONTHLY_COLUMNS = ["interest_actual", "principal_actual", "interest_estimated", "principal_estimated"]
 
-def build_monthly_series(tx_df: pd.DataFrame, daily_df: pd.DataFrame) -> pd.DataFrame:
-    # (Uendret logikk)
-    if tx_df.empty or daily_df.empty:
-        return pd.DataFrame(
-            columns=["interest_actual", "principal_actual", "interest_estimated", "principal_estimated"],
-            dtype="float64",
-        )
 
-    tx = tx_df.copy()
+def _this_month() -> pd.Timestamp:
+    today = pd.Timestamp.today().normalize()
+    return pd.Timestamp(today.year, today.month, 1)
+
+
+def _estimate_rows(tx_df: pd.DataFrame, loans: pd.DataFrame, this_month: pd.Timestamp) -> pd.DataFrame:
+    """
+    Estimates for open loans: interest every remaining month of the term and
+    the outstanding principal as a bullet in the last term month. Rows come
+    loan by loan (interest months, then principal), so the grouped sums add
+    in the same order as the old per-loan loop.
+    """
+    open_loans = loans[~loans["is_repaid"].astype(bool) & (loans["duration"] >= 1)]
+    start = open_loans["first_interest_date"].fillna(open_loans["first_date"]).to_numpy().astype("datetime64[M]")
+    maturity = start + (open_loans["duration"].to_numpy(dtype=np.int64) - 1)
+    this_m = np.datetime64(this_month, "M")
+    invested = open_loans["invested"].to_numpy(dtype=np.float64)
+    monthly_interest = (open_loans["invested"] * (open_loans["interest"] / 100.0) / 12.0).to_numpy()
+
+    # Rente: én rad per gjenstående terminmåned
+    first = np.maximum(start, this_m)
+    n = np.maximum((maturity - first).astype(np.int64) + 1, 0)
+    pos = np.repeat(np.arange(len(open_loans)), n)
+    offset = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+
+    # Hovedstol: det som ikke er tilbakebetalt før denne måneden, i forfallsmåneden
+    before = tx_df[tx_df["transaction_norm"].eq("principal_repaid") & (tx_df["date"] < this_month)]
+    before = before.sort_values("loan_id", kind="stable")
+    paid = _split_by_loan(before["loan_id"].to_numpy(), before["amount"].fillna(0.0).to_numpy(dtype=np.float64))
+    empty = np.zeros(0)
+    remaining = np.maximum(0.0, invested - [float(paid.get(i, empty).sum()) for i in open_loans["loan_id"].tolist()])
+    bullet = np.flatnonzero((maturity >= this_m) & (remaining > 0))
+
+    rows = pd.DataFrame({
+        "pos": np.r_[pos, bullet],
+        "kind": np.r_[np.zeros(len(pos), dtype=np.int8), np.ones(len(bullet), dtype=np.int8)],
+        "loan_id": open_loans["loan_id"].to_numpy()[np.r_[pos, bullet]],
+        "month": np.r_[first[pos] + offset, maturity[bullet]].astype("datetime64[ns]"),
+        "interest_estimated": np.r_[monthly_interest[pos], np.zeros(len(bullet))],
+        "principal_estimated": np.r_[np.zeros(len(pos)), remaining[bullet]],
+    })
+    order = np.lexsort((rows["kind"].to_numpy(), rows["pos"].to_numpy()))
+    return rows.iloc[order].drop(columns=["pos", "kind"]).reset_index(drop=True)
+
+
+def loan_month_parts(tx_df: pd.DataFrame, loans: pd.DataFrame, this_month: pd.Timestamp = None) -> dict:
+    """
+    The long frames build_loan_months() groups: actual interest and principal
+    rows and the estimate rows, each with a loan_id column. Every row belongs
+    to one loan, so the parts of unchanged loans can be kept and only the
+    changed loans' rows rebuilt (see replace_loan_month_parts()).
+    """
+    this_month = _this_month() if this_month is None else this_month
+    tx = tx_df[["loan_id", "date", "amount", "transaction_norm"]].copy()
     tx["month"] = pd.to_datetime(tx["date"]).values.astype("datetime64[M]")
-
-    is_int = tx["transaction_norm"].isin(["interest", "interest_penalty"])
+    tx["amount"] = tx["amount"].abs()
+    is_int = tx["transaction_norm"].isin(_INTEREST_TYPES)
     is_pri = tx["transaction_norm"].eq("principal_repaid")
-    actual = pd.DataFrame({
-        "interest_actual":  tx.loc[is_int, "amount"].abs().groupby(tx.loc[is_int, "month"]).sum(),
-        "principal_actual": tx.loc[is_pri, "amount"].abs().groupby(tx.loc[is_pri, "month"]).sum(),
-    }).fillna(0.0)
-
-    today = pd.Timestamp.today().normalize()
-    this_month = pd.Timestamp(today.year, today.month, 1)
+    return {
+        "month": this_month,
+        "interest_actual": tx.loc[is_int, ["loan_id", "month", "amount"]].rename(columns={"amount": "interest_actual"}),
+        "principal_actual": tx.loc[is_pri, ["loan_id", "month", "amount"]].rename(columns={"amount": "principal_actual"}),
+        "estimated": _estimate_rows(tx_df, loans, this_month),
+    }
 
-    est_rows = []
-    for loan_id, g in daily_df.groupby("loan_id"):
-        invested = float(g["invested"].max())
-        rate     = float(g["interest"].max())
-        duration = int(g["duration"].max())
 
-        if bool(g["is_repaid"].max()):
-            continue
+def replace_loan_month_parts(parts: dict, tx_df: pd.DataFrame, loans: pd.DataFrame, loan_ids) -> dict:
+    """
+    `parts` with the rows of `loan_ids` rebuilt from `tx_df`/`loans`. In a
+    new month every estimate moves, so then everything is rebuilt.
+    """
+    if parts["month"] != _this_month():
+        return loan_month_parts(tx_df, loans)
+    fresh = loan_month_parts(tx_df[tx_df["loan_id"].isin(loan_ids)],
+                             loans[loans["loan_id"].isin(loan_ids)], parts["month"])
+    out = {"month": parts["month"]}
+    for name in ("interest_actual", "principal_actual", "estimated"):
+        kept = parts[name][~parts[name]["loan_id"].isin(loan_ids)]
+        out[name] = pd.concat([kept, fresh[name]], ignore_index=True)
+    return out
+
+
+def build_loan_months(tx_df: pd.DataFrame, loans: pd.DataFrame, parts: dict = None) -> tuple[pd.DataFrame, dict]:
+    """
+    Actual and estimated interest/principal per loan and month (from summarize_loans()).
+
+    Returns the portfolio totals (one row per month, MONTHLY_COLUMNS) and a
+    loan x month matrix per column, {column: DataFrame(index=loan_id,
+    columns=months)}. Both come from the same two long frames (actual
+    transactions and estimate rows) with one groupby each, so the chart
+    totals and the per-loan series can't drift apart. Pass `parts` from
+    loan_month_parts() to skip building those frames.
+    """
+    if tx_df.empty or loans.empty:
+        return pd.DataFrame(columns=MONTHLY_COLUMNS, dtype="float64"), {}
+
+    if parts is None:
+        parts = loan_month_parts(tx_df, loans)
+    this_month = parts["month"]
+    actual_rows = {c: parts[c] for c in ("interest_actual", "principal_actual")}
+    est_rows = parts["estimated"]
+
+    # Porteføljen: summer per måned
+    actual = pd.DataFrame({
+        c: rows.groupby("month")[c].sum() for c, rows in actual_rows.items()
+    }).fillna(0.0)
+    est = est_rows.groupby("month")[["interest_estimated", "principal_estimated"]].sum()
+    monthly = actual.join(est, how="outer").fillna(0.0).sort_index()
 
-        int_mask = (g["interest_amount"].abs() > 0)
-        sched_start = (
-            pd.to_datetime(g.loc[int_mask, "Date"].min()) if int_mask.any()
-            else pd.to_datetime(g["Date"].min())
+    # Per lån: samme rader, gruppert på (lån, måned)
+    months = monthly.index
+    loan_ids = loans["loan_id"]
+    per_loan = {}
+    for c, rows in [*actual_rows.items(), ("interest_estimated", est_rows), ("principal_estimated", est_rows)]:
+        per_loan[c] = (
+            rows.groupby(["loan_id", "month"])[c].sum()
+            .unstack(fill_value=0.0)
+            .reindex(index=loan_ids, columns=months, fill_value=0.0)
         )
-        start_month = pd.Timestamp(sched_start.year, sched_start.month, 1)
-
-        months_all = pd.date_range(start=start_month, periods=duration, freq="MS")
-        if len(months_all) == 0:
-            continue
 
-        maturity_month = months_all[-1]
-        months_future = [m for m in months_all if m >= this_month]
-        monthly_interest = invested * (rate / 100.0) / 12.0 if duration > 0 else 0.0
-        for m in months_future:
-            est_rows.append({"month": m, "interest_estimated": monthly_interest, "principal_estimated": 0.0})
-
-        if maturity_month >= this_month:
-            principal_paid_before = tx_df.loc[
-                (tx_df["loan_id"] == loan_id) &
-                (tx_df["transaction_norm"] == "principal_repaid") &
-                (tx_df["date"] < this_month),
-                "amount"
-            ].sum()
-            remaining_principal = max(0.0, invested - float(principal_paid_before))
-            if remaining_principal > 0:
-                est_rows.append({
-                    "month": maturity_month,
-                    "interest_estimated": 0.0,
-                    "principal_estimated": remaining_principal,
-                })
-
-    est = pd.DataFrame(est_rows).groupby("month").sum() if est_rows else pd.DataFrame()
-    monthly = actual.join(est, how="outer").fillna(0.0).sort_index()
+    # Inneværende måned: estimatet er bare det som gjenstår etter faktiske betalinger
+    if this_month in months:
+        for est_col, act_col in [("interest_estimated", "interest_actual"), ("principal_estimated", "principal_actual")]:
+            monthly.loc[this_month, est_col] = max(0.0, monthly.loc[this_month, est_col] - monthly.loc[this_month, act_col])
+            m = per_loan[est_col]
+            m[this_month] = np.maximum(0.0, m[this_month] - per_loan[act_col][this_month])
 
-    if this_month in monthly.index:
-        monthly.loc[this_month, "interest_estimated"]  = max(
-            0.0, monthly.loc[this_month, "interest_estimated"]  - monthly.loc[this_month, "interest_actual"]
-        )
-        monthly.loc[this_month, "principal_estimated"] = max(
-            0.0, monthly.loc[this_month, "principal_estimated"] - monthly.loc[this_month, "principal_actual"]
-        )
+    return monthly[MONTHLY_COLUMNS].astype("float64"), per_loan
 
-    for c in ["interest_actual","principal_actual","interest_estimated","principal_estimated"]:
-        if c not in monthly.columns:
-            monthly[c] = 0.0
-        monthly[c] = pd.to_numeric(monthly[c], errors="coerce").fillna(0.0).astype("float64")
 
-    return monthly
+def build_monthly_series(tx_df: pd.DataFrame, loans: pd.DataFrame) -> pd.DataFrame:
+    """Portfolio totals per month from build_loan_months()."""
+    return build_loan_months(tx_df, loans)[0]
@@ -0,0 +1,203 @@
+"""
+Per-session dataset state: session id (cookie) -> the dataset last
+rendered in that session.
+
+A session points at a dataset key (hash of the raw export, see cache.py)
+plus its parsed transactions, which is all that is needed to rebuild the
+dashboard and the exports. Datasets are shared between sessions with the
+same key. Sessions expire after `ttl` seconds without use, and the least
+recently used ones are dropped when the transactions held exceed
+`max_bytes`.
+
+With `spill_dir` set, every session and dataset is also written to disk
+(one small file per session, one pickle per dataset). Another worker
+process that gets a request for a session it has not seen loads it from
+there, so `uvicorn --workers N` works without sticky sessions. The
+directory must only be writable by the app, since datasets are pickles.
+"""
+from __future__ import annotations
+
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .cache import sizeof
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_SID_RE = re.compile(r"[A-Za-z0-9_-]{20,64}")
+_KEY_RE = re.compile(r"[0-9a-f]{32}")
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def valid_session_id(sid) -> bool:
+    return bool(sid) and _SID_RE.fullmatch(sid) is not None
+
+
+def _write_atomic(path: Path, write):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class SessionStore:
+    def __init__(self, ttl: float = 12 * 3600, max_bytes: int = 256 << 20, spill_dir=None, clock=time.time):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._sessions = OrderedDict()   # sid -> [key, last_seen]
+        self._datasets = {}              # key -> [tx, nbytes, refs]
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.expired = 0
+        self.evicted = 0
+        self.spill_loads = 0
+        self._next_sweep = 0.0
+
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        if self.spill_dir is not None:
+            (self.spill_dir / "sessions").mkdir(parents=True, exist_ok=True)
+            (self.spill_dir / "datasets").mkdir(parents=True, exist_ok=True)
+
+    # ---- minne ----
+    def _drop(self, sid):
+        key, _ = self._sessions.pop(sid)
+        ds = self._datasets[key]
+        ds[2] -= 1
+        if ds[2] == 0:
+            del self._datasets[key]
+            self.nbytes -= ds[1]
+
+    def _expire(self, now: float):
+        # Eldste først, så vi kan stoppe ved første som fortsatt lever
+        while self._sessions:
+            sid, (_, seen) = next(iter(self._sessions.items()))
+            if now - seen <= self.ttl:
+                break
+            self._drop(sid)
+            self.expired += 1
+
+    def _put(self, sid, key, tx, now: float):
+        if sid in self._sessions:
+            self._drop(sid)
+        ds = self._datasets.get(key)
+        if ds is None:
+            nbytes = sizeof(tx)
+            ds = self._datasets[key] = [tx, nbytes, 0]
+            self.nbytes += nbytes
+        ds[2] += 1
+        self._sessions[sid] = [key, now]
+        # Minnetak: dropp minst nylig brukte sesjoner (disk-kopien beholdes)
+        while self.nbytes > self.max_bytes and len(self._sessions) > 1:
+            self._drop(next(iter(self._sessions)))
+            self.evicted += 1
+
+    # ---- disk ----
+    def _session_file(self, sid) -> Path:
+        return self.spill_dir / "sessions" / sid
+
+    def _dataset_file(self, key) -> Path:
+        return self.spill_dir / "datasets" / f"{key}.pkl"
+
+    def _spill(self, sid, key, tx):
+        path = self._dataset_file(key)
+        if not path.exists():
+            _write_atomic(path, lambda p: tx.to_pickle(p))
+        _write_atomic(self._session_file(sid), lambda p: p.write_text(key))
+
+    def _load_spilled(self, sid, now: float):
+        path = self._session_file(sid)
+        try:
+            if now - path.stat().st_mtime > self.ttl:
+                return None
+            key = path.read_text().strip()
+            if not _KEY_RE.fullmatch(key):
+                return None
+            import pandas as pd   # først her; appen starter uten pandas
+
+            tx = pd.read_pickle(self._dataset_file(key))
+        except (OSError, ValueError, EOFError):
+            return None
+        os.utime(path)
+        self.spill_loads += 1
+        return key, tx
+
+    def _sweep_disk(self, now: float):
+        """Slett utløpte sesjonsfiler og datasett ingen levende sesjon peker på."""
+        live = set()
+        for path in (self.spill_dir / "sessions").iterdir():
+            try:
+                if now - path.stat().st_mtime > self.ttl:
+                    path.unlink()
+                else:
+                    live.add(path.read_text().strip())
+            except OSError:
+                pass  # en annen worker ryddet samtidig
+        for path in (self.spill_dir / "datasets").iterdir():
+            try:
+                if path.stem not in live and now - path.stat().st_mtime > self.ttl:
+                    path.unlink()
+            except OSError:
+                pass
+
+    # ---- API ----
+    def get(self, sid):
+        """(dataset key, transactions) for the session, or None."""
+        if not valid_session_id(sid):
+            return None
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(sid)
+            if entry is not None:
+                entry[1] = now
+                self._sessions.move_to_end(sid)
+                key = entry[0]
+                tx = self._datasets[key][0]
+        if entry is not None:
+            if self.spill_dir is not None:
+                try:
+                    os.utime(self._session_file(sid))
+                except OSError:
+                    pass
+            return key, tx
+
+        if self.spill_dir is None:
+            return None
+        loaded = self._load_spilled(sid, now)
+        if loaded is not None:
+            with self._lock:
+                self._put(sid, *loaded, now)
+        return loaded
+
+    def set(self, sid, key: str, tx: pd.DataFrame):
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            self._put(sid, key, tx, now)
+        if self.spill_dir is not None:
+            self._spill(sid, key, tx)
+            if now >= self._next_sweep:
+                self._next_sweep = now + max(self.ttl / 10, 1.0)
+                self._sweep_disk(now)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "datasets": len(self._datasets),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "spill_loads": self.spill_loads,
+            }
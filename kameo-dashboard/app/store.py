@@ -0,0 +1,297 @@
+"""
+Persistent portfolio store (SQLite): every transaction ever uploaded,
+deduplicated, plus a per-loan summary that is kept up to date.
+
+Kameo exports are cumulative, so next month's export repeats almost all
+of this month's rows. merge() only inserts rows the store hasn't seen and
+recomputes summarize_loans() for the loans that got new rows; load() reads
+the stored columns back without any text parsing.
+
+SQLite is the source of truth. The first load() of each version also
+writes the transactions as one .npy file per column next to the database
+(`<name>.columns/v<version>/`), and later loads of that version, e.g. after
+a restart, memory-map those instead of turning every row into a Python
+tuple. Removing the directory is always safe, it is rebuilt on demand.
+
+Dedup key is (loan_id, date, transaction, amount) plus `n`, the running
+number among identical rows in the same export. Two identical interest
+payments on the same day in one export are both kept, but uploading an
+overlapping export again adds nothing.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .parser import LOAN_COLUMNS, TX_COLUMNS, compact_tx, parse_text_to_tx_df, summarize_loans
+
+KEY = ["loan_id", "date", "transaction", "amount"]
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    # Lesing av hele tabellen går rett fra page cache via mmap, uten read()-kopier
+    "mmap_size": int(os.getenv("KAMEO_STORE_MMAP_MB", "256")) * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    seq              INTEGER PRIMARY KEY,   -- rekkefølge rader ble lagt inn (= eksportrekkefølge)
+    loan_id          INTEGER NOT NULL,
+    date             TEXT    NOT NULL,      -- YYYY-MM-DD
+    "transaction"    TEXT    NOT NULL,
+    amount           REAL    NOT NULL,
+    n                INTEGER NOT NULL,
+    currency         TEXT,
+    company          TEXT,
+    duration_months  INTEGER,
+    interest_rate    REAL,
+    transaction_norm TEXT,
+    UNIQUE (loan_id, date, "transaction", amount, n)
+);
+CREATE TABLE IF NOT EXISTS loans (
+    loan_id                  INTEGER PRIMARY KEY,
+    company                  TEXT,
+    duration                 INTEGER,
+    interest                 REAL,
+    invested                 REAL,
+    accumulated_interest     REAL,
+    estimated_total_interest REAL,
+    interest_return_pct      REAL,
+    last_payment_date        TEXT,
+    is_repaid                INTEGER,
+    first_date               TEXT,
+    first_interest_date      TEXT,
+    last_principal_date      TEXT
+);
+CREATE TABLE IF NOT EXISTS loan_versions (
+    loan_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL              -- siste versjon som endret lånet
+);
+CREATE TABLE IF NOT EXISTS imports (
+    digest      TEXT PRIMARY KEY,           -- hash av råteksten, se cache.py
+    imported_at TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    new_rows    INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+_TX_SELECT = ", ".join(f'"{c}"' for c in TX_COLUMNS)
+_LOAN_DATES = ["last_payment_date", "first_date", "first_interest_date", "last_principal_date"]
+_LOAN_DB_COLUMNS = ["loan_id", "company", *LOAN_COLUMNS[2:]]
+
+
+def _iso(dates: pd.Series) -> list:
+    return dates.dt.strftime("%Y-%m-%d").astype(object).where(dates.notna(), None).tolist()
+
+
+class PortfolioStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.columns_dir = self.path.with_name(self.path.name + ".columns")
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection; commits on success, always closed."""
+        conn = sqlite3.connect(self.path)
+        try:
+            for name, value in PRAGMAS.items():
+                conn.execute(f"PRAGMA {name}={value}")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---- lesing ----
+    @property
+    def version(self) -> int:
+        """Bumped on every merge that adds rows; part of the cache key for the stored dataset."""
+        with self._connect() as conn:
+            return int(conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+
+    def has_import(self, digest: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM imports WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def _read_tx(self, conn, where: str = "", params=()) -> pd.DataFrame:
+        rows = conn.execute(f"SELECT {_TX_SELECT} FROM transactions {where} ORDER BY seq", params).fetchall()
+        if not rows:
+            return parse_text_to_tx_df("")
+        tx = pd.DataFrame.from_records(rows, columns=TX_COLUMNS)
+        tx["date"] = pd.to_datetime(tx["date"], format="%Y-%m-%d")
+        return compact_tx(tx.astype({"amount": "float64", "loan_id": "int64", "duration_months": "int64", "interest_rate": "float64"}))
+
+    def load(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """(transactions in upload order, loan summary) for the whole stored portfolio."""
+        return self.snapshot()[1:]
+
+    def snapshot(self) -> tuple[int, pd.DataFrame, pd.DataFrame]:
+        """(version, transactions, loan summary), all from the same read transaction."""
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            version = int(conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+            tx = self._read_columns(version)
+            if tx is None:
+                tx = self._read_tx(conn)
+                self._write_columns(version, tx)
+            rows = conn.execute(f"SELECT {', '.join(_LOAN_DB_COLUMNS)} FROM loans ORDER BY loan_id").fetchall()
+        if not rows:
+            return version, tx, summarize_loans(tx)
+        loans = pd.DataFrame.from_records(rows, columns=LOAN_COLUMNS)
+        for c in _LOAN_DATES:
+            loans[c] = pd.to_datetime(loans[c], format="%Y-%m-%d")
+        loans["is_repaid"] = loans["is_repaid"].astype(bool)
+        return version, tx, loans
+
+    def changed_since(self, version: int) -> list:
+        """Loans that merges after `version` added rows to."""
+        with self._connect() as conn:
+            return [r[0] for r in conn.execute(
+                "SELECT loan_id FROM loan_versions WHERE version > ? ORDER BY loan_id", (version,)
+            )]
+
+    # ---- kolonnefiler ----
+    def _read_columns(self, version: int):
+        """Transactions of `version` from the column files, or None if there are none."""
+        folder = self.columns_dir / f"v{version}"
+        try:
+            spec = json.loads((folder / "columns.json").read_text(encoding="utf-8"))
+            cols = {}
+            for c in TX_COLUMNS:
+                data = np.load(folder / f"{c}.npy", mmap_mode="r")
+                cats = spec[c].get("categories")
+                # Kopieres inn i DataFrame-en; rammen skal ikke peke på en fil som kan slettes
+                cols[c] = data if cats is None else pd.Categorical.from_codes(np.array(data), categories=cats)
+        except (OSError, ValueError, KeyError):
+            # Mangler, halvveis slettet av en nyere versjon eller skadet: les fra SQLite
+            # (og skriv mappen på nytt)
+            shutil.rmtree(folder, ignore_errors=True)
+            return None
+        return pd.DataFrame(cols, columns=TX_COLUMNS)
+
+    def _write_columns(self, version: int, tx: pd.DataFrame):
+        if tx.empty or (self.columns_dir / f"v{version}").exists():
+            return
+        try:
+            self.columns_dir.mkdir(exist_ok=True)
+            tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.columns_dir))
+            spec = {}
+            for c in TX_COLUMNS:
+                col = tx[c]
+                if isinstance(col.dtype, pd.CategoricalDtype):
+                    spec[c] = {"categories": col.cat.categories.tolist()}
+                    col = col.cat.codes
+                else:
+                    spec[c] = {}
+                np.save(tmp / f"{c}.npy", col.to_numpy())
+            (tmp / "columns.json").write_text(json.dumps(spec), encoding="utf-8")
+            try:
+                # Rename er atomisk: en annen prosess ser hele mappen eller ingenting
+                os.rename(tmp, self.columns_dir / f"v{version}")
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)   # en annen prosess kom først
+            for old in self.columns_dir.glob("v*"):
+                if old.name[1:].isdigit() and int(old.name[1:]) < version:
+                    shutil.rmtree(old, ignore_errors=True)
+        except OSError:
+            # Bare en snarvei; uten skrivetilgang leser vi fra SQLite hver gang
+            pass
+
+    # ---- skriving ----
+    def merge(self, tx: pd.DataFrame, digest: str = None) -> dict:
+        """
+        Add the rows of a parsed export that aren't stored yet and refresh
+        the summary of the loans they belong to.
+        """
+        if tx.empty:
+            new = pd.DataFrame(columns=TX_COLUMNS)
+        else:
+            # Vanlige dtypes for sammenligningen under (category mot str matcher ikke)
+            new = tx.assign(date=_iso(tx["date"]), loan_id=tx["loan_id"].astype("int64"),
+                            transaction=tx["transaction"].astype(object))
+        new["n"] = new.groupby(KEY, sort=False).cumcount()
+
+        with self._write_lock, self._connect() as conn:
+            # Skrivelåsen tas før lesingen: en samtidig merge fra en annen prosess
+            # kan ellers legge inn de samme radene mellom SELECT og INSERT
+            conn.execute("BEGIN IMMEDIATE")
+            loan_ids = sorted(set(new["loan_id"].tolist()))
+            existing = pd.DataFrame.from_records(
+                conn.execute(
+                    'SELECT loan_id, date, "transaction", amount, n FROM transactions '
+                    "WHERE loan_id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(loan_ids),),
+                ).fetchall(),
+                columns=[*KEY, "n"],
+            )
+            if existing.empty:
+                fresh = new
+            else:
+                seen = new.merge(existing.astype(new[[*KEY, "n"]].dtypes.to_dict()), on=[*KEY, "n"], how="left", indicator=True)
+                fresh = new[(seen["_merge"] == "left_only").to_numpy()]
+
+            changed = sorted(set(fresh["loan_id"].tolist()))
+            if changed:
+                start = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM transactions").fetchone()[0]
+                conn.executemany(
+                    f'INSERT INTO transactions (seq, n, {_TX_SELECT}) VALUES (?, ?{", ?" * len(TX_COLUMNS)})',
+                    zip(range(start, start + len(fresh)), fresh["n"].tolist(),
+                        *(fresh[c].tolist() for c in TX_COLUMNS)),
+                )
+                self._refresh_loans(conn, changed)
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO loan_versions (loan_id, version) "
+                    "SELECT ?, value FROM meta WHERE key = 'version'",
+                    ((loan_id,) for loan_id in changed),
+                )
+            if digest is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO imports (digest, imported_at, rows, new_rows) VALUES (?, ?, ?, ?)",
+                    (digest, datetime.now().isoformat(timespec="seconds"), len(new), len(fresh)),
+                )
+            version = int(conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+
+        return {"rows": len(new), "new_rows": len(fresh), "changed_loans": changed, "version": version}
+
+    def _refresh_loans(self, conn, loan_ids: list):
+        """summarize_loans() for just these loans, over all their stored rows."""
+        tx = self._read_tx(conn, "WHERE loan_id IN (SELECT value FROM json_each(?))", (json.dumps(loan_ids),))
+        loans = summarize_loans(tx)
+        values = [loans[c].tolist() for c in LOAN_COLUMNS]
+        for c in _LOAN_DATES:
+            values[LOAN_COLUMNS.index(c)] = _iso(loans[c])
+        values[LOAN_COLUMNS.index("is_repaid")] = [int(v) for v in loans["is_repaid"].tolist()]
+        conn.executemany(
+            f"INSERT OR REPLACE INTO loans ({', '.join(_LOAN_DB_COLUMNS)}) VALUES ({', '.join('?' * len(LOAN_COLUMNS))})",
+            zip(*values),
+        )
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            return {
+                "transactions": conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0],
+                "loans": conn.execute("SELECT COUNT(*) FROM loans").fetchone()[0],
+                "imports": conn.execute("SELECT COUNT(*) FROM imports").fetchone()[0],
+                "version": int(conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]),
+                "bytes": self.path.stat().st_size if self.path.exists() else 0,
+            }
@@ -0,0 +1,169 @@
+"""
+Synthetic Kameo exports for the tests and benchmarks.
+
+random_portfolio() is a quick mix of edge cases; kameo_export() follows
+the real export format (Norwegian or Swedish) closely enough to benchmark
+the parser and pipeline at realistic sizes.
+"""
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+
+TITLE_NO = "Dato\tTransaksjon\tBeløp\tValuta\tVekslingskurs per 100 NOK\tBeløp i NOK"
+TITLE_SV = "Datum\tTransaktion\tBelopp\tValuta\tVäxelkurs per 100 NOK\tBelopp i NOK"
+
+
+def random_portfolio(seed: int, loans: int = 80) -> str:
+    """Kameo-like export: allocations, monthly interest, partial/complete repayments, odd edge days."""
+    rng = random.Random(seed)
+    today = pd.Timestamp.today().normalize()
+    out = []
+
+    def row(day, kind, amount):
+        s = f"{abs(amount):,.2f}".replace(",", " ").replace(".", ",")
+        s = ("−" if amount < 0 else "") + s
+        out.append(f"{day.date()}\t{kind}\t{s}\tNOK\t100,00\t{s}")
+
+    for n in range(loans):
+        duration = rng.choice([1, 6, 12, 18, 24, 36])
+        rate = rng.randint(6, 16)
+        out.append(f"Selskap {n % 11} AS - {5000 + n} | Løpetid: {duration} m | Rente: {rate},00%")
+        out.append(TITLE_NO)
+        start = today - pd.Timedelta(days=rng.randint(0, 1400))
+        invested = rng.choice([1000, 2000, 5000, 10000]) * rng.randint(1, 3)
+        if rng.random() < 0.05:
+            row(start - pd.Timedelta(days=3), "Renteinntekt", 1.11)          # før tildeling
+        row(start, "Tildeling", -invested)
+        if rng.random() < 0.1:
+            row(start, "Tildeling", -1000)                                    # to tildelinger
+        paid = 0.0
+        day = start
+        for m in range(rng.randint(0, duration + 2)):
+            day = day + pd.Timedelta(days=rng.randint(27, 33))
+            if rng.random() < 0.05:
+                row(day, "Renteinntekt", 10.0)
+                row(day, "Renteinntekt", -10.0)                               # netter til 0 samme dag
+            else:
+                row(day, rng.choice(["Renteinntekt"] * 9 + ["Forsinkelsesrente"]),
+                    round(invested * rate / 1200 * rng.uniform(0.5, 1.1), 2))
+            if rng.random() < 0.15 and paid < invested:
+                part = round(min(invested - paid, invested / 3), 2)
+                row(day, "Tilbakebetaling", part)
+                paid += part
+        out.append("Totale renteinntekter\t0,00")
+    return "\n".join(out)
+
+
+# Språkvariantene av eksporten: overskrifter, transaksjonstyper, valuta
+_LANG = {
+    "no": {
+        "header": "{company} - {loan_id} | Løpetid: {months} m | Rente: {rate}%",
+        "subscribed": "Tegnet: {amount}",
+        "title": TITLE_NO,
+        "footer": "Totale renteinntekter\t{amount}",
+        "allocation": "Tildeling",
+        "interest": ["Renteinntekt"],
+        "penalty": "Forsinkelsesrente",
+        "repayment": "Tilbakebetaling",
+        "currency": "NOK",
+        "nok_per_100": 100.0,
+        "companies": ["Fjordbygg", "Nordlys Eiendom", "Vestland Utvikling", "Tromsø Boligprosjekt",
+                      "Bergen Næringsbygg", "Oslo Byfornyelse", "Trønder Hus", "Sørlandet Tomter"],
+        "suffix": "AS",
+    },
+    "sv": {
+        "header": "{company} - {loan_id} | Löptid: {months} m | Ränta: {rate}%",
+        "subscribed": "Tecknat: {amount}",
+        "title": TITLE_SV,
+        "footer": "Totala ränteintäkter\t{amount}",
+        "allocation": "Tilldelning",
+        "interest": ["Ränteintäkt", "Inkomstränta", "Ränta"],
+        "penalty": "Dröjsmålsränta",
+        "repayment": "Återbetalning",
+        "currency": "SEK",
+        "nok_per_100": 97.35,
+        "companies": ["Göteborgs Byggnads", "Malmö Fastighetsutveckling", "Norrland Bostad",
+                      "Uppsala Projekt", "Skåne Hus", "Stockholm Stadsbyggnad"],
+        "suffix": "AB",
+    },
+}
+
+
+def _kr(amount: float) -> str:
+    """Kameo number format: NBSP thousands separator, decimal comma, Unicode minus."""
+    s = f"{abs(amount):,.2f}".replace(",", "\xa0").replace(".", ",")
+    return ("−" + s) if amount < 0 else s
+
+
+def _plus_months(day: date, n: int) -> date:
+    month = day.month - 1 + n
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=min(day.day, 28))
+
+
+def kameo_export(loans: int, seed: int = 0, lang: str = "no", today: date = None) -> str:
+    """
+    A realistic Kameo export with `loans` loans, in Norwegian ("no") or
+    Swedish ("sv"). It contains:
+
+      - bullet and amortising loans, some with a second allocation
+      - repaid, active and late loans; late payments come with penalty interest
+      - a few defaulted loans that stop paying
+      - NBSP thousands separators and Unicode minus
+      - a subscription line under the header and a footer per loan
+
+    Swedish exports are in SEK, with the NOK column converted. Rows are
+    plain Python string formatting, so 10k loans take a couple of seconds.
+    """
+    rng = random.Random(seed)
+    words = _LANG[lang]
+    today = today or pd.Timestamp.today().date()
+    fx = words["nok_per_100"]
+    fx_text = _kr(fx)
+    out = []
+
+    def row(day: date, kind: str, amount: float):
+        amount = round(amount, 2)
+        nok = round(amount * fx / 100, 2)
+        out.append(f"{day.isoformat()}\t{kind}\t{_kr(amount)}\t{words['currency']}\t{fx_text}\t{_kr(nok)}")
+        return nok
+
+    for n in range(loans):
+        company = f"{rng.choice(words['companies'])} {1 + n % 23} {words['suffix']}"
+        months = rng.choice([6, 9, 12, 12, 18, 24, 24, 30, 36])
+        rate = rng.choice(range(600, 1500, 25)) / 100
+        invested = rng.choice([1_000, 2_000, 5_000, 10_000, 25_000, 50_000, 150_000])
+        start = today - timedelta(days=rng.randint(0, 4 * 365))
+        amortising = rng.random() < 0.4
+        late = rng.random() < 0.15          # betaler for sent, med forsinkelsesrente
+        defaults_after = rng.randint(1, months) if rng.random() < 0.05 else None
+
+        out.append(words["header"].format(company=company, loan_id=10_000 + n, months=months,
+                                          rate=f"{rate:.2f}".replace(".", ",")))
+        out.append(words["subscribed"].format(amount=_kr(invested)))
+        out.append(words["title"])
+        row(start, words["allocation"], -invested)
+        outstanding = float(invested)
+        if rng.random() < 0.08:
+            top_up = rng.choice([1_000, 2_000])
+            row(start, words["allocation"], -top_up)
+            outstanding += top_up
+
+        interest_nok = 0.0
+        for m in range(1, months + 1):
+            due = _plus_months(start, m)
+            delay = rng.randint(3, 45) if late and rng.random() < 0.4 else 0
+            paid = due + timedelta(days=delay)
+            if paid > today or (defaults_after is not None and m > defaults_after):
+                break
+            interest = outstanding * rate / 1200
+            interest_nok += row(paid, rng.choice(words["interest"]), interest)
+            if delay:
+                interest_nok += row(paid, words["penalty"], interest * delay / 30 * 0.5)
+            principal = outstanding / (months - m + 1) if amortising else (outstanding if m == months else 0.0)
+            if principal > 0:
+                principal = round(principal, 2) if m < months else outstanding
+                row(paid, words["repayment"], principal)
+                outstanding = round(outstanding - principal, 2)
+        out.append(words["footer"].format(amount=_kr(interest_nok)))
+    return "\n".join(out)
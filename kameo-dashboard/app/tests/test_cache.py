@@ -0,0 +1,83 @@
+import io
+
+import pandas as pd
+
+from app.cache import ResultCache, digest_file, digest_text, sizeof
+
+
+class Clock:
+    def __init__(self, day: str):
+        self.now = pd.Timestamp(day)
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_order_and_entry_limit():
+    cache = ResultCache(max_entries=2)
+    cache.get_or_set("a", lambda: {"v": 1})
+    cache.get_or_set("b", lambda: {"v": 2})
+    cache.get("a")                          # a er nå sist brukt
+    cache.get_or_set("c", lambda: {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_and_skips_oversized():
+    df = pd.DataFrame({"x": range(1000)})
+    size = sizeof({"df": df})
+    cache = ResultCache(max_entries=10, max_bytes=int(size * 2.5))
+    for key in "abc":
+        cache.get_or_set(key, lambda: {"df": df})
+    assert cache.get("a") is None and cache.get("c") is not None
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+    big = {"df": pd.DataFrame({"x": range(100_000)})}
+    assert cache.get_or_set("big", lambda: big) is big
+    assert cache.get("big") is None
+
+
+def test_compute_runs_once_per_key_and_artifacts_are_added():
+    calls = []
+    cache = ResultCache()
+    for _ in range(3):
+        ctx = cache.get_or_set("k", lambda: calls.append("ctx") or {"n": 1})
+        cache.artifact("k", "daily", lambda: calls.append("daily") or [1, 2, 3])
+    assert calls == ["ctx", "daily"]
+    assert ctx == {"n": 1, "daily": [1, 2, 3]}
+
+
+def test_month_rollover_clears():
+    clock = Clock("2025-01-31 23:59")
+    cache = ResultCache(today=clock)
+    cache.get_or_set("k", lambda: {"n": 1})
+    clock.now = pd.Timestamp("2025-01-31 23:59:59")
+    assert cache.get("k") is not None
+    clock.now = pd.Timestamp("2025-02-01 00:00")
+    assert cache.get("k") is None
+    assert cache.stats()["rollovers"] == 1
+
+
+def test_digests_agree():
+    raw = "Firma AS - 1 | Løpetid: 6 m | Rente: 10%\n" * 1000
+    assert digest_file(io.BytesIO(raw.encode("utf-8")), chunk_size=7) == digest_text(raw)
+
+
+def test_routes_reuse_cached_context():
+    from fastapi.testclient import TestClient
+    from app import main
+
+    main.results.clear()
+    parses = main.metrics._stages["parse"].count if "parse" in main.metrics._stages else 0
+    client = TestClient(main.app)
+    assert client.get("/").status_code == 200
+    assert client.get("/").status_code == 200
+    assert client.post("/upload").status_code == 200
+    assert client.get("/download/csv?view=by_company").status_code == 200
+    assert client.get("/download/csv?view=daily").status_code == 200
+    assert client.get("/download/csv?view=daily").status_code == 200
+
+    # Demoen er parset én gang; resten er oppslag
+    assert main.metrics._stages["parse"].count == parses + 1
+    assert main.results.stats()["entries"] == 1
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.compute import ComputePool, JobCancelled, JobTimeout, PoolBusy, checkpoint
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after: float):
+        self.at = time.monotonic() + disconnect_after
+
+    async def is_disconnected(self):
+        return time.monotonic() >= self.at
+
+
+def cooperative(seconds: float, ran: list = None):
+    """Jobb som sjekker checkpoint() jevnlig, som pipelinen gjør mellom steg."""
+    if ran is not None:
+        ran.append(True)
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        checkpoint()
+        time.sleep(0.005)
+    return "done"
+
+
+def wait_idle(pool: ComputePool):
+    for _ in range(200):
+        if pool.stats()["running"] == 0 and pool.stats()["queued"] == 0:
+            return
+        time.sleep(0.01)
+    raise AssertionError(pool.stats())
+
+
+def test_runs_job_and_keeps_loop_free():
+    pool = ComputePool(workers=1)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        t = asyncio.create_task(ticker())
+        result = await pool.run(None, cooperative, 0.3)
+        t.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(main())
+    assert result == "done"
+    assert ticks >= 10          # event-loopen gikk videre mens jobben kjørte
+    assert pool.stats()["completed"] == 1
+    pool.shutdown()
+
+
+def test_backpressure_rejects_when_full():
+    pool = ComputePool(workers=1, max_queue=2)
+    gate = threading.Event()
+
+    async def main():
+        first = asyncio.create_task(pool.run(None, gate.wait))
+        second = asyncio.create_task(pool.run(None, gate.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolBusy):
+            await pool.run(None, gate.wait)
+        gate.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(main())
+    stats = pool.stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 2
+    pool.shutdown()
+
+
+def test_timeout_cancels_running_job():
+    pool = ComputePool(workers=1, timeout=0.1)
+    with pytest.raises(JobTimeout):
+        asyncio.run(pool.run(None, cooperative, 5))
+    wait_idle(pool)             # jobben stoppet ved neste checkpoint
+    assert pool.stats()["timeouts"] == 1
+    pool.shutdown()
+
+
+def test_client_disconnect_cancels_running_and_queued_jobs():
+    pool = ComputePool(workers=1)
+    ran = []
+
+    async def main():
+        running = asyncio.create_task(pool.run(FakeRequest(0.2), cooperative, 5))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(pool.run(FakeRequest(0.1), cooperative, 5, ran))
+        for task in (running, queued):
+            with pytest.raises(JobCancelled):
+                await task
+
+    asyncio.run(main())
+    wait_idle(pool)
+    assert ran == []            # jobben i køen startet aldri
+    assert pool.stats()["cancelled"] == 2
+    pool.shutdown()
+
+
+def test_job_errors_propagate():
+    pool = ComputePool(workers=1)
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(pool.run(None, lambda: 1 / 0))
+    assert pool.stats()["failed"] == 1
+    pool.shutdown()
+
+
+def test_busy_pool_returns_503(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app import main
+
+    monkeypatch.setattr(main, "compute", ComputePool(workers=1, max_queue=0))
+    r = TestClient(main.app).get("/")
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
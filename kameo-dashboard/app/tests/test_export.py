@@ -0,0 +1,75 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from app import export
+from app.parser import DAILY_COLUMNS, daily_frames, expand_to_daily, parse_text_to_tx_df
+from app.tests.synthetic import random_portfolio
+
+
+@pytest.fixture(scope="module")
+def daily():
+    return expand_to_daily(parse_text_to_tx_df(random_portfolio(5, loans=20)))
+
+
+def test_chunked_csv_matches_to_csv(daily):
+    chunks = list(export.iter_csv(daily, chunk_rows=1000))
+    assert len(chunks) > 2
+    assert b"".join(chunks) == daily.to_csv(index=False).encode("utf-8")
+    assert b"".join(export.iter_csv(daily.iloc[:0])) == daily.iloc[:0].to_csv(index=False).encode("utf-8")
+
+
+def test_joined_frame_streams_like_the_wide_frame(daily):
+    tx = parse_text_to_tx_df(random_portfolio(5, loans=20))
+    joined = export.JoinedFrame(*daily_frames(tx), "loan_id", DAILY_COLUMNS)
+    assert len(joined) == len(daily) and list(joined.columns) == list(daily.columns)
+    assert b"".join(export.iter_csv(joined, chunk_rows=1000)) == daily.to_csv(index=False).encode("utf-8")
+
+    part = export.select_columns(joined, "Company,Date,accumulated_interest")
+    assert b"".join(export.iter_csv(part, chunk_rows=777)) == daily[["Company", "Date", "accumulated_interest"]].to_csv(index=False).encode("utf-8")
+
+
+def test_gzip_stream(daily):
+    data = b"".join(export.stream(daily, "csv.gz", chunk_rows=1000))
+    assert gzip.decompress(data) == daily.to_csv(index=False).encode("utf-8")
+
+
+def test_column_selection(daily):
+    assert list(export.select_columns(daily, "Date, loan_id").columns) == ["Date", "loan_id"]
+    with pytest.raises(export.ExportError, match="nope"):
+        export.select_columns(daily, "Date,nope")
+    with pytest.raises(export.ExportError):
+        export.check_format("xlsx")
+
+
+def test_parquet_round_trip(daily):
+    pytest.importorskip("pyarrow")
+    data = b"".join(export.stream(daily, "parquet", chunk_rows=1000))
+    pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(data)), daily)
+
+
+def test_download_route():
+    from fastapi.testclient import TestClient
+    from app import main
+
+    client = TestClient(main.app)
+    client.post("/upload", data={"paste": random_portfolio(6, loans=10)})
+    full = pd.read_csv(io.StringIO(client.get("/download/csv?view=daily").text), parse_dates=["Date"])
+
+    r = client.get("/download/csv?view=daily&start=2024-01-01&end=2024-03-31&columns=Date,loan_id,accumulated_interest")
+    assert r.status_code == 200
+    assert r.headers["content-disposition"] == 'attachment; filename="kameo-daily.csv"'
+    part = pd.read_csv(io.StringIO(r.text), parse_dates=["Date"])
+    expected = full.loc[full["Date"].between("2024-01-01", "2024-03-31"), ["Date", "loan_id", "accumulated_interest"]]
+    pd.testing.assert_frame_equal(part, expected.reset_index(drop=True))
+
+    r = client.get("/download/csv?view=by_company&format=csv.gz")
+    assert r.headers["content-type"] == "application/gzip"
+    assert gzip.decompress(r.content).startswith(b"Company,")
+
+    assert client.get("/download/csv?columns=nope").status_code == 400
+    assert client.get("/download/csv?start=31.12.2024").status_code == 400
+    r = client.get("/download/csv?start=2024-03-31&end=2024-01-01")
+    assert r.status_code == 400 and "after end" in r.text
@@ -0,0 +1,28 @@
+from pathlib import Path
+
+import pytest
+
+from app import metrics
+from app.metrics import Metrics
+
+# Samme fil i begge appene, se docstringen i app/metrics.py
+OTHER_COPY = Path(__file__).resolve().parents[3] / "tbones-funfactAPI" / "app" / "metrics.py"
+
+
+@pytest.mark.skipif(not OTHER_COPY.exists(), reason="tbones-funfactAPI is not checked out next to this app")
+def test_metrics_matches_the_tbones_copy():
+    assert Path(metrics.__file__).read_bytes() == OTHER_COPY.read_bytes(), (
+        f"app/metrics.py differs from {OTHER_COPY}; apply the change to both copies"
+    )
+
+
+def test_render_counts_requests_and_buckets_latency():
+    m = Metrics("kameo")
+    m.observe_request("GET", "/x", 200, 0.003)
+    m.observe_request("GET", "/x", 200, 0.2)
+    m.add_gauge("pool", "Pool.", lambda: {"in_use": 1, "broken": "n/a"}, label="stat")
+    text = m.render()
+    assert 'kameo_http_requests_total{method="GET",route="/x",status="200"} 2' in text
+    assert 'kameo_http_request_duration_seconds_bucket{method="GET",route="/x",le="0.005"} 1' in text
+    assert 'kameo_http_request_duration_seconds_bucket{method="GET",route="/x",le="+Inf"} 2' in text
+    assert 'kameo_pool{stat="in_use"} 1' in text and "broken" not in text
@@ -0,0 +1,119 @@
+import os
+import time
+
+import pandas as pd
+
+from app.sessions import SessionStore, new_session_id, valid_session_id
+from app.tests.synthetic import TITLE_NO
+
+KEY_A = "a" * 32
+KEY_B = "b" * 32
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def frame(n: int) -> pd.DataFrame:
+    return pd.DataFrame({"loan_id": range(n), "amount": [1.0] * n})
+
+
+def test_sessions_are_separate_and_share_datasets():
+    store = SessionStore()
+    s1, s2, s3 = new_session_id(), new_session_id(), new_session_id()
+    tx = frame(10)
+    store.set(s1, KEY_A, tx)
+    store.set(s2, KEY_B, frame(5))
+    store.set(s3, KEY_A, tx)
+    assert store.get(s1)[0] == KEY_A
+    assert store.get(s2)[0] == KEY_B
+    assert store.get(new_session_id()) is None
+    assert store.stats()["datasets"] == 2
+
+
+def test_invalid_session_ids_are_rejected():
+    assert valid_session_id(new_session_id())
+    for sid in (None, "", "short", "../../etc/passwd" + "x" * 20):
+        assert not valid_session_id(sid)
+        assert SessionStore().get(sid) is None
+
+
+def test_ttl_expiry():
+    clock = Clock()
+    store = SessionStore(ttl=60, clock=clock)
+    sid = new_session_id()
+    store.set(sid, KEY_A, frame(3))
+    clock.now += 50
+    assert store.get(sid) is not None     # bruk forlenger levetiden
+    clock.now += 50
+    assert store.get(sid) is not None
+    clock.now += 61
+    assert store.get(sid) is None
+    assert store.stats()["expired"] == 1 and store.stats()["bytes"] == 0
+
+
+def test_memory_cap_drops_least_recently_used():
+    tx = frame(1000)
+    store = SessionStore(max_bytes=0)
+    store.set(new_session_id(), KEY_A, tx)
+    size = store.nbytes
+    assert size > 0
+
+    store = SessionStore(max_bytes=int(size * 1.5))
+    s1, s2 = new_session_id(), new_session_id()
+    store.set(s1, KEY_A, tx)
+    store.set(s2, KEY_B, frame(1000))
+    assert store.get(s1) is None and store.get(s2) is not None
+    assert store.stats()["evicted"] == 1
+
+
+def test_spill_dir_shared_between_workers(tmp_path):
+    worker1 = SessionStore(spill_dir=tmp_path)
+    worker2 = SessionStore(spill_dir=tmp_path)
+    sid = new_session_id()
+    tx = frame(20)
+    worker1.set(sid, KEY_A, tx)
+
+    key, loaded = worker2.get(sid)
+    assert key == KEY_A
+    pd.testing.assert_frame_equal(loaded, tx)
+    assert worker2.stats()["spill_loads"] == 1
+
+
+def test_spill_dir_expiry(tmp_path):
+    old, new = new_session_id(), new_session_id()
+    SessionStore(ttl=60, spill_dir=tmp_path).set(old, KEY_A, frame(3))
+    stale = time.time() - 120
+    for path in [*(tmp_path / "sessions").iterdir(), *(tmp_path / "datasets").iterdir()]:
+        os.utime(path, (stale, stale))
+
+    store = SessionStore(ttl=60, spill_dir=tmp_path)
+    assert store.get(old) is None
+    store.set(new, KEY_B, frame(3))        # feier disken
+    assert [p.name for p in (tmp_path / "sessions").iterdir()] == [new]
+    assert [p.stem for p in (tmp_path / "datasets").iterdir()] == [KEY_B]
+
+
+def test_export_follows_the_session():
+    from fastapi.testclient import TestClient
+    from app import main
+
+    paste = "\n".join([
+        "Alice AS - 1 | Løpetid: 6 m | Rente: 10%",
+        TITLE_NO,
+        "2024-01-01\tTildeling\t−1 000,00\tNOK\t100,00\t−1 000,00",
+        "2024-07-01\tTilbakebetaling\t1 000,00\tNOK\t100,00\t1 000,00",
+    ])
+    alice, bob = TestClient(main.app), TestClient(main.app)
+    assert alice.post("/upload", data={"paste": paste}).status_code == 200
+    assert bob.get("/").status_code == 200
+
+    a = alice.get("/download/csv?view=by_loan").text
+    b = bob.get("/download/csv?view=by_loan").text
+    assert a != b
+    assert a.count("\n") == 2 and "Alice AS" in a
+    assert alice.cookies[main.SESSION_COOKIE] != bob.cookies[main.SESSION_COOKIE]
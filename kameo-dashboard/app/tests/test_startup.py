@@ -0,0 +1,55 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_import_does_not_load_pandas():
+    code = "import sys, app.main; print('pandas' in sys.modules, app.main.startup['import_seconds'] > 0)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["False", "True"]
+
+
+def test_warm_up_fills_the_cache_before_the_first_visit(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app import main
+
+    main.results.clear()
+    monkeypatch.setitem(main.startup, "warm_up_seconds", None)
+    with TestClient(main.app) as client:   # kjører lifespan, og dermed oppvarmingen
+        for _ in range(300):
+            health = client.get("/health").json()
+            if health["warm"]:
+                break
+            time.sleep(0.05)
+        assert health["status"] == "ok" and health["warm"] and health["pandas_loaded"]
+
+        parses = main.metrics._stages["parse"].count
+        assert client.get("/").status_code == 200
+        assert main.metrics._stages["parse"].count == parses     # forsiden kom fra cachen
+        assert main.results.stats()["entries"] == 1
+        assert "kameo_startup{stat=\"warm_up_seconds\"}" in client.get("/metrics").text
+
+
+def test_visit_during_warm_up_waits_for_it(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app import main
+
+    main.results.clear()
+    monkeypatch.setitem(main.startup, "warm_up_seconds", None)
+    warm_up_page = main._warm_up_page
+
+    def slow_warm_up_page():
+        time.sleep(0.5)    # forsiden etterspørres mens oppvarmingen fortsatt pågår
+        warm_up_page()
+
+    monkeypatch.setattr(main, "_warm_up_page", slow_warm_up_page)
+    parses = main.metrics._stages["parse"].count
+    with TestClient(main.app) as client:
+        assert not client.get("/health").json()["warm"]
+        assert client.get("/").status_code == 200
+        assert client.get("/health").json()["warm"]
+    assert main.metrics._stages["parse"].count == parses + 1     # bare oppvarmingen parset
+    assert main.results.stats()["entries"] == 1
@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.parser import parse_text_to_tx_df, summarize_loans
+from app.store import KEY, PortfolioStore
+from app.tests.synthetic import TITLE_NO, random_portfolio
+
+DEMO = Path(__file__).resolve().parent.parent / "demo" / "demo.txt"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PortfolioStore(tmp_path / "portfolio.db")
+
+
+def test_round_trip_is_exact(store):
+    tx = parse_text_to_tx_df(DEMO.read_text(encoding="utf-8"))
+    result = store.merge(tx, "demo")
+    assert result["new_rows"] == len(tx) and result["version"] == 1
+
+    stored_tx, loans = store.load()
+    pd.testing.assert_frame_equal(stored_tx, tx, check_exact=True)
+    pd.testing.assert_frame_equal(loans, summarize_loans(tx), check_exact=True)
+
+
+def test_empty_store(store):
+    tx, loans = store.load()
+    assert tx.empty and loans.empty
+    assert store.merge(parse_text_to_tx_df(""))["new_rows"] == 0
+    assert store.version == 0
+
+
+def test_next_months_export_only_adds_new_rows(store):
+    tx = parse_text_to_tx_df(random_portfolio(4))
+    cutoff = tx["date"].quantile(0.7)
+    last_month = tx[tx["date"] < cutoff]
+    store.merge(last_month, "a")
+
+    result = store.merge(tx, "b")
+    assert result["new_rows"] == len(tx) - len(last_month)
+    assert result["changed_loans"] == sorted(tx.loc[tx["date"] >= cutoff, "loan_id"].unique().tolist())
+    assert result["version"] == 2
+
+    stored_tx, loans = store.load()
+    sort = lambda df: df.sort_values(KEY, kind="stable").reset_index(drop=True)
+    pd.testing.assert_frame_equal(sort(stored_tx), sort(tx), check_exact=True)
+    # Bare endrede lån ble regnet om, men oppsummeringen er som for hele porteføljen
+    pd.testing.assert_frame_equal(loans, summarize_loans(stored_tx), check_exact=True)
+
+    again = store.merge(tx, "c")
+    assert again["new_rows"] == 0 and again["changed_loans"] == [] and again["version"] == 2
+
+
+def test_identical_rows_within_one_export_are_kept(store):
+    raw = "\n".join([
+        "Dup AS - 5 | Løpetid: 6 m | Rente: 10%",
+        TITLE_NO,
+        "2024-01-01\tTildeling\t−1 000,00\tNOK\t100,00\t−1 000,00",
+        "2024-02-01\tRenteinntekt\t8,33\tNOK\t100,00\t8,33",
+        "2024-02-01\tRenteinntekt\t8,33\tNOK\t100,00\t8,33",
+    ])
+    store.merge(parse_text_to_tx_df(raw))
+    store.merge(parse_text_to_tx_df(raw))
+    tx, loans = store.load()
+    assert len(tx) == 3
+    assert loans["accumulated_interest"].tolist() == [16.66]
+
+
+def test_concurrent_merges_from_two_processes(tmp_path):
+    # To instanser = to prosesser: de deler filen, men ikke _write_lock
+    tx = parse_text_to_tx_df(random_portfolio(5, loans=40))
+    a, b = PortfolioStore(tmp_path / "p.db"), PortfolioStore(tmp_path / "p.db")
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda s: s.merge(tx), [a, b, a, b]))
+    assert sum(r["new_rows"] for r in results) == len(tx)
+    assert len(a.load()[0]) == len(tx)
+
+
+def test_upload_merges_into_store(store, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app import main
+
+    monkeypatch.setattr(main, "store", store)
+    client = TestClient(main.app)
+    paste = "\n".join([
+        "Lagret AS - 9 | Løpetid: 6 m | Rente: 10%",
+        TITLE_NO,
+        "2024-01-01\tTildeling\t−1 000,00\tNOK\t100,00\t−1 000,00",
+    ])
+    assert client.post("/upload", data={"paste": paste}).status_code == 200
+    parses = main.metrics._stages["parse"].count
+    assert client.post("/upload", data={"paste": paste}).status_code == 200
+    assert main.metrics._stages["parse"].count == parses     # samme eksport parses ikke igjen
+
+    page = client.get("/")
+    assert page.status_code == 200 and "Lagret AS" in page.text
+    assert "Lagret AS" in client.get("/download/csv?view=by_loan").text
+    assert store.stats()["imports"] == 1
+
+
+def test_second_load_reads_the_column_files(store, monkeypatch):
+    tx = parse_text_to_tx_df(random_portfolio(3))
+    store.merge(tx)
+    first_tx, first_loans = store.load()
+    assert [p.name for p in store.columns_dir.iterdir()] == ["v1"]
+
+    # Uten SQLite-lesing av transaksjonene: må komme fra kolonnefilene
+    monkeypatch.setattr(PortfolioStore, "_read_tx", lambda *a: pytest.fail("read rows from SQLite"))
+    again_tx, again_loans = store.load()
+    pd.testing.assert_frame_equal(again_tx, first_tx, check_exact=True)
+    pd.testing.assert_frame_equal(again_loans, first_loans, check_exact=True)
+
+
+def test_column_files_follow_the_version(store):
+    tx = parse_text_to_tx_df(random_portfolio(4))
+    cutoff = tx["date"].quantile(0.7)
+    store.merge(tx[tx["date"] < cutoff])
+    store.load()
+    store.merge(tx)
+    version, stored, _ = store.snapshot()
+    assert version == 2 and len(stored) == len(tx)
+    assert [p.name for p in store.columns_dir.iterdir()] == ["v2"]
+
+    (store.columns_dir / "v2" / "amount.npy").write_bytes(b"broken")
+    pd.testing.assert_frame_equal(store.load()[0], stored, check_exact=True)
+    assert store._read_columns(2) is not None        # skrevet på nytt
+
+
+def test_changed_since_lists_loans_per_version(store):
+    tx = parse_text_to_tx_df(random_portfolio(4))
+    cutoff = tx["date"].quantile(0.7)
+    store.merge(tx[tx["date"] < cutoff])
+    result = store.merge(tx)
+    assert store.changed_since(1) == result["changed_loans"]
+    assert store.changed_since(0) == sorted(tx["loan_id"].unique().tolist())
+    assert store.changed_since(2) == []
+
+
+def test_new_version_rebuilds_only_changed_loans_months(store, monkeypatch):
+    from app import main, parser
+
+    tx = parse_text_to_tx_df(random_portfolio(6, loans=30))
+    cutoff = tx["date"].quantile(0.8)
+    monkeypatch.setattr(main, "store", store)
+    monkeypatch.setattr(main, "_store_months", {"version": None, "parts": None})
+    built = []
+    real = parser.loan_month_parts
+    monkeypatch.setattr(parser, "loan_month_parts", lambda t, *a: built.append(set(t["loan_id"])) or real(t, *a))
+
+    store.merge(tx[tx["date"] < cutoff])
+    main._store_month_parts(*store.snapshot())
+    result = store.merge(tx)
+    version, stored, loans = store.snapshot()
+    parts = main._store_month_parts(version, stored, loans)
+
+    assert built[-1] == set(result["changed_loans"]) and len(built[-1]) < loans.shape[0]
+    monthly, per_loan = parser.build_loan_months(stored, loans, parts)
+    expected, expected_per_loan = parser.build_loan_months(stored, loans)
+    pd.testing.assert_frame_equal(monthly, expected, rtol=1e-9)
+    for c, m in expected_per_loan.items():
+        pd.testing.assert_frame_equal(per_loan[c], m, rtol=1e-9)
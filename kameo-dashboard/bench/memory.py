@@ -0,0 +1,60 @@
+"""
+Memory per loan of the transaction and daily frames, before and after the
+compact schema (parser.TX_DTYPES, parser.daily_frames).
+
+  - before: the original parser and daily expansion (app/tests/legacy.py),
+            object strings, int64 ids and every column on every daily row
+  - after:  categorical/downcast transactions, and daily rows holding only
+            the per-day columns plus one side-table row per loan
+
+Sizes are pandas' deep memory_usage (string objects included), as JSON.
+
+    python bench/memory.py
+    python bench/memory.py --loans 100,1000,3000
+"""
+import argparse
+import json
+import sys
+import warnings
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.cache import sizeof  # noqa: E402
+from app.parser import daily_frames, parse_text_to_tx_df  # noqa: E402
+from app.tests import legacy  # noqa: E402
+from app.tests.synthetic import random_portfolio  # noqa: E402
+
+
+def run(loans: int) -> dict:
+    raw = random_portfolio(seed=loans, loans=loans)
+    tx_before = legacy.parse_text_to_tx_df(raw)
+    tx_after = parse_text_to_tx_df(raw)
+    daily_before = legacy.expand_to_daily(tx_before)
+    days, side = daily_frames(tx_after)
+
+    res = {"loans": loans, "transactions": len(tx_after), "daily_rows": len(days)}
+    for name, before, after in (
+        ("tx", sizeof(tx_before), sizeof(tx_after)),
+        ("daily", sizeof(daily_before), sizeof(days) + sizeof(side)),
+    ):
+        res[name] = {
+            "before_bytes_per_loan": round(before / loans),
+            "after_bytes_per_loan": round(after / loans),
+            "ratio": round(before / after, 1),
+        }
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--loans", default="100,1000", help="comma-separated loan counts")
+    args = ap.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)  # legacy-koden bruker utfasede pandas-kall
+    print(json.dumps([run(int(n)) for n in args.loans.split(",")], indent=2))
+
+
+if __name__ == "__main__":
+    main()
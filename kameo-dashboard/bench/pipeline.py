@@ -0,0 +1,218 @@
+"""
+Time and peak memory of every stage of the dashboard pipeline, on
+synthetic Kameo exports (kameo_export() in app/tests/synthetic.py).
+
+Stages, each fed by the one before:
+
+  parse            parse_text_to_tx_df(raw export)
+  loans            summarize_loans(tx)
+  views            build_views(loans)
+  monthly          build_loan_months(tx, loans)
+  monthly_by_loan  main._build_monthly_by_loan(per_loan, monthly)
+  daily            daily_frames(tx)  (the export-only daily view)
+
+Time is the best of --repeat runs. Peak memory is measured in one extra
+run under tracemalloc: the most memory a stage allocated on top of what
+was held before it started. The timed runs don't use tracemalloc because
+it slows them down.
+
+--save NAME writes the results to bench/baselines/NAME.json. --compare
+NAME prints each stage against that baseline and exits with status 1
+when a stage is slower, or uses more memory, than --tolerance times the
+baseline. --parity also runs the original implementations
+(app/tests/legacy.py) and checks the frames are identical. That is slow,
+so it only runs for sizes up to --parity-max loans.
+
+    python bench/pipeline.py
+    python bench/pipeline.py --loans 10,1000 --lang sv --parity
+    python bench/pipeline.py --save pi4
+    python bench/pipeline.py --compare pi4 --tolerance 1.3
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+BASELINES = ROOT / "bench" / "baselines"
+
+import pandas as pd  # noqa: E402
+
+from app.main import _build_monthly_by_loan  # noqa: E402
+from app.parser import build_loan_months, build_views, daily_frames, parse_text_to_tx_df, summarize_loans  # noqa: E402
+from app.tests import legacy  # noqa: E402
+from app.tests.synthetic import kameo_export  # noqa: E402
+
+STAGES = ["parse", "loans", "views", "monthly", "monthly_by_loan", "daily"]
+MIN_MS = 5.0   # raskere steg enn dette er for støyete til å sammenligne tid
+
+
+def run_stages(raw: str) -> dict:
+    """One pass through the pipeline: stage -> its result."""
+    out = {}
+    out["parse"] = tx = parse_text_to_tx_df(raw)
+    out["loans"] = loans = summarize_loans(tx)
+    out["views"] = build_views(loans)
+    out["monthly"] = monthly, per_loan = build_loan_months(tx, loans)
+    out["monthly_by_loan"] = _build_monthly_by_loan(per_loan, monthly)
+    out["daily"] = daily_frames(tx)
+    return out
+
+
+def stage_calls(raw: str, results: dict) -> dict:
+    """stage -> zero-argument call, with the inputs taken from a previous run."""
+    tx, loans = results["parse"], results["loans"]
+    monthly, per_loan = results["monthly"]
+    return {
+        "parse": lambda: parse_text_to_tx_df(raw),
+        "loans": lambda: summarize_loans(tx),
+        "views": lambda: build_views(loans),
+        "monthly": lambda: build_loan_months(tx, loans),
+        "monthly_by_loan": lambda: _build_monthly_by_loan(per_loan, monthly),
+        "daily": lambda: daily_frames(tx),
+    }
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def peak_bytes(fn) -> int:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        fn()
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+
+def parity(raw: str, results: dict) -> dict:
+    """stage -> "ok" or what differs, against the original implementations."""
+    checks = {}
+
+    def check(name, fn):
+        try:
+            fn()
+            checks[name] = "ok"
+        except Exception as e:   # en feil i én sjekk skal ikke stoppe resten
+            checks[name] = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+
+    tx = results["parse"]
+    wide = legacy.widen(tx)
+    daily = legacy.expand_to_daily(wide)
+    by_loan, by_company = results["views"]
+    monthly, per_loan = results["monthly"]
+
+    def views():
+        expected_loan, expected_company = legacy.build_views(daily)
+        pd.testing.assert_frame_equal(by_loan, expected_loan, check_exact=True)
+        pd.testing.assert_frame_equal(by_company, expected_company, check_exact=True)
+
+    def monthly_series():
+        pd.testing.assert_frame_equal(monthly, legacy.build_monthly_series(wide, daily), check_exact=True)
+
+    def monthly_by_loan():
+        expected = legacy._build_monthly_by_loan(wide, daily, legacy.build_monthly_series(wide, daily))
+        assert results["monthly_by_loan"] == expected, "per-loan series differ"
+
+    def daily_view():
+        days, side = results["daily"]
+        actual = days.merge(side, on="loan_id", how="left")[list(daily.columns)]
+        pd.testing.assert_frame_equal(actual, daily.reset_index(drop=True), check_exact=True, check_dtype=False)
+
+    check("parse", lambda: pd.testing.assert_frame_equal(wide, legacy.parse_text_to_tx_df(raw), check_exact=True))
+    check("views", views)
+    check("monthly", monthly_series)
+    check("monthly_by_loan", monthly_by_loan)
+    check("daily", daily_view)
+    return checks
+
+
+def run(loans: int, lang: str, repeat: int, with_parity: bool) -> dict:
+    raw = kameo_export(loans, seed=loans, lang=lang)
+    results = run_stages(raw)
+    calls = stage_calls(raw, results)
+    res = {
+        "loans": loans,
+        "lang": lang,
+        "export_bytes": len(raw.encode("utf-8")),
+        "transactions": len(results["parse"]),
+        "daily_rows": len(results["daily"][0]),
+        "stages": {},
+    }
+    for name in STAGES:
+        res["stages"][name] = {
+            "ms": round(best_time(calls[name], repeat) * 1000, 2),
+            "peak_bytes": peak_bytes(calls[name]),
+        }
+    res["total_ms"] = round(sum(s["ms"] for s in res["stages"].values()), 2)
+    if with_parity:
+        res["parity"] = parity(raw, results)
+    return res
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Regressions as "<loans> loans/<stage>: ..." lines; adds the ratios to `results`."""
+    base = {(r["loans"], r["lang"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = base.get((r["loans"], r["lang"]))
+        if b is None:
+            continue
+        for name, stage in r["stages"].items():
+            old = b["stages"].get(name)
+            if old is None:
+                continue
+            for field in ("ms", "peak_bytes"):
+                ratio = stage[field] / old[field] if old[field] else 1.0
+                stage[f"{field}_ratio"] = round(ratio, 2)
+                if ratio > tolerance and not (field == "ms" and old[field] < MIN_MS):
+                    regressions.append(f"{r['loans']} loans/{name}: {field} {old[field]} -> {stage[field]} ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--loans", default="10,1000,10000", help="comma-separated loan counts")
+    ap.add_argument("--lang", default="no", choices=["no", "sv"], help="export language")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    ap.add_argument("--parity", action="store_true", help="check against the original implementations")
+    ap.add_argument("--parity-max", type=int, default=1000, help="largest loan count to run parity for")
+    ap.add_argument("--save", metavar="NAME", help="write results to bench/baselines/NAME.json")
+    ap.add_argument("--compare", metavar="NAME", help="compare with bench/baselines/NAME.json")
+    ap.add_argument("--tolerance", type=float, default=1.25, help="allowed slowdown/memory growth vs the baseline")
+    args = ap.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)  # legacy-koden bruker utfasede pandas-kall
+    results = [
+        run(n, args.lang, args.repeat, args.parity and n <= args.parity_max)
+        for n in map(int, args.loans.split(","))
+    ]
+
+    regressions = []
+    if args.compare:
+        baseline = json.loads((BASELINES / f"{args.compare}.json").read_text())
+        regressions = compare(results, baseline, args.tolerance)
+    if args.save:
+        BASELINES.mkdir(exist_ok=True)
+        (BASELINES / f"{args.save}.json").write_text(json.dumps(results, indent=2) + "\n")
+
+    print(json.dumps(results, indent=2))
+    failed = [f"{r['loans']} loans/{k}: {v}" for r in results for k, v in r.get("parity", {}).items() if v != "ok"]
+    for line in regressions + failed:
+        print(line, file=sys.stderr)
+    sys.exit(1 if regressions or failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Startup report: how long a fresh process takes to import the app and to
+serve the first dashboard page.
+
+Every run is a new Python process, so nothing is warm:
+
+  - import:  `import app.main` (pandas should not be loaded yet)
+  - cold:    first GET / with the warm-up switched off (KAMEO_WARM_UP=0)
+  - warm:    app started with its lifespan warm-up, first GET / once
+             /health reports warm (plus how long the warm-up itself took)
+
+Reported as JSON, best of --repeat runs.
+
+    python bench/startup.py
+    python bench/startup.py --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app.main as main
+out = {"import_s": time.perf_counter() - t0, "pandas_after_import": "pandas" in sys.modules}
+from fastapi.testclient import TestClient
+
+mode = sys.argv[1]
+if mode == "cold":
+    client = TestClient(main.app)
+    t0 = time.perf_counter()
+    client.get("/")
+    out["first_index_s"] = time.perf_counter() - t0
+else:
+    with TestClient(main.app) as client:
+        t0 = time.perf_counter()
+        while not client.get("/health").json()["warm"]:
+            time.sleep(0.01)
+        out["warm_up_s"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        client.get("/")
+        out["first_index_s"] = time.perf_counter() - t0
+print(json.dumps(out))
+"""
+
+
+def probe(mode: str) -> dict:
+    env = dict(os.environ, KAMEO_WARM_UP="0" if mode == "cold" else "1")
+    env.pop("KAMEO_STORE", None)
+    out = subprocess.run([sys.executable, "-c", PROBE, mode], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def best(runs: list, field: str) -> float:
+    return round(min(r[field] for r in runs) * 1000, 1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=3, help="fresh processes per mode (best is kept)")
+    args = ap.parse_args()
+
+    cold = [probe("cold") for _ in range(args.repeat)]
+    warm = [probe("warm") for _ in range(args.repeat)]
+    print(json.dumps({
+        "import_ms": best(cold + warm, "import_s"),
+        "pandas_loaded_at_import": any(r["pandas_after_import"] for r in cold + warm),
+        "cold_first_index_ms": best(cold, "first_index_s"),
+        "warm_up_ms": best(warm, "warm_up_s"),
+        "warm_first_index_ms": best(warm, "first_index_s"),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
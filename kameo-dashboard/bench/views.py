@@ -0,0 +1,79 @@
+"""
+How build_views scales with the number of loans.
+
+Builds synthetic portfolios (app/tests/synthetic.py) and times, per size:
+
+  - legacy:  expand_to_daily + the old per-group build_views (app/tests/legacy.py)
+  - summary: summarize_loans + the vectorised build_views
+
+Both the view step alone and view + its input (daily frame / loan summary)
+are reported, as JSON.
+
+    python bench/views.py
+    python bench/views.py --loans 100,1000,5000 --no-legacy
+"""
+import argparse
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.parser import build_views, parse_text_to_tx_df, summarize_loans  # noqa: E402
+from app.tests import legacy  # noqa: E402
+from app.tests.synthetic import random_portfolio  # noqa: E402
+
+
+def best_of(fn, repeat: int):
+    """Fastest of `repeat` runs (seconds) and the last result."""
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run(loans: int, repeat: int, with_legacy: bool) -> dict:
+    tx = parse_text_to_tx_df(random_portfolio(seed=loans, loans=loans))
+    res = {"loans": loans, "transactions": len(tx)}
+
+    t_summary, summary = best_of(lambda: summarize_loans(tx), repeat)
+    t_views, _ = best_of(lambda: build_views(summary), repeat)
+    res["summary"] = {
+        "input_ms": round(t_summary * 1000, 2),
+        "views_ms": round(t_views * 1000, 2),
+        "total_ms": round((t_summary + t_views) * 1000, 2),
+    }
+
+    if with_legacy:
+        t_daily, daily = best_of(lambda: legacy.expand_to_daily(tx), 1)
+        t_old, _ = best_of(lambda: legacy.build_views(daily), 1)
+        res["daily_rows"] = len(daily)
+        res["legacy"] = {
+            "input_ms": round(t_daily * 1000, 2),
+            "views_ms": round(t_old * 1000, 2),
+            "total_ms": round((t_daily + t_old) * 1000, 2),
+        }
+        res["speedup_views"] = round(t_old / t_views, 1)
+        res["speedup_total"] = round((t_daily + t_old) / (t_summary + t_views), 1)
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--loans", default="100,300,1000", help="comma-separated loan counts")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is kept)")
+    ap.add_argument("--no-legacy", action="store_true", help="skip the slow daily-based reference")
+    args = ap.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)  # legacy-koden bruker utfasede pandas-kall
+    results = [run(int(n), args.repeat, not args.no_legacy) for n in args.loans.split(",")]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .db import get_conn
+
+
+class WriteBatcher:
+    """
+    Groups concurrent funfact inserts into one transaction.
+
+    Callers submit a text and block on a Future for its id. A single
+    background thread takes the first waiting item, collects whatever else
+    arrives within `window_ms` (up to `max_batch` items), inserts them all
+    on the pooled writer connection and commits once. One fsync per batch
+    instead of one per POST.
+    """
+
+    def __init__(self, max_batch: int = 64, window_ms: float = 5.0):
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self._q = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="funfacts-write-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._q.put(None)
+            thread.join(timeout)
+
+    def submit(self, text: str) -> Future:
+        fut = Future()
+        self.start()
+        self._q.put((text, fut))
+        return fut
+
+    def insert(self, text: str, timeout: float = 10.0) -> int:
+        """Queue one insert and wait for its row id."""
+        return self.submit(text).result(timeout)
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._q.put(None)  # stopp etter denne batchen
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._q.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            try:
+                ids = []
+                with get_conn(write=True) as conn:
+                    with conn:
+                        for text, _ in batch:
+                            cur = conn.execute("INSERT INTO funfacts (text) VALUES (?)", (text,))
+                            ids.append(cur.lastrowid)
+            except Exception as exc:
+                for _, fut in batch:
+                    fut.set_exception(exc)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, fut), fact_id in zip(batch, ids):
+                fut.set_result(fact_id)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": self.items / self.batches if self.batches else 0.0,
+            "queued": self._q.qsize(),
+        }
@@ -0,0 +1,206 @@
+import asyncio
+import codecs
+import csv
+import io
+import json
+import logging
+import time
+
+from pydantic import ValidationError
+
+from .db import get_conn
+from .models import FunFactIn
+
+log = logging.getLogger("funfacts.bulk")
+
+CHUNK_ROWS = 500      # rader per transaksjon (import) / per fetchmany (eksport)
+MAX_ERRORS = 20       # antall feil vi rapporterer tilbake
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def detect_format(content_type: str, explicit: str = None) -> str:
+    if explicit:
+        return explicit
+    ct = (content_type or "").split(";", 1)[0].strip().lower()
+    return "csv" if ct in ("text/csv", "application/csv") else "ndjson"
+
+
+# ---- import ----
+def iter_request_body(request, loop):
+    """
+    Sync iterator over the raw request body, for use in a worker thread.
+    Chunks are pulled from the ASGI stream on `loop` on demand, so the
+    body is never buffered as a whole.
+    """
+    stream = request.stream().__aiter__()
+
+    async def _next():
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    while True:
+        chunk = asyncio.run_coroutine_threadsafe(_next(), loop).result()
+        if chunk is None:
+            return
+        if chunk:
+            yield chunk
+
+
+def _iter_lines(chunks):
+    """bytes chunks -> text lines (newline kept, csv needs it for quoted fields)."""
+    pending = ""
+    for text in codecs.iterdecode(chunks, "utf-8"):
+        pending += text
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+def _iter_texts(lines, fmt: str):
+    """Yield (line_no, raw_text_or_None, error_or_None) per record."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames or "text" not in reader.fieldnames:
+            yield 1, None, "CSV header must contain a 'text' column"
+            return
+        for rec in reader:
+            yield reader.line_num, rec.get("text"), None
+        return
+
+    for no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield no, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(obj, dict):
+            yield no, None, "Expected a JSON object"
+            continue
+        yield no, obj.get("text"), None
+
+
+def _validate(raw):
+    try:
+        text = FunFactIn(text=raw).text.strip()
+    except ValidationError:
+        return None, "Field 'text' must be a string"
+    if not text:
+        return None, "Empty text"
+    return text, None
+
+
+def insert_batch(conn, batch):
+    with conn:
+        conn.executemany("INSERT INTO funfacts (text) VALUES (?)", batch)
+
+
+def _flush(batch):
+    with get_conn(write=True) as conn:
+        insert_batch(conn, batch)
+
+
+def import_stream(chunks, fmt: str, flush=_flush) -> dict:
+    """
+    Validate records as they stream in and insert them with executemany,
+    CHUNK_ROWS per transaction. The writer connection is released between
+    chunks so normal POST/DELETE requests can interleave with a big import.
+    `flush(batch)` does the insert; the API passes one that queues it on
+    the DB executor's writer thread.
+    """
+    t0 = time.perf_counter()
+    inserted = rejected = 0
+    errors = []
+    batch = []
+
+    records = _iter_texts(_iter_lines(chunks), fmt)
+    try:
+        for line_no, raw, err in records:
+            if err is None:
+                text, err = _validate(raw)
+            if err is not None:
+                rejected += 1
+                if len(errors) < MAX_ERRORS:
+                    errors.append({"line": line_no, "error": err})
+                continue
+            batch.append((text,))
+            if len(batch) >= CHUNK_ROWS:
+                flush(batch)
+                inserted += len(batch)
+                batch = []
+    except UnicodeDecodeError:
+        # Resten av strømmen kan ikke leses; behold det som er gyldig så langt
+        errors.append({"line": None, "error": "Body is not valid UTF-8, import stopped"})
+
+    if batch:
+        flush(batch)
+        inserted += len(batch)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "inserted": inserted,
+        "rejected": rejected,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(inserted / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+# ---- export ----
+def export_page(conn, after_id: int, limit: int = None):
+    """The next page of rows after `after_id`, by id (keyset, so every page costs the same)."""
+    return conn.execute(
+        "SELECT id, text, created_at FROM funfacts WHERE id > ? ORDER BY id LIMIT ?",
+        (after_id, limit or CHUNK_ROWS),
+    ).fetchall()
+
+
+def _encode(rows, fmt: str, header: bool = False) -> bytes:
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buf, lineterminator="\n")
+        if header:
+            writer.writerow(["id", "text", "created_at"])
+        writer.writerows([r["id"], r["text"], r["created_at"]] for r in rows)
+    else:
+        for r in rows:
+            buf.write(json.dumps(
+                {"id": r["id"], "text": r["text"], "created_at": r["created_at"]},
+                ensure_ascii=False,
+            ))
+            buf.write("\n")
+    return buf.getvalue().encode("utf-8")
+
+
+async def export_stream(fmt: str, read):
+    """
+    Stream the whole table, CHUNK_ROWS at a time. `read(fn, *args)` runs a
+    query with a pooled reader (DBExecutor.read); the reader is checked out
+    for one page at a time and given back before the page is sent, so a
+    slow client never holds a connection.
+    """
+    t0 = time.perf_counter()
+    rows = 0
+    last_id = 0
+    if fmt == "csv":
+        yield _encode([], fmt, header=True)
+    while True:
+        page = await read(export_page, last_id)
+        if not page:
+            break
+        last_id = page[-1]["id"]
+        rows += len(page)
+        yield _encode(page, fmt)
+
+    elapsed = time.perf_counter() - t0
+    log.info("export %s: %d rows in %.2fs (%.0f rows/s)",
+             fmt, rows, elapsed, rows / elapsed if elapsed > 0 else 0.0)
@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Small LRU for computed response bodies, invalidated on write.
+
+    Every entry remembers the table version it was computed at. A lookup
+    with a different version is a miss, so a write from any worker (which
+    bumps the version via triggers, see db.table_version) invalidates
+    exactly the entries it made stale - no timers involved. Local writes
+    also call invalidate() to drop the stale entries right away.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    def get_or_set(self, key, version, compute):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == (self.generation, version):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            stamp = (self.generation, version)
+
+        value = compute()
+
+        with self._lock:
+            # Ikke lagre hvis noen har invalidert mens vi regnet
+            if stamp[0] == self.generation:
+                self._data[key] = (stamp, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "generation": self.generation,
+            }
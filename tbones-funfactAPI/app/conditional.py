@@ -0,0 +1,80 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+
+def table_state(conn):
+    """(version, max_id, last_modified) in one query, O(1)."""
+    row = conn.execute(
+        """
+        SELECT version, updated_at, (SELECT MAX(id) FROM funfacts) AS max_id
+        FROM funfacts_meta WHERE id = 1
+        """
+    ).fetchone()
+    modified = None
+    if row["updated_at"]:
+        modified = datetime.strptime(row["updated_at"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return row["version"], row["max_id"] or 0, modified
+
+
+class Validators:
+    """
+    Strong ETag + Last-Modified for a response derived from the table.
+
+    The ETag covers the table version (bumped on every write), the max id,
+    and the request path/query plus API version, since different pages and
+    params are different representations of the same table state.
+
+    Last-Modified only has one-second resolution, so it is left out until
+    the second of the last write is over: a second write in that same
+    second would carry the same date, and a client revalidating with only
+    If-Modified-Since would get a false 304. Until then only the ETag
+    (the version) validates.
+    """
+
+    def __init__(self, request: Request, state, api_version: str, max_age: int = 0):
+        version, max_id, modified = state
+        rep = f"{api_version} {request.url.path}?{request.url.query}".encode()
+        digest = hashlib.blake2s(rep, digest_size=6).hexdigest()
+        self.etag = f'"v{version}-{max_id}-{digest}"'
+        # Ingen Last-Modified før sekundet er over, se over
+        if modified is not None and datetime.now(timezone.utc) < modified + timedelta(seconds=1):
+            modified = None
+        self.last_modified = modified
+        self.max_age = max_age
+        self.request = request
+
+    def headers(self) -> dict:
+        h = {
+            "ETag": self.etag,
+            # Cache hos Caddy/klient, men sjekk alltid med oss når max-age har gått ut
+            "Cache-Control": f"public, max-age={self.max_age}, must-revalidate",
+        }
+        if self.last_modified:
+            h["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return h
+
+    def is_fresh(self) -> bool:
+        """True if the client's copy is current (If-None-Match wins over If-Modified-Since)."""
+        inm = self.request.headers.get("if-none-match")
+        if inm is not None:
+            tags = [t.strip() for t in inm.split(",")]
+            return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+        ims = self.request.headers.get("if-modified-since")
+        if ims and self.last_modified:
+            try:
+                since = parsedate_to_datetime(ims)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.last_modified <= since
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+    def apply(self, response: Response):
+        response.headers.update(self.headers())
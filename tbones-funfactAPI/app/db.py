@@ -1,21 +1,247 @@
+import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
-# peker til data/funfacts.db i prosjektroten
-DB_PATH = Path(__file__).resolve().parent.parent / "data" / "funfacts.db"
+# peker til data/funfacts.db i prosjektroten (FUNFACTS_DB_PATH overstyrer, f.eks. for benchmarks)
+DB_PATH = Path(os.getenv("FUNFACTS_DB_PATH") or Path(__file__).resolve().parent.parent / "data" / "funfacts.db")
 
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
+# Lagringstuning, kjøres på hver ny forbindelse.
+# WAL lets /funfact readers keep going while a write commits, and with WAL
+# synchronous=NORMAL only fsyncs at checkpoints (safe against app crashes,
+# may lose the last commits on power loss - fine for funfacts on an SD card).
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,                       # ms, instead of instant "database is locked"
+    "cache_size": -int(os.getenv("FUNFACTS_CACHE_KB", "8192")),   # negative = KiB
+    "mmap_size": int(os.getenv("FUNFACTS_MMAP_MB", "64")) * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the wait timeout."""
+
+
+def connect():
+    """Open a standalone connection (the pool uses this for every slot)."""
+    # check_same_thread=False: a pooled connection moves between threadpool
+    # threads, but is only ever used by one request at a time.
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    apply_pragmas(conn)
     return conn
 
+
+def apply_pragmas(conn, pragmas: dict = None):
+    for name, value in (pragmas or PRAGMAS).items():
+        conn.execute(f"PRAGMA {name}={value}")
+
+
+class ConnectionPool:
+    """
+    Bounded pool of pre-opened SQLite connections: one writer plus N readers.
+
+    SQLite only allows one writer at a time anyway, so writes queue on the
+    single writer connection instead of fighting over the file lock, while
+    reads spread over the reader connections.
+    """
+
+    def __init__(self, readers: int = 4, timeout: float = 5.0):
+        self.size = readers
+        self.timeout = timeout
+        self._readers = queue.LifoQueue()
+        self._writer = queue.Queue(maxsize=1)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "in_use": 0,
+        }
+        for _ in range(readers):
+            self._readers.put(connect())
+        self._writer.put(connect())
+
+    def _checkout(self, q: queue.Queue):
+        if self._closed:
+            raise PoolTimeout("Connection pool is closed")
+        t0 = time.perf_counter()
+        try:
+            conn = q.get_nowait()
+            waited = False
+        except queue.Empty:
+            waited = True
+            try:
+                conn = q.get(timeout=self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise PoolTimeout(f"No free connection after {self.timeout:.1f}s")
+        wait_ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            s = self._stats
+            s["checkouts"] += 1
+            s["in_use"] += 1
+            if waited:
+                s["waits"] += 1
+                s["wait_ms_total"] += wait_ms
+                s["wait_ms_max"] = max(s["wait_ms_max"], wait_ms)
+        return conn
+
+    def _checkin(self, q: queue.Queue, conn):
+        # Aldri lever tilbake en forbindelse med åpen transaksjon
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._stats["in_use"] -= 1
+        if self._closed:
+            conn.close()
+        else:
+            q.put(conn)
+
+    @contextmanager
+    def reader(self):
+        conn = self._checkout(self._readers)
+        try:
+            yield conn
+        finally:
+            self._checkin(self._readers, conn)
+
+    @contextmanager
+    def writer(self):
+        conn = self._checkout(self._writer)
+        try:
+            yield conn
+        finally:
+            self._checkin(self._writer, conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        s["readers"] = self.size
+        s["writers"] = 1
+        s["readers_idle"] = self._readers.qsize()
+        s["wait_ms_avg"] = s["wait_ms_total"] / s["waits"] if s["waits"] else 0.0
+        return s
+
+    def close(self):
+        self._closed = True
+        for q in (self._readers, self._writer):
+            while True:
+                try:
+                    q.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    readers=int(os.getenv("FUNFACTS_POOL_READERS", "4")),
+                    timeout=float(os.getenv("FUNFACTS_POOL_TIMEOUT", "5")),
+                )
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_conn(write: bool = False):
+    """Check out a pooled connection: `with get_conn() as conn: ...`"""
+    pool = get_pool()
+    return pool.writer() if write else pool.reader()
+
+
+def _init_fts(conn):
+    """
+    FTS5 index over funfacts.text (external content, so the text is not
+    stored twice), kept in sync by triggers. Built from existing rows the
+    first time it is created.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'funfacts_fts'"
+    ).fetchone()
+    conn.executescript("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS funfacts_fts USING fts5(
+          text, content='funfacts', content_rowid='id'
+        );
+        CREATE TRIGGER IF NOT EXISTS funfacts_fts_ai AFTER INSERT ON funfacts BEGIN
+          INSERT INTO funfacts_fts(rowid, text) VALUES (new.id, new.text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS funfacts_fts_ad AFTER DELETE ON funfacts BEGIN
+          INSERT INTO funfacts_fts(funfacts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS funfacts_fts_au AFTER UPDATE OF text ON funfacts BEGIN
+          INSERT INTO funfacts_fts(funfacts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+          INSERT INTO funfacts_fts(rowid, text) VALUES (new.id, new.text);
+        END;
+    """)
+    if not exists:
+        conn.execute("INSERT INTO funfacts_fts(funfacts_fts) VALUES ('rebuild')")
+
+
+def _init_meta(conn):
+    """
+    Single-row change counter, bumped by triggers on every insert, delete
+    and update of funfacts. Shared by all workers through the database,
+    so caches can tell when the table changed without counting rows.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS funfacts_meta (
+          id INTEGER PRIMARY KEY CHECK (id = 1),
+          version INTEGER NOT NULL DEFAULT 0,
+          updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT OR IGNORE INTO funfacts_meta (id) VALUES (1);
+        CREATE TRIGGER IF NOT EXISTS funfacts_meta_ai AFTER INSERT ON funfacts BEGIN
+          UPDATE funfacts_meta SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS funfacts_meta_ad AFTER DELETE ON funfacts BEGIN
+          UPDATE funfacts_meta SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS funfacts_meta_au AFTER UPDATE ON funfacts BEGIN
+          UPDATE funfacts_meta SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+        END;
+    """)
+
+
+def table_version(conn) -> int:
+    return conn.execute("SELECT version FROM funfacts_meta WHERE id = 1").fetchone()[0]
+
+
 def init_db():
-    with get_conn() as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS funfacts (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              text TEXT NOT NULL,
-              created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
+    conn = connect()
+    try:
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS funfacts (
+                  id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  text TEXT NOT NULL,
+                  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            _init_fts(conn)
+            _init_meta(conn)
+    finally:
+        conn.close()
+    get_pool()
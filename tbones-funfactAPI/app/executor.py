@@ -0,0 +1,75 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from starlette.concurrency import run_in_threadpool
+
+from .db import get_conn
+
+MODES = ("async", "sync")
+
+
+class DBExecutor:
+    """
+    Async access to the pooled SQLite connections.
+
+    `await db_exec.read(fn, *args)` runs `fn(conn, *args)` with a pooled
+    reader on a reader thread pool sized to the reader connections, and
+    `await db_exec.write(fn, *args)` runs it with the writer connection on
+    a single writer thread. There is only one writer connection, so writes
+    queue here, on the event loop, instead of parking threads inside
+    get_conn(): a burst of POSTs never holds up GETs. Long jobs that wait
+    on a client (bulk import reading the request body) get a third, small
+    pool of their own, so a slow upload never holds a reader thread.
+    None of the pools compete with Starlette's shared threadpool (file
+    responses, sync deps, ...).
+
+    mode="sync" routes the same calls through Starlette's default threadpool
+    instead, i.e. what plain `def` endpoints do. Kept for benchmarking
+    (bench/async_vs_sync.py).
+    """
+
+    def __init__(self, readers: int, jobs: int = 2, mode: str = "async"):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self._sizes = {"read": readers, "write": 1, "job": jobs}
+        self._pools = {}
+
+    def _executor(self, kind: str):
+        pool = self._pools.get(kind)
+        if pool is None:
+            pool = self._pools[kind] = ThreadPoolExecutor(
+                self._sizes[kind], thread_name_prefix=f"funfacts-db-{kind}"
+            )
+        return pool
+
+    @staticmethod
+    def _call(write: bool, fn, args):
+        with get_conn(write=write) as conn:
+            return fn(conn, *args)
+
+    async def _submit(self, kind: str, call):
+        if self.mode == "sync":
+            return await run_in_threadpool(call)
+        return await asyncio.get_running_loop().run_in_executor(self._executor(kind), call)
+
+    async def read(self, fn, *args):
+        return await self._submit("read", partial(self._call, False, fn, args))
+
+    async def write(self, fn, *args):
+        return await self._submit("write", partial(self._call, True, fn, args))
+
+    async def run(self, fn, *args):
+        """
+        Run `fn(*args)` on the job pool without checking out a connection,
+        for long jobs that manage their own (bulk import: it reads the request
+        body and hands each chunk to write() through the event loop). At most
+        `jobs` run at once; the rest queue.
+        """
+        return await self._submit("job", partial(fn, *args))
+
+    def shutdown(self):
+        pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=True)
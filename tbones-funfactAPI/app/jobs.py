@@ -0,0 +1,229 @@
+"""
+Maintenance jobs that rewrite a text column in place (cron or by hand).
+
+A job is a plain Python `str -> str` function. The runner registers it as
+an SQL function so the whole table can be cleaned with one set-based
+UPDATE, or walks the table in id-ordered chunks with executemany when the
+write lock should be released between chunks. Either way it takes an
+online backup first, can dry-run, and prints progress.
+
+The triggers in db.py keep the FTS index and the change counter in sync,
+so a running API picks the changes up without a restart.
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from . import db
+
+CHUNK_ROWS = 1000        # rader per transaksjon i chunked-modus
+BACKUP_PAGES = 1024      # sider per backup-steg (4 MiB med standard sidestørrelse)
+PROGRESS_EVERY = 5000    # rader mellom hver fremdriftslinje
+SAMPLES = 5              # eksempler som vises ved --dry-run
+
+
+def open_db(path: Path) -> sqlite3.Connection:
+    """Standalone connection with the app's pragmas (WAL, busy_timeout)."""
+    if not path.exists():
+        raise SystemExit(f"Cant find database file: {path}")
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    db.apply_pragmas(conn)
+    return conn
+
+
+class Progress:
+    def __init__(self, label: str, total: int, quiet: bool = False, every: int = PROGRESS_EVERY):
+        self.label = label
+        self.total = total
+        self.quiet = quiet
+        self.every = every
+        self.done = 0
+        self._next = every
+        self.t0 = time.perf_counter()
+
+    def tick(self, n: int = 1):
+        self.done += n
+        if self.done >= self._next:
+            self._next = self.done + self.every
+            self.report()
+
+    def report(self):
+        if self.quiet:
+            return
+        pct = self.done / self.total * 100 if self.total else 100.0
+        print(f"[i] {self.label}: {self.done}/{self.total} ({pct:.0f}%)", file=sys.stderr)
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.t0
+
+
+def backup(conn: sqlite3.Connection, src_path: Path, dest: Path = None, quiet: bool = False) -> Path:
+    """
+    Consistent copy via the SQLite online backup API. Unlike copying the
+    file, this is safe while the API is writing (and includes the WAL);
+    SQLite restarts the copy if another connection writes mid-way.
+    """
+    if dest is None:
+        ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+        dest = src_path.with_name(f"{src_path.stem}-backup-{ts}{src_path.suffix}")
+
+    def progress(status, remaining, total):
+        if not quiet and total:
+            print(f"[i] backup: {total - remaining}/{total} pages", file=sys.stderr)
+
+    target = sqlite3.connect(str(dest))
+    try:
+        conn.backup(target, pages=BACKUP_PAGES, progress=progress)
+    finally:
+        target.close()
+    return dest
+
+
+class TextRewrite:
+    """
+    Rewrite `table.column` with `fn`. Non-text values (NULL, blobs) are
+    left alone, and rows where `fn` returns the same text are not written.
+    """
+
+    def __init__(self, name: str, fn, table: str = "funfacts", column: str = "text"):
+        self.name = name
+        self.fn = fn
+        self.table = table
+        self.column = column
+
+    def _apply(self, value):
+        return self.fn(value) if isinstance(value, str) else value
+
+    def _register(self, conn, progress: Progress = None):
+        conn.create_function(self.name, 1, self._apply, deterministic=True)
+
+        # Egen variant for WHERE-leddet, teller skannede rader for fremdrift
+        def scan(value):
+            progress.tick()
+            return self._apply(value)
+
+        conn.create_function(f"{self.name}_scan", 1, scan if progress else self._apply)
+
+    def _count(self, conn) -> int:
+        return conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def dry_run(self, conn, quiet: bool = False) -> dict:
+        """Stream the would-be changes through a cursor without writing anything."""
+        progress = Progress(f"{self.name} (dry run)", self._count(conn), quiet)
+        self._register(conn, progress)
+        cur = conn.execute(
+            f"""
+            SELECT id, {self.column} AS old, {self.name}({self.column}) AS new
+            FROM {self.table}
+            WHERE typeof({self.column}) = 'text' AND {self.name}_scan({self.column}) IS NOT {self.column}
+            """
+        )
+        changed = 0
+        while True:
+            rows = cur.fetchmany(CHUNK_ROWS)
+            if not rows:
+                break
+            for r in rows:
+                if changed < SAMPLES and not quiet:
+                    print(f"    #{r['id']}: {r['old']!r} -> {r['new']!r}")
+                changed += 1
+        return self._result(progress, changed)
+
+    def run_set(self, conn, quiet: bool = False) -> dict:
+        """One UPDATE statement, one transaction; fn runs inside SQLite."""
+        progress = Progress(self.name, self._count(conn), quiet)
+        self._register(conn, progress)
+        with conn:
+            cur = conn.execute(
+                f"""
+                UPDATE {self.table} SET {self.column} = {self.name}({self.column})
+                WHERE typeof({self.column}) = 'text' AND {self.name}_scan({self.column}) IS NOT {self.column}
+                """
+            )
+        return self._result(progress, cur.rowcount)
+
+    def run_chunked(self, conn, chunk: int = CHUNK_ROWS, quiet: bool = False) -> dict:
+        """
+        Keyset walk over the id index, `chunk` rows per transaction with
+        executemany. Holds the write lock only per chunk, so the API can
+        keep writing while a big table is cleaned.
+        """
+        progress = Progress(self.name, self._count(conn), quiet)
+        changed = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT id, {self.column} FROM {self.table} WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunk),
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            updates = []
+            for row_id, value in rows:
+                new = self._apply(value)
+                if new != value:
+                    updates.append((new, row_id))
+            if updates:
+                with conn:
+                    conn.executemany(f"UPDATE {self.table} SET {self.column} = ? WHERE id = ?", updates)
+                changed += len(updates)
+            progress.tick(len(rows))
+        return self._result(progress, changed)
+
+    @staticmethod
+    def _result(progress: Progress, changed: int) -> dict:
+        seconds = progress.seconds
+        progress.report()
+        return {
+            "rows": progress.total,
+            "changed": changed,
+            "unchanged": progress.total - changed,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(progress.total / seconds, 1) if seconds > 0 else 0.0,
+        }
+
+
+def run_cli(job: TextRewrite, argv=None, description: str = None) -> int:
+    """Shared command line for TextRewrite jobs."""
+    ap = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", type=Path, default=db.DB_PATH, help=f"database file (default: {db.DB_PATH})")
+    ap.add_argument("--dry-run", action="store_true", help="show what would change, write nothing")
+    ap.add_argument("--mode", choices=("set", "chunked"), default="set",
+                    help="set: one UPDATE statement (fastest); chunked: short transactions of --chunk rows")
+    ap.add_argument("--chunk", type=int, default=CHUNK_ROWS)
+    ap.add_argument("--backup-to", type=Path, help="backup file (default: next to the database)")
+    ap.add_argument("--no-backup", action="store_true")
+    ap.add_argument("-q", "--quiet", action="store_true", help="no progress output")
+    args = ap.parse_args(argv)
+
+    conn = open_db(args.db)
+    try:
+        if args.dry_run:
+            result = job.dry_run(conn, args.quiet)
+            print(f"[i] Dry run. Would change: {result['changed']}, Unchanged: {result['unchanged']}")
+            return 0
+
+        backup_path = None
+        if not args.no_backup:
+            backup_path = backup(conn, args.db, args.backup_to, args.quiet)
+            print(f"[i] Backup created: {backup_path}")
+
+        if args.mode == "set":
+            result = job.run_set(conn, args.quiet)
+        else:
+            result = job.run_chunked(conn, args.chunk, args.quiet)
+    finally:
+        conn.close()
+
+    print(f"[✓] Finished. Changed: {result['changed']}, Unchanged: {result['unchanged']} "
+          f"({result['seconds']}s, {result['rows_per_sec']} rows/s)")
+    if backup_path:
+        print("Tip: If something went wrong, restore the backup with the API stopped:")
+        print(f"      sqlite3 '{args.db}' \".restore '{backup_path}'\"")
+    return 0
@@ -1,16 +1,28 @@
+import asyncio
+import base64
+import binascii
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Union
 
-from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from starlette.middleware.sessions import SessionMiddleware
 from dotenv import load_dotenv
 
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
-from .db import get_conn, init_db
-from .models import FunFactIn, FunFact
+from . import bulk, search
+from .batcher import WriteBatcher
+from .cache import ResponseCache
+from .conditional import Validators, table_state
+from .db import PoolTimeout, close_pool, get_pool, init_db
+from .executor import DBExecutor
+from .metrics import Metrics, MetricsMiddleware
+from .models import FunFactIn, FunFact, FunFactHit, FunFactPage
+from .picker import picker
 
 # Load .env next to this file (for API_TOKEN, SECRET_KEY)
 load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env")
@@ -18,9 +30,53 @@ load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env")
 API_TOKEN = os.getenv("API_TOKEN")               # token for API writes
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-key")  # session cookie key (set a strong one in prod!)
 
-app = FastAPI(title="Funfacts API", version="1.3.0")
+LOCAL_TZ = ZoneInfo(os.getenv("TZ", "Europe/Oslo"))
+
+# max-age for cacheable GETs; 0 = always revalidate (cheap 304 when unchanged)
+CACHE_MAX_AGE = int(os.getenv("FUNFACTS_CACHE_MAX_AGE", "0"))
+
+# /stats and list pages, invalidated on write (see cache.py)
+response_cache = ResponseCache(maxsize=int(os.getenv("FUNFACTS_CACHE_ENTRIES", "256")))
+
+# Optional write queue: concurrent POST /funfacts share one transaction
+write_batcher = (
+    WriteBatcher(
+        max_batch=int(os.getenv("FUNFACTS_WRITE_BATCH_MAX", "64")),
+        window_ms=float(os.getenv("FUNFACTS_WRITE_BATCH_MS", "5")),
+    )
+    if os.getenv("FUNFACTS_WRITE_BATCHING", "0") == "1" else None
+)
+
+# Alle DB-kall fra endepunktene går via denne (lesetråder, én skrivetråd og bulk-jobber, se executor.py)
+db_exec = DBExecutor(
+    readers=int(os.getenv("FUNFACTS_POOL_READERS", "4")),
+    jobs=int(os.getenv("FUNFACTS_BULK_JOBS", "2")),
+    mode=os.getenv("FUNFACTS_DB_MODE", "async"),
+)
+
+# Prometheus-tekst på /metrics (per prosess, hver uvicorn-worker har sine egne tall)
+metrics = Metrics("funfacts")
+metrics.add_gauge("db_pool", "Connection pool counters and utilisation.", lambda: get_pool().stats(), label="stat")
+metrics.add_gauge("response_cache", "Response cache counters.", response_cache.stats, label="stat")
+if write_batcher is not None:
+    metrics.add_gauge("write_batcher", "Write batching counters.", write_batcher.stats, label="stat")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Tøm skrivekøen og lukk alle forbindelser i poolen ved nedstenging
+    if write_batcher is not None:
+        write_batcher.stop()
+    db_exec.shutdown()
+    close_pool()
+
+app = FastAPI(title="Funfacts API", version="1.3.0", lifespan=lifespan)
 init_db()
 
+@app.exception_handler(PoolTimeout)
+def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": "Database busy, try again"})
+
 from .admin import router as admin_router
 app.include_router(admin_router)
 
@@ -34,7 +90,10 @@ app.add_middleware(
     same_site="lax"
 )
 
-def require_token(
+# Added last = outermost user middleware, so the timing includes the session cookie handling
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+async def require_token(
     authorization: Optional[str] = Header(default=None),
     request: Request = None
 ):
@@ -58,69 +117,242 @@ def require_token(
         raise HTTPException(status_code=403, detail="Invalid token")
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
+def _compute_stats(conn):
+    total = conn.execute("SELECT COUNT(*) AS c FROM funfacts").fetchone()["c"]
+    row = conn.execute(
+        "SELECT created_at FROM funfacts ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+
+    latest_utc = latest_local = None
+    if row and row["created_at"]:
+        # SQLite CURRENT_TIMESTAMP -> 'YYYY-MM-DD HH:MM:SS' in UTC (naiv)
+        dt_utc = datetime.strptime(row["created_at"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+        latest_utc = dt_utc.isoformat()
+        latest_local = dt_utc.astimezone(LOCAL_TZ).isoformat()
+
+    return {
+        "count": total,
+        "latest_created_at_utc": latest_utc,
+        "latest_created_at_local": latest_local,
+    }
+
+def _validators(request: Request, state) -> Validators:
+    return Validators(request, state, app.version, CACHE_MAX_AGE)
+
 @app.get("/stats")
-def stats():
-    with get_conn() as conn:
-        total = conn.execute("SELECT COUNT(*) AS c FROM funfacts").fetchone()["c"]
-        row = conn.execute(
-            "SELECT created_at FROM funfacts ORDER BY id DESC LIMIT 1"
-        ).fetchone()
+async def stats(request: Request, response: Response):
+    def work(conn):
+        state = table_state(conn)
+        v = _validators(request, state)
+        if v.is_fresh():
+            return v.not_modified()
+        v.apply(response)
+        return response_cache.get_or_set(("stats",), state[0], lambda: _compute_stats(conn))
+    return await db_exec.read(work)
 
-        latest_utc = latest_local = None
-        if row and row["created_at"]:
-            # SQLite CURRENT_TIMESTAMP -> 'YYYY-MM-DD HH:MM:SS' in UTC (naiv)
-            dt_utc = datetime.strptime(row["created_at"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-            latest_utc = dt_utc.isoformat()
-            tz = ZoneInfo(os.getenv("TZ", "Europe/Oslo"))
-            latest_local = dt_utc.astimezone(tz).isoformat()
+@app.get("/stats/pool")
+async def pool_stats():
+    """Connection pool size, utilisation and checkout wait times."""
+    out = get_pool().stats()
+    out["db_mode"] = db_exec.mode
+    if write_batcher is not None:
+        out["write_batcher"] = write_batcher.stats()
+    return out
 
-        return {
-            "count": total,
-            "latest_created_at_utc": latest_utc,
-            "latest_created_at_local": latest_local,
-        }
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint():
+    """Request counts, per-route latency histograms and pool/cache gauges (Prometheus text format)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-@app.get("/funfact", response_model=FunFact)
-def get_random_funfact():
-    # 100% uniform random via SQLite RNG, fine for hundreds/thousands of rows
-    with get_conn() as conn:
+@app.get("/stats/cache")
+async def cache_stats():
+    """Response cache size and hit/miss counters."""
+    return response_cache.stats()
+
+def _random_fact(conn, client: Optional[str]):
+    picker.sync(conn)
+    while True:
+        fact_id = picker.pick(client)
+        if fact_id is None:
+            raise HTTPException(status_code=404, detail="No funfacts yet")
         row = conn.execute(
-            "SELECT id, text FROM funfacts ORDER BY RANDOM() LIMIT 1"
+            "SELECT id, text FROM funfacts WHERE id = ?", (fact_id,)
         ).fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="No funfacts yet")
-        return {"id": row["id"], "text": row["text"]}
+        if row:
+            return {"id": row["id"], "text": row["text"]}
+        # Slettet av en annen worker siden sist
+        picker.discard(fact_id)
+
+@app.get("/funfact", response_model=FunFact)
+async def get_random_funfact(
+    response: Response,
+    client: Optional[str] = Query(None, max_length=64)
+):
+    """
+    Uniform random funfact, O(1) via the in-memory id picker.
+    Pass `client=<name>` to get no repeats until that client has seen them all.
+    """
+    # Nytt svar hver gang, skal aldri caches
+    response.headers["Cache-Control"] = "no-store"
+    return await db_exec.read(_random_fact, client)
+
+def _encode_cursor(fact_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{fact_id}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        kind, value = raw.split(":", 1)
+        if kind != "id":
+            raise ValueError(kind)
+        return int(value)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _list_page(conn, limit: int, offset: int, keyset: bool, before_id: Optional[int]):
+    if keyset:
+        if before_id is not None:
+            sql, params = "SELECT id, text FROM funfacts WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit + 1)
+        else:
+            sql, params = "SELECT id, text FROM funfacts ORDER BY id DESC LIMIT ?", (limit + 1,)
+    else:
+        sql, params = "SELECT id, text FROM funfacts ORDER BY id DESC LIMIT ? OFFSET ?", (limit + 1, offset)
 
-@app.get("/funfacts", response_model=List[FunFact])
-def list_funfacts(
+    rows = conn.execute(sql, params).fetchall()
+    items = [{"id": r["id"], "text": r["text"]} for r in rows[:limit]]
+    next_cursor = _encode_cursor(items[-1]["id"]) if len(rows) > limit else None
+    return items, next_cursor
+
+@app.get("/funfacts", response_model=Union[List[FunFact], FunFactPage])
+async def list_funfacts(
+    request: Request,
+    response: Response,
     limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, max_length=64)
+):
+    """
+    Newest first. Two modes:
+      - `?cursor=` (empty for the first page): keyset pagination, returns
+        `{items, next_cursor}`. Seeks on the id index, so every page costs
+        the same no matter how deep it is.
+      - `?limit=&offset=` (legacy): plain list, OFFSET walks skipped rows.
+    Both modes set `X-Next-Cursor` when there are more rows.
+    """
+    keyset = cursor is not None
+    before_id = _decode_cursor(cursor) if cursor else None
+    if keyset:
+        offset = 0
+
+    def work(conn):
+        state = table_state(conn)
+        v = _validators(request, state)
+        if v.is_fresh():
+            return v
+        v.apply(response)
+        return response_cache.get_or_set(
+            ("funfacts", limit, offset, keyset, before_id),
+            state[0],
+            lambda: _list_page(conn, limit, offset, keyset, before_id),
+        )
+
+    result = await db_exec.read(work)
+    if isinstance(result, Validators):
+        return result.not_modified()
+    items, next_cursor = result
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    if keyset:
+        return {"items": items, "next_cursor": next_cursor}
+    return items
+
+@app.get("/funfacts/search", response_model=List[FunFactHit])
+async def search_funfacts(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0)
 ):
-    with get_conn() as conn:
-        rows = conn.execute(
-            "SELECT id, text FROM funfacts ORDER BY id DESC LIMIT ? OFFSET ?",
-            (limit, offset)
-        ).fetchall()
-        return [{"id": r["id"], "text": r["text"]} for r in rows]
+    """Full-text search, best match first. `highlight` is HTML-escaped with <mark> around hits."""
+    def work(conn):
+        v = _validators(request, table_state(conn))
+        if v.is_fresh():
+            return v.not_modified()
+        v.apply(response)
+        return search.search(conn, q, limit, offset)
+    return await db_exec.read(work)
+
+def _insert_fact(conn, text: str) -> int:
+    cur = conn.execute("INSERT INTO funfacts (text) VALUES (?)", (text,))
+    conn.commit()
+    return cur.lastrowid
 
 @app.post("/funfacts", status_code=201)
-def add_funfact(payload: FunFactIn, _=Depends(require_token)):
+async def add_funfact(payload: FunFactIn, _=Depends(require_token)):
     text = (payload.text or "").strip()
     if not text:
         raise HTTPException(status_code=400, detail="Empty text")
-    with get_conn() as conn:
-        cur = conn.execute("INSERT INTO funfacts (text) VALUES (?)", (text,))
-        conn.commit()
-        return {"id": cur.lastrowid, "text": text}
+    dup_id = await db_exec.read(search.find_duplicate, text)
+    if dup_id is not None:
+        raise HTTPException(status_code=409, detail=f"Duplicate of #{dup_id}")
+    if write_batcher is not None:
+        fact_id = await asyncio.wrap_future(write_batcher.submit(text))
+    else:
+        fact_id = await db_exec.write(_insert_fact, text)
+    picker.add(fact_id)
+    response_cache.invalidate()
+    return {"id": fact_id, "text": text}
+
+@app.post("/funfacts/bulk")
+async def bulk_import(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    _=Depends(require_token)
+):
+    """
+    Stream NDJSON (`{"text": ...}` per line) or CSV (with a `text` column).
+    Format comes from `?format=` or the Content-Type header.
+    """
+    fmt = bulk.detect_format(request.headers.get("content-type"), format)
+    loop = asyncio.get_running_loop()
+
+    def flush(batch):
+        # Hver chunk går via skrivetråden, i kø med vanlige POST/DELETE
+        asyncio.run_coroutine_threadsafe(db_exec.write(bulk.insert_batch, batch), loop).result()
+
+    result = await db_exec.run(bulk.import_stream, bulk.iter_request_body(request, loop), fmt, flush)
+    if result["inserted"]:
+        response_cache.invalidate()
+    return result
+
+@app.get("/funfacts/export")
+async def bulk_export(request: Request, format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    v = _validators(request, await db_exec.read(table_state))
+    if v.is_fresh():
+        return v.not_modified()
+    return StreamingResponse(
+        bulk.export_stream(format, db_exec.read),
+        media_type=bulk.FORMATS[format],
+        headers={
+            **v.headers(),
+            "Content-Disposition": f'attachment; filename="funfacts.{format}"',
+        },
+    )
+
+def _delete_fact(conn, fact_id: int) -> int:
+    cur = conn.execute("DELETE FROM funfacts WHERE id = ?", (fact_id,))
+    conn.commit()
+    return cur.rowcount
 
 @app.delete("/funfacts/{fact_id}", status_code=204)
-def delete_funfact(fact_id: int, _=Depends(require_token)):
-    with get_conn() as conn:
-        cur = conn.execute("DELETE FROM funfacts WHERE id = ?", (fact_id,))
-        conn.commit()
-        if cur.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Not found")
+async def delete_funfact(fact_id: int, _=Depends(require_token)):
+    if await db_exec.write(_delete_fact, fact_id) == 0:
+        raise HTTPException(status_code=404, detail="Not found")
+    picker.discard(fact_id)
+    response_cache.invalidate()
 
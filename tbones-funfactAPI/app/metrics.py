@@ -0,0 +1,175 @@
+"""
+Prometheus-style runtime metrics: request counts, per-route latency
+histograms, in-flight requests and optional named stage timings.
+
+The same file lives in tbones-funfactAPI/app and kameo-dashboard/app
+(separate deployables, no shared package) - keep the two copies in sync;
+app/tests/test_metrics.py in both apps fails when they differ.
+
+Cost per request is two perf_counter() calls, a bisect and a few dict
+updates under a lock, so it is meant to stay on in production.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Sekunder; dekker alt fra SQLite-oppslag (ms) til tunge pandas-kjøringer
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # siste = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**kw) -> str:
+    parts = []
+    for k, v in kw.items():
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Metrics:
+    def __init__(self, namespace: str):
+        self.ns = namespace
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self._requests = {}    # (method, route, status) -> count
+        self._latency = {}     # (method, route) -> Histogram
+        self._stages = {}      # stage -> Histogram
+        self._gauges = []      # (name, help, fn -> dict[label_value, number] | number)
+
+    # ---- recording ----
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            h = self._latency.get((method, route))
+            if h is None:
+                h = self._latency[(method, route)] = Histogram()
+            h.observe(seconds)
+
+    def observe_stage(self, stage: str, seconds: float):
+        with self._lock:
+            h = self._stages.get(stage)
+            if h is None:
+                h = self._stages[stage] = Histogram()
+            h.observe(seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block: `with metrics.stage("parse"): ...`"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - t0)
+
+    def add_gauge(self, name: str, help_text: str, fn, label: str = "key"):
+        """Register a gauge read at scrape time. `fn` returns a number or {label_value: number}."""
+        self._gauges.append((name, help_text, fn, label))
+
+    # ---- exposition ----
+    def _histogram_lines(self, name: str, series: dict, label_names) -> list:
+        out = []
+        for key, h in sorted(series.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            base = dict(zip(label_names, key))
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h.counts):
+                cumulative += n
+                out.append(f"{name}_bucket{_labels(**base, le=bound)} {cumulative}")
+            out.append(f'{name}_bucket{_labels(**base, le="+Inf")} {h.count}')
+            out.append(f"{name}_sum{_labels(**base)} {h.sum:.6f}")
+            out.append(f"{name}_count{_labels(**base)} {h.count}")
+        return out
+
+    def render(self) -> str:
+        ns = self.ns
+        with self._lock:
+            lines = [
+                f"# HELP {ns}_http_requests_in_flight Requests currently being served.",
+                f"# TYPE {ns}_http_requests_in_flight gauge",
+                f"{ns}_http_requests_in_flight {self.in_flight}",
+                f"# HELP {ns}_http_requests_total Requests served, by route and status.",
+                f"# TYPE {ns}_http_requests_total counter",
+            ]
+            for (method, route, status), n in sorted(self._requests.items()):
+                lines.append(f"{ns}_http_requests_total{_labels(method=method, route=route, status=status)} {n}")
+
+            lines += [
+                f"# HELP {ns}_http_request_duration_seconds Request latency by route.",
+                f"# TYPE {ns}_http_request_duration_seconds histogram",
+            ]
+            lines += self._histogram_lines(f"{ns}_http_request_duration_seconds", self._latency, ("method", "route"))
+
+            if self._stages:
+                lines += [
+                    f"# HELP {ns}_stage_duration_seconds Time spent in named processing stages.",
+                    f"# TYPE {ns}_stage_duration_seconds histogram",
+                ]
+                lines += self._histogram_lines(f"{ns}_stage_duration_seconds", self._stages, ("stage",))
+
+        for name, help_text, fn, label in self._gauges:
+            try:
+                value = fn()
+            except Exception:
+                continue  # en feilende gauge skal ikke ta ned /metrics
+            lines += [f"# HELP {ns}_{name} {help_text}", f"# TYPE {ns}_{name} gauge"]
+            if isinstance(value, dict):
+                for k, v in sorted(value.items()):
+                    if isinstance(v, (int, float)) and not isinstance(v, bool):
+                        lines.append(f"{ns}_{name}{_labels(**{label: k})} {v}")
+            else:
+                lines.append(f"{ns}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if scope.get("endpoint") is not None and scope.get("root_path"):
+        return scope["root_path"] + "/*"    # mount, f.eks. /static/*
+    # Ukjente stier samles i én serie, ellers vokser kardinaliteten fritt
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead, streaming-safe)."""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        m = self.metrics
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        m.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            m.in_flight -= 1
+            m.observe_request(scope["method"], _route_label(scope), status, time.perf_counter() - t0)
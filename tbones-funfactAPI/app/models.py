@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 class FunFactIn(BaseModel):
@@ -6,3 +8,11 @@ class FunFactIn(BaseModel):
 class FunFact(BaseModel):
     id: int
     text: str
+
+class FunFactPage(BaseModel):
+    items: List[FunFact]
+    next_cursor: Optional[str] = None
+
+class FunFactHit(FunFact):
+    highlight: str
+    score: float
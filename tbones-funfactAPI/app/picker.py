@@ -0,0 +1,174 @@
+import random
+import threading
+from collections import OrderedDict
+
+# Maks antall klienter vi holder shuffle-bag for (eldste kastes først).
+# En pose er bare et frø og en teller, ikke en kopi av id-ene.
+MAX_BAGS = 10_000
+
+_MASK64 = (1 << 64) - 1
+
+
+def _permute(i: int, bits: int, key: int) -> int:
+    """
+    Keyed bijection on range(2**bits) (a 6-round Feistel network, `bits`
+    even). Not cryptographic, just a cheap way to walk a shuffled range
+    without materialising it.
+    """
+    half = bits // 2
+    mask = (1 << half) - 1
+    left, right = i >> half, i & mask
+    for rnd in range(6):
+        # splitmix64-miksing, så alle bit i nøkkelen påvirker de lave bitene
+        h = (right + key + rnd * 0x9E3779B97F4A7C15) & _MASK64
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK64
+        h ^= h >> 31
+        left, right = right, left ^ (h & mask)
+    return (left << half) | right
+
+
+class _Bag:
+    """One client's pass over slots 0..size-1 of the picker, in the order given by `key`."""
+
+    __slots__ = ("key", "size", "bits", "step", "gen")
+
+    def __init__(self, size: int, gen: int):
+        self.key = random.getrandbits(64)
+        self.size = size
+        self.bits = max(2, size.bit_length() + size.bit_length() % 2)
+        self.step = 0
+        self.gen = gen
+
+    def next_slot(self):
+        """Next slot of the pass, or None when every slot has been visited."""
+        while self.step < 1 << self.bits:
+            i = _permute(self.step, self.bits, self.key)
+            self.step += 1
+            # Domenet er maks 4x størrelsen, så i snitt < 4 forsøk per plass
+            if i < self.size:
+                return i
+        return None
+
+
+class FunfactPicker:
+    """
+    O(1) random selection over live funfact ids.
+
+    Keeps a dense array of ids plus an id -> slot map, so add is an append
+    and picking is a single random slot. A removed id leaves an empty slot
+    (so slots never move under a shuffle-bag mid-pass); once half the slots
+    are empty the array is compacted, which keeps a pick below two tries on
+    average however sparse the id sequence gets.
+
+    Works with several uvicorn workers: new rows are picked up by
+    `sync()` (ids are AUTOINCREMENT, so anything above our max id is new),
+    and rows deleted by another worker are dropped lazily via `discard()`
+    when a pick no longer resolves to a row.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = []
+        self._pos = {}
+        self._max_id = 0
+        self._gen = 0
+        self._loaded = False
+        self._bags = OrderedDict()
+
+    # ---- maintenance ----
+    def sync(self, conn):
+        """Load all ids on first use, then only ids above the last known max."""
+        if not self._loaded:
+            rows = conn.execute("SELECT id FROM funfacts").fetchall()
+            with self._lock:
+                if not self._loaded:
+                    for r in rows:
+                        self._add(r[0])
+                    self._loaded = True
+            return
+
+        max_id = conn.execute("SELECT MAX(id) FROM funfacts").fetchone()[0] or 0
+        if max_id <= self._max_id:
+            return
+        rows = conn.execute(
+            "SELECT id FROM funfacts WHERE id > ?", (self._max_id,)
+        ).fetchall()
+        with self._lock:
+            for r in rows:
+                self._add(r[0])
+
+    def add(self, fact_id: int):
+        with self._lock:
+            if self._loaded:
+                self._add(fact_id)
+
+    def discard(self, fact_id: int):
+        with self._lock:
+            self._remove(fact_id)
+
+    def _add(self, fact_id: int):
+        if fact_id in self._pos:
+            return
+        self._pos[fact_id] = len(self._ids)
+        self._ids.append(fact_id)
+        if fact_id > self._max_id:
+            self._max_id = fact_id
+
+    def _remove(self, fact_id: int):
+        i = self._pos.pop(fact_id, None)
+        if i is None:
+            return
+        self._ids[i] = None
+        if len(self._pos) * 2 < len(self._ids):
+            self._compact()
+
+    def _compact(self):
+        # Plassene flyttes, så posene som er i gang begynner på en ny runde
+        self._ids = [i for i in self._ids if i is not None]
+        self._pos = {fact_id: i for i, fact_id in enumerate(self._ids)}
+        self._gen += 1
+
+    # ---- picking ----
+    def pick(self, client=None):
+        """
+        Return a random live id (or None if empty).
+        With `client` set, use that client's shuffle-bag: no repeats until
+        every id has been served once, then the bag is refilled. A bag is a
+        seeded permutation of the slots, not a copy of the ids, so it costs
+        the same few ints however big the table is; empty slots (deletes)
+        are skipped as the pass reaches them.
+        """
+        with self._lock:
+            if not self._pos:
+                return None
+            if client is None:
+                while True:
+                    fact_id = self._ids[random.randrange(len(self._ids))]
+                    if fact_id is not None:
+                        return fact_id
+            return self._pick_from_bag(client)
+
+    def _pick_from_bag(self, client):
+        bag = self._bags.get(client)
+        if bag is not None:
+            self._bags.move_to_end(client)
+
+        # Ids lagt til etter at posen ble fylt (plasser over posens
+        # størrelse) kommer med i neste runde
+        while True:
+            if bag is None or bag.gen != self._gen:
+                bag = self._bags[client] = _Bag(len(self._ids), self._gen)
+                if len(self._bags) > MAX_BAGS:
+                    self._bags.popitem(last=False)
+            slot = bag.next_slot()
+            if slot is None:
+                bag = None
+            elif self._ids[slot] is not None:
+                return self._ids[slot]
+
+    def __len__(self):
+        return len(self._pos)
+
+
+picker = FunfactPicker()
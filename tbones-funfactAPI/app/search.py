@@ -0,0 +1,139 @@
+import difflib
+import html
+import re
+
+# Tokens slik unicode61-tokenizeren ser dem (bokstaver/tall)
+_WORD = re.compile(r"\w+", flags=re.UNICODE)
+
+# Markører som ikke kan forekomme i tekst, byttes til <mark> etter escaping
+_HL_START, _HL_END = "\x02", "\x03"
+
+DUPLICATE_RATIO = 0.9        # SequenceMatcher-ratio for "nesten lik"
+DUPLICATE_CANDIDATES = 5     # kandidater med flest felles ord sammenlignes i Python
+DUPLICATE_KEY_TERMS = 4      # antall sjeldneste ord; en kandidat må ha alle unntatt ett
+DUPLICATE_PROBE_WORDS = 8    # lengste ord vi teller treff for
+DUPLICATE_MAX_MATCHES = 200  # tak på telling og på rader som rangeres
+
+
+def _quote(token: str) -> str:
+    return '"' + token.replace('"', '""') + '"'
+
+
+def match_query(q: str, prefix: bool = True) -> str:
+    """
+    User text -> safe FTS5 MATCH expression. Every token is quoted so
+    FTS syntax (AND/OR/NEAR, *, :) in the input is taken literally.
+    The last token gets a prefix wildcard for search-as-you-type.
+    """
+    tokens = _WORD.findall(q or "")
+    if not tokens:
+        return ""
+    terms = [_quote(t) for t in tokens]
+    if prefix:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _highlight(marked: str) -> str:
+    return (html.escape(marked)
+            .replace(_HL_START, "<mark>")
+            .replace(_HL_END, "</mark>"))
+
+
+def search(conn, q: str, limit: int, offset: int = 0):
+    """BM25-ranked matches (best first) with HTML-safe highlighted text."""
+    expr = match_query(q)
+    if not expr:
+        return []
+    rows = conn.execute(
+        """
+        SELECT f.id, f.text,
+               highlight(funfacts_fts, 0, ?, ?) AS marked,
+               bm25(funfacts_fts) AS score
+        FROM funfacts_fts
+        JOIN funfacts f ON f.id = funfacts_fts.rowid
+        WHERE funfacts_fts MATCH ?
+        ORDER BY score
+        LIMIT ? OFFSET ?
+        """,
+        (_HL_START, _HL_END, expr, limit, offset),
+    ).fetchall()
+    return [
+        {
+            "id": r["id"],
+            "text": r["text"],
+            "highlight": _highlight(r["marked"]),
+            "score": round(-r["score"], 4),   # bm25() er negativ, høyere = bedre her
+        }
+        for r in rows
+    ]
+
+
+def normalize(text: str) -> str:
+    """Lowercase word sequence, ignoring punctuation, quotes and spacing."""
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def _doc_count(conn, term: str) -> int:
+    """Rows containing `term`, counted no further than DUPLICATE_MAX_MATCHES."""
+    return conn.execute(
+        "SELECT count(*) FROM (SELECT 1 FROM funfacts_fts WHERE funfacts_fts MATCH ? LIMIT ?)",
+        (term, DUPLICATE_MAX_MATCHES),
+    ).fetchone()[0]
+
+
+def duplicate_query(conn, text: str):
+    """
+    FTS expression for duplicate candidates, or None.
+
+    Key words are the DUPLICATE_KEY_TERMS rarest of the text's longest
+    words (document counts stop at DUPLICATE_MAX_MATCHES, so counting
+    costs the same at any table size); words the index has never seen
+    (new words, typos) are left out. A candidate must contain all key
+    words but one, e.g. for a b c d `(b AND c AND d) OR (a AND c AND d)
+    OR ...`, so one more typo still matches. Groups made only of common
+    words are dropped when a rarer word is available, since intersecting
+    long doclists is what gets slow as the table grows.
+    """
+    words = sorted(set(_WORD.findall((text or "").lower())), key=lambda w: (-len(w), w))
+    counted = sorted((_doc_count(conn, _quote(w)), -len(w), _quote(w)) for w in words[:DUPLICATE_PROBE_WORDS])
+    key = [w for n, _, w in counted if n > 0][:DUPLICATE_KEY_TERMS]
+    rare = {w for n, _, w in counted if 0 < n < DUPLICATE_MAX_MATCHES}
+    if len(key) <= 2:
+        return " AND ".join(key) or None
+    groups = [key[:i] + key[i + 1:] for i in range(len(key))]
+    if rare:
+        groups = [g for g in groups if rare.intersection(g)]
+    return " OR ".join("(" + " AND ".join(g) + ")" for g in groups)
+
+
+def find_duplicate(conn, text: str):
+    """
+    Return the id of an existing near-identical fact, or None.
+    Candidates come from the FTS index (duplicate_query()), at most
+    DUPLICATE_MAX_MATCHES of them. They are ranked by shared words in
+    Python (bm25() would read every key word's full doclist to weigh it)
+    and only the top few are compared, so no step grows with the table.
+    """
+    expr = duplicate_query(conn, text)
+    if expr is None:
+        return None
+    wanted = normalize(text)
+    words = set(wanted.split())
+    rows = conn.execute(
+        """
+        SELECT f.id, f.text FROM (
+          SELECT rowid FROM funfacts_fts WHERE funfacts_fts MATCH ? LIMIT ?
+        ) m
+        JOIN funfacts f ON f.id = m.rowid
+        """,
+        (expr, DUPLICATE_MAX_MATCHES),
+    ).fetchall()
+    candidates = [(normalize(r["text"]), r["id"]) for r in rows]
+    candidates.sort(key=lambda c: len(words & set(c[0].split())), reverse=True)
+    for existing, fact_id in candidates[:DUPLICATE_CANDIDATES]:
+        if existing == wanted:
+            return fact_id
+        if difflib.SequenceMatcher(None, existing, wanted).ratio() >= DUPLICATE_RATIO:
+            return fact_id
+    return None
@@ -0,0 +1,44 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Må settes før app importeres: db.DB_PATH leses ved import, og app.main
+# oppretter databasen. Testene skal aldri røre data/funfacts.db.
+os.environ["FUNFACTS_DB_PATH"] = str(Path(tempfile.mkdtemp(prefix="funfacts-tests-")) / "funfacts.db")
+os.environ["API_TOKEN"] = "test-token"
+os.environ.pop("FUNFACTS_WRITE_BATCHING", None)
+
+
+@pytest.fixture
+def conn():
+    """Standalone connection to an empty test database (schema, FTS and triggers in place)."""
+    from app import db, jobs
+
+    db.init_db()
+    conn = jobs.open_db(db.DB_PATH)
+    with conn:
+        conn.execute("DELETE FROM funfacts")
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="session")
+def _app_client():
+    from fastapi.testclient import TestClient
+    from app import main
+
+    with TestClient(main.app, headers={"Authorization": "Bearer test-token"}) as client:
+        yield client
+
+
+@pytest.fixture
+def client(_app_client, conn, monkeypatch):
+    """API client on an empty table, with a fresh picker and response cache."""
+    from app import main
+    from app.picker import FunfactPicker
+
+    monkeypatch.setattr(main, "picker", FunfactPicker())
+    main.response_cache.invalidate()
+    return _app_client
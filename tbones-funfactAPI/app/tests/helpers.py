@@ -0,0 +1,16 @@
+"""Shared test data for the API tests."""
+
+FACTS = [
+    "Ugler kan snu hodet 270 grader",
+    "Blekkspruter har tre hjerter og blått blod",
+    "Honningbier danser for å vise vei til blomster",
+    "Sjiraffer sover under to timer i døgnet",
+    "Elefanter er de eneste pattedyrene som ikke kan hoppe",
+    "Snegler kan sove i opptil tre år",
+    "Flamingoer er rosa fordi de spiser reker",
+]
+
+
+def seed(client, texts=FACTS) -> list:
+    """POST each text, return the new ids."""
+    return [client.post("/funfacts", json={"text": t}).json()["id"] for t in texts]
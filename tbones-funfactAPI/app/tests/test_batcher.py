@@ -0,0 +1,44 @@
+import threading
+
+from app import main
+from app.batcher import WriteBatcher
+from app.tests.helpers import FACTS
+
+
+def test_ids_come_back_through_the_write_batcher(client, monkeypatch):
+    batcher = WriteBatcher(max_batch=8, window_ms=50)
+    monkeypatch.setattr(main, "write_batcher", batcher)
+    results = [None] * len(FACTS)
+
+    def post(i):
+        results[i] = client.post("/funfacts", json={"text": FACTS[i]})
+
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(len(FACTS))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.stop()
+
+    assert all(r.status_code == 201 for r in results)
+    assert batcher.items == len(FACTS) and batcher.batches < len(FACTS)
+    stored = {f["id"]: f["text"] for f in client.get("/funfacts").json()}
+    assert {r.json()["id"]: r.json()["text"] for r in results} == stored
+    assert sorted(stored.values()) == sorted(FACTS)
+
+
+def test_insert_without_the_api(conn):
+    batcher = WriteBatcher(window_ms=1)
+    try:
+        fact_id = batcher.insert("Hummere smaker med føttene")
+    finally:
+        batcher.stop()
+    assert conn.execute("SELECT text FROM funfacts WHERE id = ?", (fact_id,)).fetchone()[0] == "Hummere smaker med føttene"
+
+
+def test_pragmas(conn):
+    from app import db
+
+    with db.get_conn() as pooled:
+        assert pooled.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert pooled.execute("PRAGMA busy_timeout").fetchone()[0] > 0
@@ -0,0 +1,68 @@
+import json
+
+from app import bulk
+from app.tests.helpers import FACTS
+
+
+def test_import_reports_errors_per_line(client):
+    lines = [json.dumps({"text": FACTS[0]}), "", "not json", json.dumps({"text": ""}),
+             json.dumps(["a list"]), json.dumps({"text": 42}), json.dumps({"text": FACTS[1]})]
+    r = client.post("/funfacts/bulk", params={"format": "ndjson"}, content="\n".join(lines) + "\n")
+    body = r.json()
+    assert r.status_code == 200
+    assert body["inserted"] == 2 and body["rejected"] == 4
+    assert [(e["line"], e["error"].split(":")[0]) for e in body["errors"]] == [
+        (3, "Invalid JSON"), (4, "Empty text"), (5, "Expected a JSON object"), (6, "Field 'text' must be a string"),
+    ]
+
+
+def test_import_caps_the_error_list(client, monkeypatch):
+    monkeypatch.setattr(bulk, "MAX_ERRORS", 3)
+    body = client.post("/funfacts/bulk", content="nope\n" * 10).json()
+    assert body["rejected"] == 10 and [e["line"] for e in body["errors"]] == [1, 2, 3]
+
+
+def test_import_csv(client):
+    csv_body = 'text\n"Ugler kan snu hodet, nesten helt rundt"\n""\nSnegler kan sove i tre år\n'
+    r = client.post("/funfacts/bulk", content=csv_body, headers={"Content-Type": "text/csv"})
+    assert r.json()["inserted"] == 2 and r.json()["errors"] == [{"line": 3, "error": "Empty text"}]
+
+    r = client.post("/funfacts/bulk", params={"format": "csv"}, content="tekst\nhei\n")
+    assert r.json()["errors"] == [{"line": 1, "error": "CSV header must contain a 'text' column"}]
+
+
+def test_import_commits_one_transaction_per_chunk(client, monkeypatch):
+    monkeypatch.setattr(bulk, "CHUNK_ROWS", 3)
+    batches = []
+    insert_batch = bulk.insert_batch
+
+    def counting_insert_batch(conn, batch):
+        # Hver chunk skal være committet før neste starter
+        assert not conn.in_transaction
+        insert_batch(conn, batch)
+        assert not conn.in_transaction
+        batches.append(len(batch))
+
+    monkeypatch.setattr(bulk, "insert_batch", counting_insert_batch)
+    body = "".join(json.dumps({"text": f"Masseimport rad {i}"}) + "\n" for i in range(10))
+    assert client.post("/funfacts/bulk", content=body).json()["inserted"] == 10
+    assert batches == [3, 3, 3, 1]
+
+
+def test_export_streams_every_row(client, monkeypatch):
+    monkeypatch.setattr(bulk, "CHUNK_ROWS", 3)
+    body = "".join(json.dumps({"text": f"Masseimport rad {i}"}) + "\n" for i in range(10))
+    client.post("/funfacts/bulk", content=body)
+
+    export = client.get("/funfacts/export")
+    assert export.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="funfacts.ndjson"' in export.headers["content-disposition"]
+    assert [json.loads(line)["text"] for line in export.text.splitlines()] == [f"Masseimport rad {i}" for i in range(10)]
+
+    csv_export = client.get("/funfacts/export", params={"format": "csv"}).text.splitlines()
+    assert csv_export[0] == "id,text,created_at" and len(csv_export) == 11
+
+
+def test_export_of_an_empty_table(client):
+    assert client.get("/funfacts/export").text == ""
+    assert client.get("/funfacts/export", params={"format": "csv"}).text == "id,text,created_at\n"
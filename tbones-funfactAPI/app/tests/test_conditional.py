@@ -0,0 +1,54 @@
+from app.tests.helpers import FACTS, seed
+
+
+def _set_updated_at(conn, modifier: str):
+    with conn:
+        conn.execute("UPDATE funfacts_meta SET updated_at = datetime('now', ?) WHERE id = 1", (modifier,))
+
+
+def test_if_none_match_gives_304_until_the_table_changes(client):
+    seed(client, FACTS[:2])
+    etag = client.get("/funfacts").headers["etag"]
+
+    again = client.get("/funfacts", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    assert client.get("/funfacts", headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+
+    client.post("/funfacts", json={"text": FACTS[2]})
+    changed = client.get("/funfacts", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_etag_differs_per_representation(client):
+    seed(client, FACTS[:2])
+    tags = {client.get(path).headers["etag"] for path in ("/funfacts", "/funfacts?limit=1", "/stats")}
+    assert len(tags) == 3
+
+
+def test_if_modified_since(client, conn):
+    seed(client, FACTS[:1])
+    _set_updated_at(conn, "-5 seconds")
+    last_modified = client.get("/stats").headers["last-modified"]
+    assert client.get("/stats", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/stats", headers={"If-Modified-Since": "not a date"}).status_code == 200
+
+    # Siste skriving i et sekund som ikke er over (lagt litt frem, så testen ikke treffer
+    # en sekundgrense): ingen Last-Modified, og If-Modified-Since gir ikke falsk 304
+    _set_updated_at(conn, "+2 seconds")
+    r = client.get("/stats", headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert r.status_code == 200 and "etag" in r.headers and "last-modified" not in r.headers
+
+
+def test_if_none_match_wins_over_if_modified_since(client, conn):
+    seed(client, FACTS[:1])
+    _set_updated_at(conn, "-5 seconds")
+    r = client.get("/stats")
+    headers = {"If-None-Match": '"stale"', "If-Modified-Since": r.headers["last-modified"]}
+    assert client.get("/stats", headers=headers).status_code == 200
+
+
+def test_random_fact_is_never_cached(client):
+    seed(client, FACTS[:1])
+    r = client.get("/funfact")
+    assert r.headers["cache-control"] == "no-store" and "etag" not in r.headers
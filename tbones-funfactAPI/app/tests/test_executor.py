@@ -0,0 +1,54 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from app import bulk, main
+from app.db import get_pool
+from app.executor import DBExecutor
+from app.tests.helpers import FACTS, seed
+
+AUTH = {"Authorization": "Bearer test-token"}
+
+
+def test_slow_upload_does_not_hold_up_reads(client, monkeypatch):
+    # Én lesetråd: hvis importen satt på den, ville /stats vente på opplastingen
+    monkeypatch.setattr(main, "db_exec", DBExecutor(readers=1))
+
+    async def slow_body():
+        for i in range(4):
+            yield (json.dumps({"text": f"Treg opplasting {i}"}) + "\n").encode()
+            await asyncio.sleep(0.3)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=AUTH) as ac:
+            upload = asyncio.create_task(ac.post("/funfacts/bulk", content=slow_body()))
+            await asyncio.sleep(0.2)
+            t0 = time.perf_counter()
+            stats = await ac.get("/stats")
+            waited = time.perf_counter() - t0
+            return (await upload).json(), stats.status_code, waited
+
+    try:
+        result, status, waited = asyncio.run(scenario())
+    finally:
+        main.db_exec.shutdown()
+    assert result["inserted"] == 4
+    assert status == 200 and waited < 0.3
+
+
+def test_export_gives_the_reader_back_between_pages(client, monkeypatch):
+    monkeypatch.setattr(bulk, "CHUNK_ROWS", 2)
+    seed(client, FACTS)
+    pool = get_pool()
+
+    async def consume():
+        idle = []
+        async for _ in bulk.export_stream("ndjson", main.db_exec.read):
+            idle.append(pool.stats()["readers_idle"])    # klienten "leser" siden nå
+        return idle
+
+    idle = asyncio.run(consume())
+    assert len(idle) == 4 and set(idle) == {pool.size}
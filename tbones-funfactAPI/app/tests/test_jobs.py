@@ -0,0 +1,62 @@
+from app import jobs
+from app.cleanup_funfacts_quotes import job, main as cleanup_main, strip_outer_quotes
+
+ROWS = ['"Quoted fact"', "Plain fact", '  "Padded quotes"  ', 'Inner "quotes" stay', '""', "  trailing space  "]
+CLEAN = ["Quoted fact", "Plain fact", "Padded quotes", 'Inner "quotes" stay', "", "trailing space"]
+
+
+def _fill(conn, rows=ROWS):
+    with conn:
+        conn.executemany("INSERT INTO funfacts (text) VALUES (?)", [(r,) for r in rows])
+
+
+def _texts(conn):
+    return [r[0] for r in conn.execute("SELECT text FROM funfacts ORDER BY id")]
+
+
+def test_strip_outer_quotes():
+    assert [strip_outer_quotes(r) for r in ROWS] == CLEAN
+
+
+def test_dry_run_counts_but_writes_nothing(conn, capsys):
+    _fill(conn)
+    version = conn.execute("SELECT version FROM funfacts_meta").fetchone()[0]
+    result = job.dry_run(conn)
+    assert result["rows"] == 6 and result["changed"] == 4 and result["unchanged"] == 2
+    assert _texts(conn) == ROWS
+    assert conn.execute("SELECT version FROM funfacts_meta").fetchone()[0] == version
+    assert "'\"Quoted fact\"' -> 'Quoted fact'" in capsys.readouterr().out
+
+
+def test_chunked_update_matches_set_update(conn):
+    _fill(conn, ROWS * 3)
+    result = job.run_chunked(conn, chunk=4, quiet=True)
+    assert result["changed"] == 12 and result["unchanged"] == 6
+    assert _texts(conn) == CLEAN * 3
+    # FTS-indeksen følger med via triggerne
+    assert conn.execute("SELECT rowid FROM funfacts_fts WHERE funfacts_fts MATCH 'padded'").fetchall()
+
+    assert job.run_set(conn, quiet=True)["changed"] == 0
+
+
+def test_set_update(conn):
+    _fill(conn)
+    assert job.run_set(conn, quiet=True)["changed"] == 4
+    assert _texts(conn) == CLEAN
+
+
+def test_cli_dry_run_and_chunked_run(conn, tmp_path, capsys):
+    from app import db
+
+    _fill(conn)
+    assert cleanup_main(["--db", str(db.DB_PATH), "--dry-run", "-q"]) == 0
+    assert "Would change: 4, Unchanged: 2" in capsys.readouterr().out
+    assert _texts(conn) == ROWS
+
+    backup = tmp_path / "backup.db"
+    args = ["--db", str(db.DB_PATH), "--mode", "chunked", "--chunk", "2", "--backup-to", str(backup), "-q"]
+    assert cleanup_main(args) == 0
+    assert _texts(conn) == CLEAN
+    restored = jobs.open_db(backup)
+    assert _texts(restored) == ROWS
+    restored.close()
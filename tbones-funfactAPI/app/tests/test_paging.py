@@ -0,0 +1,49 @@
+import base64
+
+import pytest
+
+from app.tests.helpers import seed
+
+
+def _cursor(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def test_cursor_paging_matches_offset_paging(client):
+    ids = seed(client)
+    offset_pages = [client.get("/funfacts", params={"limit": 3, "offset": o}).json() for o in (0, 3, 6)]
+
+    pages, cursor = [], ""
+    while True:
+        r = client.get("/funfacts", params={"limit": 3, "cursor": cursor})
+        body = r.json()
+        pages.append(body["items"])
+        assert r.headers.get("x-next-cursor") == body["next_cursor"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == offset_pages
+    assert [f["id"] for page in pages for f in page] == sorted(ids, reverse=True)
+
+
+def test_cursor_skips_deleted_rows(client):
+    ids = seed(client)
+    first = client.get("/funfacts", params={"limit": 2, "cursor": ""}).json()
+    client.delete(f"/funfacts/{ids[-3]}")    # første rad på neste side
+    second = client.get("/funfacts", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [f["id"] for f in second["items"]] == [ids[-4], ids[-5]]
+
+
+def test_offset_mode_sets_the_next_cursor_header(client):
+    ids = seed(client)
+    r = client.get("/funfacts", params={"limit": 3})
+    assert isinstance(r.json(), list)
+    assert r.headers["x-next-cursor"] == _cursor(f"id:{ids[-3]}")
+    assert "x-next-cursor" not in client.get("/funfacts", params={"limit": 10}).headers
+
+
+@pytest.mark.parametrize("cursor", ["!!!", _cursor("id:abc"), _cursor("offset:3"), _cursor("nocolon")])
+def test_invalid_cursor_is_400(client, cursor):
+    r = client.get("/funfacts", params={"cursor": cursor})
+    assert r.status_code == 400 and r.json()["detail"] == "Invalid cursor"
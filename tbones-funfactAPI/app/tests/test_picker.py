@@ -0,0 +1,119 @@
+import random
+import time
+from collections import Counter
+
+import pytest
+
+from app import picker as picker_mod
+from app.picker import FunfactPicker, _permute
+from app.tests.helpers import FACTS, seed
+
+# Id-er med hull, som etter slettinger i en ekte tabell
+IDS = [1, 2, 3, 7, 8, 20, 21, 22, 50, 51, 99, 100, 250]
+
+
+@pytest.fixture
+def picker():
+    p = FunfactPicker()
+    p._loaded = True
+    for fact_id in IDS:
+        p._add(fact_id)
+    return p
+
+
+@pytest.mark.parametrize("bits", [2, 4, 8, 10])
+def test_permute_is_a_bijection(bits):
+    out = [_permute(i, bits, key=12345) for i in range(1 << bits)]
+    assert sorted(out) == list(range(1 << bits))
+
+
+def test_pick_is_uniform_over_ids_with_gaps(picker):
+    random.seed(1)
+    n = 26_000
+    counts = Counter(picker.pick() for _ in range(n))
+    assert set(counts) == set(IDS)
+    expected = n / len(IDS)
+    assert all(abs(c - expected) < 0.15 * expected for c in counts.values())
+
+
+def test_bag_serves_every_id_once_per_pass(picker):
+    for _ in range(5):
+        served = [picker.pick("a") for _ in IDS]
+        assert sorted(served) == IDS
+
+
+def test_bag_order_is_uniform(picker):
+    random.seed(2)
+    firsts = Counter()
+    for i in range(6500):
+        firsts[picker.pick(f"client-{i}")] += 1
+    expected = 6500 / len(IDS)
+    assert set(firsts) == set(IDS)
+    assert all(abs(c - expected) < 0.25 * expected for c in firsts.values())
+
+
+def test_bag_skips_deleted_ids_and_refills_with_new_ones(picker):
+    first = picker.pick("a")
+    gone = next(i for i in IDS if i != first)
+    picker.discard(gone)
+    rest = [picker.pick("a") for _ in range(len(IDS) - 2)]
+    assert sorted([first] + rest) == sorted(set(IDS) - {gone})
+
+    # Ny id midt i en runde kommer med i neste
+    picker.add(300)
+    next_pass = [picker.pick("a") for _ in range(len(IDS))]
+    assert sorted(next_pass) == sorted(set(IDS) - {gone} | {300})
+
+
+def test_sparse_ids_pick_without_scanning_the_id_range():
+    p = FunfactPicker()
+    p._loaded = True
+    for fact_id in (1, 500_000, 1_000_000):
+        p._add(fact_id)
+    t0 = time.perf_counter()
+    served = [p.pick("a") for _ in range(3)] + [p.pick() for _ in range(100)]
+    assert time.perf_counter() - t0 < 0.1
+    assert sorted(served[:3]) == [1, 500_000, 1_000_000]
+
+
+def test_deletes_compact_the_slots_and_restart_bags():
+    p = FunfactPicker()
+    p._loaded = True
+    for fact_id in range(1, 10_001):
+        p._add(fact_id)
+    p.pick("a")
+    for fact_id in range(1, 9_998):
+        p.discard(fact_id)
+    assert len(p) == 3 and len(p._ids) < 10
+    assert sorted(p.pick("a") for _ in range(3)) == [9_998, 9_999, 10_000]
+    assert {p.pick() for _ in range(100)} == {9_998, 9_999, 10_000}
+
+
+def test_bags_hold_no_copies_of_the_ids(picker, monkeypatch):
+    monkeypatch.setattr(picker_mod, "MAX_BAGS", 50)
+    for i in range(200):
+        picker.pick(f"client-{i}")
+    assert len(picker._bags) == 50
+    assert list(picker._bags)[0] == "client-150"
+    bag = next(iter(picker._bags.values()))
+    assert not any(isinstance(getattr(bag, s), list) for s in bag.__slots__)
+
+
+def test_empty_picker():
+    assert FunfactPicker().pick() is None
+    assert FunfactPicker().pick("a") is None
+
+
+def test_random_endpoint_cycles_per_client(client):
+    ids = seed(client, FACTS[:6])
+    client.delete(f"/funfacts/{ids[2]}")
+    live = sorted(set(ids) - {ids[2]})
+
+    r = client.get("/funfact", params={"client": "kiosk"})
+    assert r.status_code == 200 and r.headers["cache-control"] == "no-store"
+    served = [r.json()["id"]] + [client.get("/funfact", params={"client": "kiosk"}).json()["id"] for _ in range(4)]
+    assert sorted(served) == live
+
+
+def test_random_endpoint_on_empty_table(client):
+    assert client.get("/funfact").status_code == 404
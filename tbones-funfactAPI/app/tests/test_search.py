@@ -0,0 +1,43 @@
+from app import search
+from app.tests.helpers import FACTS, seed
+
+
+def test_search_ranks_and_highlights(client):
+    seed(client, FACTS + ["<b>Hjerter</b> i hjerter: hjerter overalt"])
+    hits = client.get("/funfacts/search", params={"q": "hjerter"}).json()
+    assert len(hits) == 2
+    assert hits[0]["text"].startswith("<b>Hjerter</b>")    # flest treff først
+    assert hits[0]["highlight"].startswith("&lt;b&gt;<mark>Hjerter</mark>&lt;/b&gt;")
+
+
+def test_search_takes_fts_syntax_literally(client):
+    seed(client)
+    for q in ('"', "ugler OR", "NEAR(a b)", "text:ugler", "*"):
+        assert client.get("/funfacts/search", params={"q": q}).status_code == 200
+    assert [h["text"] for h in client.get("/funfacts/search", params={"q": "flamin"}).json()] == [FACTS[-1]]
+
+
+def test_near_duplicate_post_is_409(client):
+    (fact_id,) = seed(client, FACTS[1:2])
+    for text in (FACTS[1], "  blekkspruter har tre hjerter og blått blod! ", "Blekksprutter har tre hjerter og blått blod"):
+        r = client.post("/funfacts", json={"text": text})
+        assert r.status_code == 409 and r.json()["detail"] == f"Duplicate of #{fact_id}"
+    assert client.post("/funfacts", json={"text": "Blekkspruter har ni hjerner"}).status_code == 201
+
+
+def test_empty_post_is_400(client):
+    assert client.post("/funfacts", json={"text": "   "}).status_code == 400
+
+
+def test_duplicate_query_keys_on_rare_words(conn):
+    with conn:
+        conn.executemany("INSERT INTO funfacts (text) VALUES (?)",
+                         [(f"Det er ikke som en kan tro, sa nr {i}",) for i in range(300)])
+        fact_id = conn.execute(
+            "INSERT INTO funfacts (text) VALUES ('Det er ikke som en kan tro om kråkeboller, sjøpølser')"
+        ).lastrowid
+    text = "Det er ikke som en kan tro om kråkebolller, sjøpølser"
+    expr = search.duplicate_query(conn, text)
+    assert "kråkebolller" not in expr                              # ukjent ord (skrivefeil) er ikke med
+    assert all('"sjøpølser"' in g for g in expr.split(" OR "))     # ingen gruppe av bare vanlige ord
+    assert search.find_duplicate(conn, text) == fact_id
@@ -0,0 +1,85 @@
+"""
+Compare the sync and async DB paths of the API (FUNFACTS_DB_MODE).
+
+Runs the app in-process over ASGI against a freshly seeded temp database,
+fires the same read mix at it in both modes and prints requests/sec and
+latency percentiles as JSON.
+
+    python bench/async_vs_sync.py --rows 10000 --concurrency 64 --requests 5000
+    python bench/async_vs_sync.py --threadpool 4     # simulate a small Pi threadpool
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from harness import ROOT, drive, seed
+
+ENDPOINTS = ["/funfact", "/funfacts?limit=20", "/stats"]
+
+
+async def run_mode(app, mode: str, requests: int, concurrency: int, threadpool: int):
+    import anyio.to_thread
+    import httpx
+    from app import main
+
+    main.db_exec.mode = mode
+    if threadpool:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = threadpool
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ENDPOINTS:  # warmup (picker load, caches)
+            await client.get(path)
+        result = await drive(
+            client,
+            lambda c, i: c.get(ENDPOINTS[i % len(ENDPOINTS)]),
+            requests,
+            concurrency,
+        )
+    return {"mode": mode, **result}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--threadpool", type=int, default=0,
+                    help="Starlette/anyio threadpool size (0 = library default of 40)")
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="funfacts-bench-"))
+    db_path = tmp / "funfacts.db"
+    seed(db_path, args.rows)
+    os.environ["FUNFACTS_DB_PATH"] = str(db_path)
+    sys.path.insert(0, str(ROOT))
+
+    from app.db import close_pool
+    from app.main import app, db_exec
+
+    async def run_all():
+        out = []
+        for mode in ("sync", "async"):
+            out.append(await run_mode(app, mode, args.requests, args.concurrency, args.threadpool))
+        return out
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        db_exec.shutdown()
+        close_pool()
+
+    print(json.dumps({
+        "rows": args.rows,
+        "concurrency": args.concurrency,
+        "threadpool": args.threadpool or 40,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
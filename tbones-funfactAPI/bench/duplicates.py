@@ -0,0 +1,128 @@
+"""
+Cost of the POST /funfacts duplicate check (search.find_duplicate) as the
+table grows.
+
+Seeds synthetic tables where every fact mixes common Norwegian words
+("som", "kan", "ikke", ...) with words drawn from a Zipf-shaped
+vocabulary (a few frequent words, a long tail of rare ones, like real
+text), then times three kinds of text against each size:
+
+  - common:  a short fact made almost only of common words
+  - typo:    an existing fact with a typo in its longest word (must match)
+  - new:     a fresh random fact (must not match)
+
+The check should cost about the same at every size. With --max-growth X
+the run exits with status 1 when the largest size is more than X times
+slower than the smallest for any kind.
+
+    python bench/duplicates.py
+    python bench/duplicates.py --sizes 1k,20k,100k --max-growth 5
+"""
+import argparse
+import itertools
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from harness import ROOT
+
+sys.path.insert(0, str(ROOT))
+
+from app import db, search  # noqa: E402
+
+COMMON = ["som", "kan", "ikke", "er", "i", "og", "av", "på", "en", "det", "har", "med", "til", "de"]
+
+# 8000 ord, ord nr. k trekkes med vekt 1/k
+_SYLLABLES = ["bla", "kro", "sni", "tur", "vel", "hav", "mor", "pel", "ski", "dun",
+              "ken", "fisk", "bær", "tind", "sol", "nes", "vik", "lund", "stad", "dal"]
+_VOCAB = ["".join(p) for p in itertools.product(_SYLLABLES, repeat=3)]
+_WEIGHTS = list(itertools.accumulate(1 / k for k in range(1, len(_VOCAB) + 1)))
+
+
+def fact_text(rng: random.Random) -> str:
+    words = rng.choices(_VOCAB, cum_weights=_WEIGHTS, k=6)
+    for _ in range(6):
+        words.insert(rng.randrange(len(words) + 1), rng.choice(COMMON))
+    return " ".join(words).capitalize()
+
+
+def build(path: Path, rows: int, seed_value: int = 7) -> list:
+    """Create a table with `rows` facts through the app's schema; returns the texts."""
+    rng = random.Random(seed_value)
+    texts = [fact_text(rng) for _ in range(rows)]
+    db.DB_PATH = path
+    db.init_db()
+    db.close_pool()
+    conn = db.connect()
+    with conn:
+        conn.executemany("INSERT INTO funfacts (text) VALUES (?)", ((t,) for t in texts))
+    conn.close()
+    return texts
+
+
+def typo(text: str) -> str:
+    longest = max(text.split(), key=len)
+    return text.replace(longest, longest[:2] + longest[3:] + longest[2], 1)
+
+
+def time_calls(conn, texts: list, repeat: int) -> float:
+    """Mean ms per find_duplicate call over `texts`, best of `repeat` rounds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for t in texts:
+            search.find_duplicate(conn, t)
+        best = min(best, (time.perf_counter() - t0) / len(texts))
+    return best * 1000
+
+
+def run(rows: int, tmp: Path, calls: int, repeat: int) -> dict:
+    texts = build(tmp / f"dup-{rows}.db", rows)
+    rng = random.Random(rows)
+    conn = db.connect()
+    picked = rng.sample(range(rows), min(calls, rows))
+    kinds = {
+        "common": ["Katter kan ikke smake søtt, som de fleste", "Det er ikke som en kan tro",
+                   "De kan ha det med seg i en til og med"],
+        "typo": [typo(texts[i]) for i in picked],
+        "new": [fact_text(rng) for _ in range(calls)],
+    }
+    found = sum(search.find_duplicate(conn, t) == i + 1 for t, i in zip(kinds["typo"], picked))
+    res = {"rows": rows, "typo_found": f"{found}/{len(picked)}",
+           "new_false_hits": sum(search.find_duplicate(conn, t) is not None for t in kinds["new"])}
+    for name, batch in kinds.items():
+        res[f"{name}_ms"] = round(time_calls(conn, batch, repeat), 3)
+    conn.close()
+    return res
+
+
+def parse_size(s: str) -> int:
+    s = s.strip().lower()
+    return int(float(s[:-1]) * 1000) if s.endswith("k") else int(s)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1k,20k,100k", help="comma-separated row counts (k suffix ok)")
+    ap.add_argument("--calls", type=int, default=50, help="texts per kind")
+    ap.add_argument("--repeat", type=int, default=3, help="timed rounds (best is kept)")
+    ap.add_argument("--max-growth", type=float, help="fail if the largest size is this many times slower")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="funfacts-dup-") as tmp:
+        results = [run(parse_size(s), Path(tmp), args.calls, args.repeat) for s in args.sizes.split(",")]
+    print(json.dumps(results, indent=2))
+
+    if args.max_growth:
+        first, last = results[0], results[-1]
+        slow = [k for k in ("common_ms", "typo_ms", "new_ms") if last[k] > args.max_growth * max(first[k], 0.05)]
+        for k in slow:
+            print(f"{k}: {first[k]} ms at {first['rows']} rows -> {last[k]} ms at {last['rows']} rows", file=sys.stderr)
+        sys.exit(1 if slow else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Shared helpers for the benchmark scripts in this folder: seeding a
+synthetic database and driving an HTTP client with N concurrent workers.
+"""
+import asyncio
+import random
+import sqlite3
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Tilfeldige ord gjør tekstene ulike nok til at duplikatsjekken ikke slår inn
+_VOCAB = [
+    f"{a}{b}" for a in ("bla", "kro", "sni", "tur", "vel", "hav", "mor", "pel", "ski", "dun")
+    for b in ("ken", "fisk", "bær", "tind", "sol", "nes", "vik", "lund", "stad", "dal")
+]
+
+
+def random_text(rng: random.Random, words: int = 10) -> str:
+    return " ".join(rng.choice(_VOCAB) for _ in range(words)) + f" {rng.getrandbits(48):x}"
+
+
+def seed(path: Path, rows: int, seed_value: int = 42, chunk: int = 50_000):
+    """Create a funfacts table with `rows` synthetic rows (schema as in app/db.py)."""
+    rng = random.Random(seed_value)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS funfacts (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          text TEXT NOT NULL,
+          created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    done = 0
+    while done < rows:
+        n = min(chunk, rows - done)
+        with conn:
+            conn.executemany(
+                "INSERT INTO funfacts (text) VALUES (?)",
+                ((random_text(rng),) for _ in range(n)),
+            )
+        done += n
+    conn.close()
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, int(round(p / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p90_ms": round(percentile(latencies, 90), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+async def drive(client, make_request, requests: int, concurrency: int) -> dict:
+    """
+    Fire `requests` calls with `concurrency` workers. `make_request(client, i)`
+    returns an awaitable httpx response. Status >= 400 counts as an error.
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            t0 = time.perf_counter()
+            r = await make_request(client, i)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            if r.status_code >= 400:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - t0)
@@ -0,0 +1,230 @@
+"""
+Load test for the funfacts API.
+
+Seeds synthetic databases (default 1k and 100k rows, add 1m for the big
+one), then drives GET /funfact, GET /funfacts (first page, deep OFFSET
+page and deep cursor page), GET /stats and POST /funfacts through
+
+  - asgi:    an in-process ASGI client (no network, measures the app), and
+  - uvicorn: a local uvicorn server over TCP (what the Pi actually runs).
+
+Results are printed (and optionally written) as JSON. Pass an earlier
+result file with --compare to get per-scenario deltas; --max-regression
+makes the run fail when throughput drops more than the given percent.
+
+    python bench/loadtest.py
+    python bench/loadtest.py --sizes 1k,100k,1m --transports asgi,uvicorn --out bench/results.json
+    python bench/loadtest.py --compare bench/results.json --max-regression 15
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from harness import ROOT, drive, random_text, seed
+
+BENCH_TOKEN = "bench-token"
+AUTH = {"Authorization": f"Bearer {BENCH_TOKEN}"}
+
+
+def parse_size(s: str) -> int:
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s.rstrip("km")) * mult)
+
+
+def scenarios(rows: int):
+    """name -> request factory(client, i)."""
+    rng = random.Random(7)
+    mid = max(1, rows // 2)
+    mid_cursor = base64.urlsafe_b64encode(f"id:{mid}".encode()).decode().rstrip("=")
+    return {
+        "GET /funfact": lambda c, i: c.get("/funfact"),
+        "GET /funfacts first page": lambda c, i: c.get("/funfacts?limit=50"),
+        "GET /funfacts deep offset": lambda c, i: c.get(f"/funfacts?limit=50&offset={mid}"),
+        "GET /funfacts deep cursor": lambda c, i: c.get(f"/funfacts?limit=50&cursor={mid_cursor}"),
+        "GET /stats": lambda c, i: c.get("/stats"),
+        "POST /funfacts": lambda c, i: c.post("/funfacts", json={"text": random_text(rng)}, headers=AUTH),
+    }
+
+
+async def run_scenarios(client, rows: int, requests: int, concurrency: int) -> dict:
+    out = {}
+    for name, make in scenarios(rows).items():
+        await make(client, 0)  # warmup
+        out[name] = await drive(client, make, requests, concurrency)
+    return out
+
+
+def app_env(db_path: Path, no_cache: bool) -> dict:
+    env = dict(os.environ)
+    env["FUNFACTS_DB_PATH"] = str(db_path)
+    env["API_TOKEN"] = BENCH_TOKEN
+    if no_cache:
+        env["FUNFACTS_CACHE_ENTRIES"] = "0"
+    return env
+
+
+# ---- asgi: run in a child process so every database gets a fresh app ----
+def asgi_worker(args):
+    import httpx
+    sys.path.insert(0, str(ROOT))
+    from app.db import close_pool
+    from app.main import app, db_exec
+
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_scenarios(client, args.rows, args.requests, args.concurrency)
+
+    try:
+        print(json.dumps(asyncio.run(go())))
+    finally:
+        db_exec.shutdown()
+        close_pool()
+
+
+def run_asgi(db_path: Path, rows: int, args) -> dict:
+    cmd = [
+        sys.executable, str(Path(__file__).resolve()), "--worker",
+        "--rows", str(rows), "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+    ]
+    res = subprocess.run(cmd, env=app_env(db_path, args.no_cache), capture_output=True, text=True, check=True)
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+# ---- uvicorn: real server over TCP ----
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_uvicorn(db_path: Path, rows: int, args) -> dict:
+    import httpx
+
+    port = _free_port()
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=app_env(db_path, args.no_cache))
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{base}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline or proc.poll() is not None:
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.2)
+
+        async def go():
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=base, limits=limits, timeout=30) as client:
+                return await run_scenarios(client, rows, args.requests, args.concurrency)
+
+        return asyncio.run(go())
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+TRANSPORTS = {"asgi": run_asgi, "uvicorn": run_uvicorn}
+
+
+def compare(results: dict, baseline: dict) -> list:
+    rows = []
+    for size, by_transport in results["runs"].items():
+        for transport, by_scenario in by_transport.items():
+            for name, cur in by_scenario.items():
+                old = baseline.get("runs", {}).get(size, {}).get(transport, {}).get(name)
+                if not old or not old.get("rps"):
+                    continue
+                rows.append({
+                    "size": size, "transport": transport, "scenario": name,
+                    "rps_change_pct": round((cur["rps"] - old["rps"]) / old["rps"] * 100, 1),
+                    "p99_change_pct": round((cur["p99_ms"] - old["p99_ms"]) / old["p99_ms"] * 100, 1)
+                    if old.get("p99_ms") else None,
+                })
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1k,100k", help="comma-separated row counts, e.g. 1k,100k,1m")
+    ap.add_argument("--transports", default="asgi", help="asgi, uvicorn or both (comma-separated)")
+    ap.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn --workers")
+    ap.add_argument("--no-cache", action="store_true", help="disable the response cache (raw DB cost)")
+    ap.add_argument("--data-dir", type=Path, help="keep seeded databases here and reuse them")
+    ap.add_argument("--out", type=Path, help="write JSON results to this file")
+    ap.add_argument("--compare", type=Path, help="earlier JSON result to diff against")
+    ap.add_argument("--max-regression", type=float, help="fail if any rps drops more than this percent")
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        return asgi_worker(args)
+
+    data_dir = args.data_dir or Path(tempfile.mkdtemp(prefix="funfacts-load-"))
+    data_dir.mkdir(parents=True, exist_ok=True)
+    transports = [t.strip() for t in args.transports.split(",") if t.strip()]
+
+    results = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "no_cache": args.no_cache,
+        "python": sys.version.split()[0],
+        "runs": {},
+    }
+    for size in args.sizes.split(","):
+        rows = parse_size(size)
+        seeded = data_dir / f"seed-{rows}.db"
+        if not seeded.exists():
+            t0 = time.perf_counter()
+            seed(seeded, rows)
+            print(f"[i] seeded {rows} rows in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        for transport in transports:
+            # Fersk kopi per kjøring, POST-scenariet skriver i databasen
+            run_db = data_dir / f"run-{rows}-{transport}.db"
+            shutil.copy(seeded, run_db)
+            print(f"[i] {transport} @ {rows} rows", file=sys.stderr)
+            results["runs"].setdefault(str(rows), {})[transport] = TRANSPORTS[transport](run_db, rows, args)
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{run_db}{suffix}").unlink(missing_ok=True)
+
+    exit_code = 0
+    if args.compare:
+        diff = compare(results, json.loads(args.compare.read_text()))
+        results["comparison"] = diff
+        if args.max_regression is not None:
+            worst = [d for d in diff if d["rps_change_pct"] < -args.max_regression]
+            if worst:
+                print(f"[!] {len(worst)} scenario(s) regressed more than {args.max_regression}%", file=sys.stderr)
+                exit_code = 1
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.out:
+        args.out.write_text(text + "\n")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())